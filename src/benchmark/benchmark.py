@@ -0,0 +1,327 @@
+import os
+import sys
+import json
+import time
+import signal
+import random
+import platform
+import argparse
+import tempfile
+import threading
+import subprocess
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "common"))
+
+from layout import block_layout
+from ports import wait_for_ports
+from phase_registry import PhaseRegistry, registry_name
+
+SRC_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+VARIANT_DIRS = {
+    "monolith": os.path.join(SRC_DIR, "task1_monolith"),
+    "grpc": os.path.join(SRC_DIR, "task2_distributed", "grpc"),
+    "grpc-host": os.path.join(SRC_DIR, "task2_distributed", "grpc"),
+    "thrift": os.path.join(SRC_DIR, "task2_distributed", "thrift"),
+    "thrift-host": os.path.join(SRC_DIR, "task2_distributed", "thrift"),
+}
+HOST_VARIANTS = ("grpc-host", "thrift-host")
+BASE_PORT = 5001
+
+# Metriken, bei denen ein kleinerer Wert besser ist (für den Vergleich mit einer Baseline)
+LOWER_IS_BETTER = ("startup_s", "cpu_s", "step_overruns", "missed_ticks", "barrier_wait_ms", "latency_p50_ms", "latency_p90_ms", "latency_p99_ms", "cpu_s_per_step", "rss_mb")
+
+
+def percentile(values, q):
+    """Berechnet das q-Quantil (0..100) einer Liste per linearer Interpolation."""
+    if not values:
+        return None
+    values = sorted(values)
+    position = (len(values) - 1) * q / 100
+    lower = int(position)
+    upper = min(lower + 1, len(values) - 1)
+    return values[lower] + (values[upper] - values[lower]) * (position - lower)
+
+
+def reap(process):
+    """Wartet auf einen Kindprozess und liefert dessen Ressourcenverbrauch (CPU-Zeit in s, maximale RSS in KiB)."""
+    _, _, usage = os.wait4(process.pid, 0)
+    process.returncode = 0
+    return usage.ru_utime + usage.ru_stime, usage.ru_maxrss
+
+
+def bench_monolith(n, m, steps, engine):
+    """Misst den Monolithen im Headless-Modus."""
+    with tempfile.TemporaryDirectory() as tmp:
+        summary_path = os.path.join(tmp, "summary.json")
+        start = time.perf_counter()
+        process = subprocess.Popen(
+            [sys.executable, "task1_monolith.py", str(n), str(m), "--headless", "--engine", engine,
+             "--steps", str(steps), "--seed", "0", "--summary", summary_path],
+            cwd=VARIANT_DIRS["monolith"], stdout=subprocess.DEVNULL)
+        cpu_s, rss_kb = reap(process)
+        wall = time.perf_counter() - start
+        with open(summary_path) as f:
+            summary = json.load(f)
+
+    return {
+        "engine": engine,
+        "startup_s": wall - summary["elapsed_s"],
+        "steps_per_sec_per_firefly": summary["steps_per_sec"],
+        "cell_updates_per_sec": summary["cell_updates_per_sec"],
+        "cpu_s": cpu_s,
+        "cpu_s_per_step": cpu_s / max(1, summary["steps"]),
+        "rss_mb": rss_kb / 1024,
+    }
+
+
+def grpc_latency_probe(host, ids):
+    """Erzeugt eine Funktion, die eine GetPhase-Anfrage an Glühwürmchen i stellt (gRPC, Kanäle werden wiederverwendet)."""
+    sys.path.insert(0, VARIANT_DIRS["grpc"])
+    import grpc
+    import fireflys_pb2
+    import fireflys_pb2_grpc
+
+    stubs = {i: fireflys_pb2_grpc.FireflyStub(grpc.insecure_channel(f"{host}:{BASE_PORT + i}")) for i in ids}
+
+    def probe(i):
+        stubs[i].GetPhase(fireflys_pb2.PhaseRequest(id=i), timeout=1.0)
+    return probe
+
+
+def grpc_host_latency_probe(host, layout):
+    """Erzeugt eine Funktion, die alle Phasen des Host-Prozesses h mit einem GetPhases-Aufruf abfragt."""
+    sys.path.insert(0, VARIANT_DIRS["grpc-host"])
+    import grpc
+    import fireflys_pb2
+    import fireflys_pb2_grpc
+
+    stubs = [fireflys_pb2_grpc.FireflyStub(grpc.insecure_channel(f"{host}:{block.port}")) for block in layout.blocks]
+
+    def probe(h):
+        stubs[h].GetPhases(fireflys_pb2.PhasesRequest(ids=list(layout.blocks[h].ids)), timeout=1.0)
+    return probe
+
+
+def thrift_latency_probe(host, ids, firefly_args=()):
+    """Erzeugt eine Funktion, die eine getPhase-Anfrage an Glühwürmchen i stellt (Thrift, Verbindungen werden wiederverwendet wie im Observer).
+
+    Protokoll und Transport werden aus den Argumenten der Glühwürmchen übernommen (--protocol, --transport).
+    """
+    sys.path.insert(0, VARIANT_DIRS["thrift"])
+    from stack import ClientPool, add_stack_arguments
+
+    parser = argparse.ArgumentParser(add_help=False)
+    add_stack_arguments(parser)
+    stack, _ = parser.parse_known_args(firefly_args)
+    pool = ClientPool(stack.transport, protocol=stack.protocol)
+
+    def probe(i):
+        with pool.client(host, BASE_PORT + i) as client:
+            client.getPhase(i)
+    return probe
+
+
+def measure_latencies(probe, ids, duration, concurrency=1):
+    """Ruft `probe` für zufällige IDs aus `concurrency` Threads gleichzeitig auf, `duration` Sekunden lang.
+
+    Gibt die Latenzen in ms und die Anzahl der Fehler zurück.
+    """
+    latencies = []
+    errors = []
+    deadline = time.monotonic() + duration
+
+    def caller(rng):
+        while time.monotonic() < deadline:
+            i = rng.choice(ids)
+            t0 = time.perf_counter()
+            try:
+                probe(i)
+                latencies.append((time.perf_counter() - t0) * 1000)  # list.append ist threadsicher
+            except Exception:
+                errors.append(i)
+
+    threads = [threading.Thread(target=caller, args=(random.Random(random.random()),)) for _ in range(concurrency)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return latencies, len(errors)
+
+
+def thrift_host_latency_probe(host, layout, firefly_args=()):
+    """Erzeugt eine Funktion, die alle Phasen des Host-Prozesses h mit einem getGrid-Aufruf abfragt (Thrift)."""
+    sys.path.insert(0, VARIANT_DIRS["thrift-host"])
+    from stack import ClientPool, add_stack_arguments
+
+    parser = argparse.ArgumentParser(add_help=False)
+    add_stack_arguments(parser)
+    stack, _ = parser.parse_known_args(firefly_args)
+    pool = ClientPool(stack.transport, protocol=stack.protocol)
+
+    def probe(h):
+        with pool.client(host, layout.blocks[h].port) as client:
+            client.getGrid()
+    return probe
+
+
+def bench_distributed(variant, n, m, duration, startup_timeout, extra_args, hosts=1, shm=False, concurrency=1):
+    """Startet alle Glühwürmchen einer verteilten Variante, misst Start, RPC-Latenzen, Schrittrate und Ressourcen.
+
+    :param hosts: Anzahl der Host-Prozesse für die Varianten grpc-host und thrift-host
+    :param concurrency: Anzahl gleichzeitiger Aufrufer bei der Latenzmessung
+    :param shm: Shared-Memory-Register anlegen, aus dem die Glühwürmchen ihre Nachbarn lesen (nicht für Host-Prozesse)
+    """
+    registry = None
+    if shm and variant not in HOST_VARIANTS:
+        registry = PhaseRegistry(registry_name(n, m, BASE_PORT), n * m, create=True)
+        extra_args = extra_args + ["--shm-registry", registry.name]
+    if variant in HOST_VARIANTS:
+        # Ein Prozess pro Zeilenblock; abgefragt wird jeweils ein ganzer Block
+        layout = block_layout(n, m, hosts)
+        ids = list(range(hosts))
+        commands = [["host.py", "--hosts", str(hosts), "--index", str(h)] for h in ids]
+    else:
+        ids = list(range(n * m))
+        commands = [["fireflys.py", "--id", str(i)] for i in ids]
+    with tempfile.TemporaryDirectory() as tmp:
+        start = time.perf_counter()
+        processes = []
+        for i, command in zip(ids, commands):
+            processes.append(subprocess.Popen(
+                [sys.executable] + command + ["--n", str(n), "--m", str(m),
+                                              "--stats-file", os.path.join(tmp, f"{i}.json")] + extra_args,
+                cwd=VARIANT_DIRS[variant], stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL))
+        ready = wait_for_ports("localhost", [BASE_PORT + i for i in ids], startup_timeout)
+        startup = time.perf_counter() - start
+
+        # RPC-Latenzen aus Sicht eines Observers messen
+        latencies = []
+        errors = 0
+        if ready:
+            if variant == "grpc-host":
+                probe = grpc_host_latency_probe("localhost", layout)
+            elif variant == "thrift-host":
+                probe = thrift_host_latency_probe("localhost", layout, extra_args)
+            elif variant == "grpc":
+                probe = grpc_latency_probe("localhost", ids)
+            else:
+                probe = thrift_latency_probe("localhost", ids, extra_args)
+            latencies, errors = measure_latencies(probe, ids, duration, concurrency)
+
+        for process in processes:
+            os.kill(process.pid, signal.SIGTERM)  # send_signal() würde den Prozess vorher per poll() einsammeln
+        cpu_total, rss_total = 0.0, 0
+        for process in processes:
+            cpu_s, rss_kb = reap(process)
+            cpu_total += cpu_s
+            rss_total += rss_kb
+
+        stats = []
+        for i in ids:
+            try:
+                with open(os.path.join(tmp, f"{i}.json")) as f:
+                    stats.append(json.load(f))
+            except (OSError, ValueError):
+                pass  # Prozess hat keine Statistik geschrieben (z. B. nicht sauber beendet)
+    if registry is not None:
+        registry.unlink()
+
+    steps = sum(s["steps"] * s.get("fireflies", 1) for s in stats)  # Schritte einzelner Glühwürmchen
+    rates = [s["steps"] / s["elapsed_s"] for s in stats if s["elapsed_s"] > 0]
+    barrier_waits = [s["barrier_wait_ms"] for s in stats if "barrier_wait_ms" in s]  # Nur im Lockstep-Modus
+    return {
+        "ready": ready,
+        "startup_s": startup,
+        "steps_per_sec_per_firefly": sum(rates) / len(rates) if rates else None,
+        "latency_p50_ms": percentile(latencies, 50),
+        "latency_p90_ms": percentile(latencies, 90),
+        "latency_p99_ms": percentile(latencies, 99),
+        "rpc_samples": len(latencies),
+        "rpc_errors": errors,
+        "concurrency": concurrency,
+        "cpu_s": cpu_total,
+        "cpu_s_per_step": cpu_total / steps if steps else None,
+        "rss_mb": rss_total / 1024,
+        "step_overruns": sum(s.get("overruns", 0) for s in stats),
+        "missed_ticks": sum(s.get("missed_ticks", 0) for s in stats),
+        "barrier_wait_ms": sum(barrier_waits) / len(barrier_waits) if barrier_waits else None,
+        "shm_registry": registry is not None,
+        "local_neighbors": sum(s.get("local_neighbors", 0) for s in stats),  # Nachbarschaften ohne RPC
+        "reported_processes": len(stats),
+    }
+
+
+def compare(results, baseline_path):
+    """Vergleicht die Ergebnisse mit einer früheren Ergebnisdatei und gibt die relativen Änderungen aus."""
+    with open(baseline_path) as f:
+        baseline = {(r["variant"], r["n"], r["m"], r.get("engine")): r for r in json.load(f)["results"]}
+    for result in results:
+        old = baseline.get((result["variant"], result["n"], result["m"], result.get("engine")))
+        if old is None:
+            continue
+        for key, value in result.items():
+            if not isinstance(value, (int, float)) or isinstance(value, bool) or key in ("n", "m"):
+                continue
+            if not isinstance(old.get(key), (int, float)) or not old[key]:
+                continue
+            change = (value - old[key]) / old[key] * 100
+            worse = change > 0 if key in LOWER_IS_BETTER else change < 0
+            marker = " <-- Regression" if worse and abs(change) > 10 else ""
+            print(f"{result['variant']:>8} {result['n']}x{result['m']} {key:<28} {old[key]:>12.4g} -> {value:>12.4g} ({change:+.1f} %){marker}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Reproduzierbarer Benchmark der Glühwürmchen-Implementierungen (ohne GUI, lokal)")
+    parser.add_argument("--variants", type=str, default="monolith,grpc,thrift", help="Zu messende Varianten (default: monolith,grpc,thrift)")
+    parser.add_argument("--sizes", type=str, default="3x3,5x5", help='Gittergrößen, z. B. "3x3,5x5" (default: 3x3,5x5)')
+    parser.add_argument("--steps", type=int, default=2000, help="Schritte für den Monolithen (default: 2000)")
+    parser.add_argument("--engine", type=str, default="vectorized", help="Engine(s) des Monolithen, z. B. vectorized,sharded (default: vectorized)")
+    parser.add_argument("--duration", type=float, default=10.0, help="Messdauer pro verteiltem Lauf in Sekunden (default: 10)")
+    parser.add_argument("--startup-timeout", type=float, default=120.0, help="Maximale Wartezeit auf alle Ports in Sekunden (default: 120)")
+    parser.add_argument("--hosts", type=int, default=2, help="Anzahl der Host-Prozesse für grpc-host und thrift-host (default: 2)")
+    parser.add_argument("--shm", action="store_true",
+                        help="Glühwürmchen lesen ihre Nachbarn aus einem Shared-Memory-Register statt per RPC (grpc, thrift)")
+    parser.add_argument("--concurrency", type=int, default=1,
+                        help="Gleichzeitige Aufrufer bei der Latenzmessung der verteilten Varianten (default: 1)")
+    parser.add_argument("--seed", type=int, default=0, help="Seed für die Auswahl der abgefragten Glühwürmchen (default: 0)")
+    parser.add_argument("--output", type=str, default="benchmark.json", help="Ergebnisdatei (default: benchmark.json)")
+    parser.add_argument("--compare", type=str, default=None, help="Ergebnisse mit einer früheren Ergebnisdatei vergleichen")
+    args, extra_args = parser.parse_known_args()
+
+    random.seed(args.seed)
+    sizes = [tuple(int(v) for v in size.lower().split("x")) for size in args.sizes.split(",")]
+    results = []
+    for variant in args.variants.split(","):
+        for n, m in sizes:
+            print(f"Messe {variant} {n}x{m} ...", flush=True)
+            if variant == "monolith":
+                for engine in args.engine.split(","):
+                    result = bench_monolith(n, m, args.steps, engine)
+                    results.append({"variant": variant, "n": n, "m": m, **result})
+            else:
+                result = bench_distributed(variant, n, m, args.duration, args.startup_timeout, extra_args, args.hosts, args.shm,
+                                           args.concurrency)
+                results.append({"variant": variant, "n": n, "m": m, **result})
+            print(json.dumps(results[-1]))
+
+    report = {
+        "meta": {
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "args": vars(args),
+            "firefly_args": extra_args,
+        },
+        "results": results,
+    }
+    with open(args.output, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"Ergebnisse in {args.output}")
+
+    if args.compare:
+        compare(results, args.compare)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,184 @@
+import os
+import sys
+import json
+import time
+import platform
+import argparse
+import itertools
+import multiprocessing
+
+from benchmark import VARIANT_DIRS, percentile, measure_latencies
+
+sys.path.insert(0, VARIANT_DIRS["thrift"])
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "common"))
+
+from thrift.Thrift import TMessageType
+from thrift.transport import TSocket, TTransport
+from gen_py.fireflys import FireflyService
+from gen_py.fireflys.ttypes import PhaseResponse
+from stack import PROTOCOLS, TRANSPORTS, SERVERS, ClientPool, make_server, wrap_client
+from ports import wait_for_ports
+
+
+class ConstantPhaseHandler:
+    """Beantwortet getPhase immer mit derselben Phase, damit nur der Thrift-Stack gemessen wird."""
+
+    def getPhase(self, id):
+        return PhaseResponse(phase=1.2345)
+
+
+def serve(port, server, transport, protocol, threads):
+    """Einstiegspunkt des Server-Prozesses."""
+    processor = FireflyService.Processor(ConstantPhaseHandler())
+    make_server(processor, port, server, transport, threads, protocol).serve()
+
+
+class CountingSocket(TSocket.TSocket):
+    """TSocket, der die gesendeten und empfangenen Bytes zählt (Nutzdaten von TCP, ohne Header)."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.sent = 0
+        self.received = 0
+
+    def write(self, buff):
+        self.sent += len(buff)
+        super().write(buff)
+
+    def read(self, sz):
+        buff = super().read(sz)
+        self.received += len(buff)
+        return buff
+
+
+def wire_bytes(port, transport, protocol, calls=200):
+    """Misst die Bytes pro getPhase-Aufruf auf der Leitung. Gibt (Anfrage, Antwort) zurück."""
+    socket = CountingSocket("localhost", port)
+    client, wrapped = wrap_client(socket, transport, protocol)
+    wrapped.open()
+    try:
+        for _ in range(calls):
+            client.getPhase(0)
+    finally:
+        wrapped.close()
+    return socket.sent / calls, socket.received / calls
+
+
+def serialization_us(protocol, iterations=20000):
+    """CPU-Zeit in µs, um Anfrage und Antwort eines getPhase-Aufrufs je einmal zu kodieren und zu dekodieren."""
+    factory = PROTOCOLS[protocol]()
+
+    def roundtrip(name, message_type, struct, empty):
+        buffer = TTransport.TMemoryBuffer()
+        oprot = factory.getProtocol(buffer)
+        oprot.writeMessageBegin(name, message_type, 0)
+        struct.write(oprot)
+        oprot.writeMessageEnd()
+        iprot = factory.getProtocol(TTransport.TMemoryBuffer(buffer.getvalue()))
+        iprot.readMessageBegin()
+        empty.read(iprot)
+        iprot.readMessageEnd()
+
+    request = FireflyService.getPhase_args(id=0)
+    response = FireflyService.getPhase_result(success=PhaseResponse(phase=1.2345))
+    start = time.process_time()
+    for _ in range(iterations):
+        roundtrip("getPhase", TMessageType.CALL, request, FireflyService.getPhase_args())
+        roundtrip("getPhase", TMessageType.REPLY, response, FireflyService.getPhase_result())
+    return (time.process_time() - start) / iterations * 1e6
+
+
+def bench_stack(port, server, transport, protocol, levels, duration):
+    """Startet einen Server mit dem Stack und misst Bytes, Serialisierung und Latenz für jede Anzahl gleichzeitiger Aufrufer."""
+    process = multiprocessing.get_context("fork").Process(
+        target=serve, args=(port, server, transport, protocol, max(levels) + 4), daemon=True)
+    process.start()
+    try:
+        if not wait_for_ports("localhost", [port], 10.0, alive=process.is_alive):
+            raise RuntimeError(f"Server für {protocol}/{transport} nicht gestartet")
+        request_bytes, response_bytes = wire_bytes(port, transport, protocol)
+        common = {
+            "protocol": protocol,
+            "transport": transport,
+            "server": server,
+            "request_bytes": request_bytes,
+            "response_bytes": response_bytes,
+            "serialize_us": serialization_us(protocol),
+        }
+        rows = []
+        for concurrency in levels:
+            pool = ClientPool(transport, protocol=protocol)
+
+            def probe(i):
+                with pool.client("localhost", port) as client:
+                    client.getPhase(i)
+
+            latencies, errors = measure_latencies(probe, [0], duration, concurrency)
+            pool.close()
+            rows.append({**common, "concurrency": concurrency,
+                         "calls_per_s": len(latencies) / duration,
+                         "latency_p50_ms": percentile(latencies, 50),
+                         "latency_p90_ms": percentile(latencies, 90),
+                         "latency_p99_ms": percentile(latencies, 99),
+                         "rpc_errors": errors})
+        return rows
+    finally:
+        process.kill()
+        process.join()
+
+
+def format_ms(value):
+    """Formatiert eine Latenz für die Tabelle; ohne erfolgreiche Aufrufe (None) steht "-"."""
+    return f"{value:>7.3f}" if value is not None else f"{'-':>7}"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Vergleicht Thrift-Protokolle und -Transporte für getPhase: Bytes auf der Leitung, "
+                                                 "CPU-Zeit der Serialisierung und Latenz bei mehreren gleichzeitigen Aufrufern")
+    parser.add_argument("--protocols", type=str, default=",".join(PROTOCOLS), help="Zu messende Protokolle (default: alle)")
+    parser.add_argument("--transports", type=str, default=",".join(TRANSPORTS), help="Zu messende Transporte (default: alle)")
+    parser.add_argument("--server", choices=SERVERS, default="threadpool",
+                        help="Server-Typ; nonblocking misst nur framed (default: threadpool)")
+    parser.add_argument("--concurrency", type=str, default="1,4,16", help="Anzahl gleichzeitiger Aufrufer (default: 1,4,16)")
+    parser.add_argument("--duration", type=float, default=3.0, help="Messdauer pro Stufe in Sekunden (default: 3)")
+    parser.add_argument("--port", type=int, default=5900, help="Port des Test-Servers (default: 5900)")
+    parser.add_argument("--output", type=str, default="thrift_stacks.json", help="Ergebnisdatei (default: thrift_stacks.json)")
+    args = parser.parse_args()
+
+    levels = [int(level) for level in args.concurrency.split(",")]
+    results = []
+    for port, (protocol, transport) in enumerate(itertools.product(args.protocols.split(","), args.transports.split(",")),
+                                                start=args.port):
+        if args.server == "nonblocking" and transport != "framed":
+            continue
+        print(f"Messe {protocol}/{transport} ...", flush=True)
+        results += bench_stack(port, args.server, transport, protocol, levels, args.duration)
+
+    print(f"{'Protokoll':<12} {'Transport':<9} {'Bytes':>6} {'Serial. µs':>10} {'Aufrufer':>8} {'Aufrufe/s':>10} {'p50 ms':>7} {'p99 ms':>7}")
+    for r in results:
+        print(f"{r['protocol']:<12} {r['transport']:<9} {r['request_bytes'] + r['response_bytes']:>6.0f} {r['serialize_us']:>10.1f} "
+              f"{r['concurrency']:>8} {r['calls_per_s']:>10.0f} {format_ms(r['latency_p50_ms'])} {format_ms(r['latency_p99_ms'])}")
+
+    try:
+        from thrift.protocol import fastbinary  # noqa: F401
+        accelerated = True
+    except ImportError:
+        accelerated = False  # accelerated misst dann die reine Python-Implementierung
+    report = {
+        "meta": {
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "fastbinary": accelerated,
+            "args": vars(args),
+        },
+        "results": results,
+    }
+    with open(args.output, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"Ergebnisse in {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,150 @@
+import json
+
+import numpy as np
+
+BASE_PORT = 5001
+
+
+class HostBlock:
+    """Zusammenhängender Block von Glühwürmchen-IDs [start, stop), den ein Host-Prozess bzw. Rechner besitzt."""
+
+    def __init__(self, index, host, port, start, stop, firefly_port=BASE_PORT):
+        """
+        :param index: Nummer des Host-Prozesses
+        :param host: Rechner, auf dem der Host-Prozess läuft
+        :param port: Port seines Servers
+        :param start: Erste eigene ID
+        :param stop: Erste ID hinter dem Block
+        :param firefly_port: Basisport, wenn jedes Glühwürmchen ein eigener Prozess ist (Glühwürmchen i auf firefly_port + i)
+        """
+        self.index = index
+        self.host = host
+        self.port = port
+        self.start = start
+        self.stop = stop
+        self.firefly_port = firefly_port
+
+    @property
+    def address(self):
+        return f"{self.host}:{self.port}"
+
+    @property
+    def ids(self):
+        return range(self.start, self.stop)
+
+    def firefly_address(self, id):
+        """Adresse des Glühwürmchens `id`, wenn es als eigener Prozess auf diesem Rechner läuft."""
+        return f"{self.host}:{self.firefly_port + id}"
+
+    def __repr__(self):
+        return f"HostBlock({self.index}, {self.address}, ids {self.start}..{self.stop - 1})"
+
+
+class Layout:
+    """Aufteilung des Gitters auf Host-Prozesse: welcher Host besitzt welche IDs."""
+
+    def __init__(self, n, m, blocks):
+        self.n = n
+        self.m = m
+        self.blocks = blocks
+        self.owners = np.empty(n * m, dtype=np.int64)  # ID -> Nummer des besitzenden Hosts
+        for block in blocks:
+            self.owners[block.start:block.stop] = block.index
+
+    def owner(self, id):
+        """Gibt den Block zurück, der die ID besitzt."""
+        return self.blocks[self.owners[id]]
+
+    def firefly_address(self, id):
+        """Adresse des Glühwürmchen-Prozesses `id` (host:port)."""
+        return self.owner(id).firefly_address(id)
+
+    def save(self, path):
+        """Schreibt das Layout als Cluster-Datei (siehe load_layout())."""
+        nodes = [{"host": block.host, "port": block.port, "ids": [block.start, block.stop],
+                  "firefly_port": block.firefly_port} for block in self.blocks]
+        with open(path, "w") as f:
+            json.dump({"n": self.n, "m": self.m, "nodes": nodes}, f, indent=2)
+
+    def group_by_owner(self, ids):
+        """Gruppiert IDs nach ihrem Host: {Blocknummer: [IDs]}."""
+        groups = {}
+        for id in ids:
+            groups.setdefault(int(self.owners[id]), []).append(int(id))
+        return groups
+
+
+def block_layout(n, m, hosts, host="localhost", base_port=BASE_PORT):
+    """Teilt das Gitter zeilenweise in `hosts` möglichst gleich große Blöcke auf (Host h auf Port base_port + h)."""
+    bounds = [round(i * n / hosts) * m for i in range(hosts + 1)]
+    blocks = [HostBlock(h, host, base_port + h, bounds[h], bounds[h + 1]) for h in range(hosts)]
+    return Layout(n, m, blocks)
+
+
+def load_layout(path, n=None, m=None):
+    """Liest eine Cluster-Datei (JSON), die Glühwürmchen-IDs auf Rechner bzw. Host-Prozesse verteilt.
+
+    Aufbau: {"n": 20, "m": 20, "nodes": [{"host": "10.0.0.1", "port": 5001, "rows": [0, 10]}, ...]}
+    Jeder Knoten besitzt entweder ganze Zeilen ("rows": [erste, hinter letzter]) oder einen ID-Bereich
+    ("ids": [start, stop]); fehlen beide bei allen Knoten, wird zeilenweise gleichmäßig aufgeteilt.
+    "port" ist der Port des Host-Prozesses (Standard: BASE_PORT + Knotennummer), "firefly_port" der
+    Basisport für einzelne Glühwürmchen-Prozesse (Standard: BASE_PORT). Die Blöcke müssen das Gitter
+    lückenlos und in aufsteigender Reihenfolge abdecken.
+
+    :param n: Erwartete Anzahl der Zeilen (optional, zur Kontrolle)
+    :param m: Erwartete Anzahl der Spalten (optional, zur Kontrolle)
+    """
+    with open(path) as f:
+        config = json.load(f)
+    if (n is not None and config["n"] != n) or (m is not None and config["m"] != m):
+        raise ValueError(f"{path} beschreibt ein {config['n']}x{config['m']}-Gitter, nicht {n}x{m}")
+    n, m, nodes = config["n"], config["m"], config["nodes"]
+    if not nodes:
+        raise ValueError(f"{path} enthält keine Knoten")
+
+    if all("rows" not in node and "ids" not in node for node in nodes):
+        bounds = [round(i * n / len(nodes)) * m for i in range(len(nodes) + 1)]
+        ranges = list(zip(bounds, bounds[1:]))
+    else:
+        ranges = []
+        for node in nodes:
+            if "rows" in node:
+                ranges.append((node["rows"][0] * m, node["rows"][1] * m))
+            elif "ids" in node:
+                ranges.append(tuple(node["ids"]))
+            else:
+                raise ValueError(f"{path}: Knoten {node.get('host')} ohne \"rows\" oder \"ids\"")
+
+    blocks = []
+    expected = 0
+    for index, (node, (start, stop)) in enumerate(zip(nodes, ranges)):
+        if start != expected or stop <= start:
+            raise ValueError(f"{path}: Knoten {index} deckt die IDs {start}..{stop - 1} ab, erwartet ab {expected}")
+        blocks.append(HostBlock(index, node.get("host", "localhost"), node.get("port", BASE_PORT + index), start, stop,
+                                firefly_port=node.get("firefly_port", BASE_PORT)))
+        expected = stop
+    if expected != n * m:
+        raise ValueError(f"{path}: Knoten decken nur {expected} von {n * m} IDs ab")
+    return Layout(n, m, blocks)
+
+
+def add_layout_arguments(parser, host_processes=False):
+    """Fügt die gemeinsamen Kommandozeilenargumente für die Cluster-Datei hinzu.
+
+    :param host_processes: Auch --host-processes anbieten (für Observer und Aggregator, die beide Betriebsarten kennen)
+    """
+    parser.add_argument("--layout", type=str, default=None,
+                        help="Cluster-Datei (JSON), die die Glühwürmchen auf Rechner und Ports verteilt (Standard: alle auf localhost)")
+    if host_processes:
+        parser.add_argument("--host-processes", action="store_true",
+                            help="Die Knoten aus --layout sind Host-Prozesse (host.py) statt einzelner Glühwürmchen")
+
+
+def layout_from_args(n, m, args, host="localhost", hosts=1):
+    """Layout aus --layout; ohne Cluster-Datei `hosts` gleich große Zeilenblöcke auf `host`.
+
+    Mit hosts=1 läuft Glühwürmchen i wie bisher auf host:BASE_PORT + i.
+    """
+    if args.layout:
+        return load_layout(args.layout, n, m)
+    return block_layout(n, m, hosts, host=host)
@@ -0,0 +1,103 @@
+import math
+import threading
+
+import numpy as np
+
+
+def initial_phase(n, m, id, seed):
+    """Startphase eines Glühwürmchens; mit Seed identisch zur Startphase derselben Zelle im Monolithen."""
+    if seed is None:
+        return float(np.random.default_rng().uniform(0, 2 * math.pi))
+    return float(np.random.default_rng(seed).uniform(0, 2 * math.pi, n * m)[id])
+
+
+class PhaseHistory:
+    """Die letzten Phasen eines Glühwürmchens, jeweils mit der Schrittnummer versehen.
+
+    Im Lockstep-Modus geht die Phase eines Nachbarn aus Schritt t nur in das eigene Update für
+    Schritt t + 1 ein. wait_for() blockiert, bis die angefragte Schrittnummer veröffentlicht ist;
+    das ist die nachbarschaftslokale Barriere. Da ein Glühwürmchen höchstens einen Schritt vor seinen
+    Nachbarn liegen kann, genügen wenige Einträge.
+    """
+
+    def __init__(self, phase, depth=8):
+        """
+        :param phase: Phase zu Schritt 0
+        :param depth: Anzahl der aufbewahrten Schritte
+        """
+        self.depth = depth
+        self.step = 0
+        self.phases = {0: phase}
+        self.condition = threading.Condition()
+        self.closed = False
+
+    def publish(self, step, phase):
+        """Veröffentlicht die Phase zu einem Schritt und weckt alle Wartenden."""
+        with self.condition:
+            self.step = step
+            self.phases[step] = phase
+            self.phases.pop(step - self.depth, None)
+            self.condition.notify_all()
+
+    def close(self):
+        """Weckt alle Wartenden; danach wird nicht mehr gewartet."""
+        with self.condition:
+            self.closed = True
+            self.condition.notify_all()
+
+    def oldest(self):
+        """Kleinste noch aufbewahrte Schrittnummer."""
+        with self.condition:
+            return min(self.phases)
+
+    def wait_for(self, step, timeout):
+        """Gibt die Phase zu `step` zurück, sobald sie vorliegt; None nach `timeout` Sekunden oder nach close().
+
+        Ist der Schritt bereits aus der Historie verdrängt, wird KeyError ausgelöst.
+        """
+        with self.condition:
+            self.condition.wait_for(lambda: self.step >= step or self.closed, timeout)
+            if self.step < step:
+                return None
+            return self.phases[step]
+
+
+class BarrierTimer:
+    """Misst, wie lange ein Glühwürmchen pro Schritt an der Barriere auf seine Nachbarn wartet."""
+
+    def __init__(self):
+        self.steps = 0
+        self.wait_time = 0.0
+        self.max_wait = 0.0
+        self.timeouts = 0  # Nachbarn, die ihre Phase nicht innerhalb der Frist geliefert haben
+
+    def record(self, wait, timeouts=0):
+        """Meldet die Wartezeit eines Schritts und die Anzahl der dabei verspäteten Nachbarn."""
+        self.steps += 1
+        self.wait_time += wait
+        self.max_wait = max(self.max_wait, wait)
+        self.timeouts += timeouts
+
+    def stats(self, elapsed=None):
+        """Gibt die Kennzahlen der Barriere zurück; mit `elapsed` auch den Anteil an der Laufzeit."""
+        stats = {
+            "barrier_wait_ms": self.wait_time / self.steps * 1000 if self.steps else 0.0,
+            "barrier_wait_max_ms": self.max_wait * 1000,
+            "barrier_timeouts": self.timeouts,
+        }
+        if elapsed:
+            stats["barrier_wait_share"] = self.wait_time / elapsed
+        return stats
+
+
+def add_lockstep_arguments(parser):
+    """Fügt die Kommandozeilenargumente für den Lockstep-Modus hinzu."""
+    parser.add_argument("--lockstep", action="store_true",
+                        help="Schritte im Gleichtakt: die Phase eines Nachbarn aus Schritt t geht nur in Schritt t + 1 ein")
+    parser.add_argument("--barrier-timeout", type=float, default=5.0,
+                        help="Höchste Wartezeit in Sekunden auf einen Nachbarn an der Barriere, danach gilt die "
+                             "Staleness-Policy (Standard: 5.0)")
+    parser.add_argument("--seed", type=int, default=None,
+                        help="Seed für die Startphase, gleiche Startphasen wie der Monolith mit demselben Seed (Standard: zufällig)")
+    parser.add_argument("--steps", type=int, default=0,
+                        help="Nach so vielen Schritten anhalten und nur noch Anfragen beantworten (Standard: 0 = unbegrenzt)")
@@ -0,0 +1,147 @@
+import time
+
+POLICIES = ("hold", "expire")
+
+
+class CircuitBreaker:
+    """Schützt den Schritt-Loop vor Aufrufen an einen nicht erreichbaren Nachbarn.
+
+    Nach `threshold` aufeinanderfolgenden Fehlern wird der Nachbar für `backoff` Sekunden nicht
+    mehr angefragt (offen). Danach ist genau ein Probeaufruf erlaubt (halb offen); schlägt auch der
+    fehl, verdoppelt sich die Sperrzeit bis höchstens `max_backoff`, bei Erfolg schließt der Breaker.
+    """
+
+    def __init__(self, threshold=2, backoff=0.5, max_backoff=8.0):
+        self.threshold = threshold
+        self.initial_backoff = backoff
+        self.max_backoff = max_backoff
+        self.backoff = backoff
+        self.failures = 0
+        self.open_until = None  # Zeitpunkt, bis zu dem keine Aufrufe erlaubt sind (None = geschlossen)
+        self.probing = False
+
+    @property
+    def open(self):
+        return self.open_until is not None
+
+    def allow(self, now=None):
+        """Gibt an, ob ein Aufruf erlaubt ist."""
+        if self.open_until is None:
+            return True
+        now = time.monotonic() if now is None else now
+        if now < self.open_until or self.probing:
+            return False
+        self.probing = True  # Ein Probeaufruf nach Ablauf der Sperrzeit
+        return True
+
+    def success(self):
+        """Meldet einen erfolgreichen Aufruf."""
+        self.failures = 0
+        self.open_until = None
+        self.probing = False
+        self.backoff = self.initial_backoff
+
+    def failure(self, now=None):
+        """Meldet einen fehlgeschlagenen Aufruf. Gibt True zurück, wenn der Breaker dadurch (erneut) öffnet."""
+        now = time.monotonic() if now is None else now
+        self.failures += 1
+        if self.probing:
+            self.backoff = min(self.max_backoff, self.backoff * 2)
+        elif self.failures < self.threshold:
+            return False
+        self.probing = False
+        self.open_until = now + self.backoff
+        return True
+
+
+class NeighborCache:
+    """Letzte gültige Phase jedes Nachbarn mit Zeitstempel, kombiniert mit einem Circuit Breaker pro Nachbar.
+
+    Staleness-Policy für Nachbarn ohne aktuelle Antwort:
+    - "hold": die letzte gültige Phase wird unbegrenzt weiterverwendet
+    - "expire": die letzte gültige Phase wird höchstens `max_age` Sekunden verwendet, danach fällt der Nachbar weg
+
+    Liefert kein Nachbar eine Phase, koppelt das Glühwürmchen in diesem Schritt nicht (siehe average()).
+    """
+
+    def __init__(self, neighbors, policy="expire", max_age=2.0, threshold=2, backoff=0.5, max_backoff=8.0):
+        """
+        :param neighbors: Schlüssel der Nachbarn (z. B. Adressen)
+        :param policy: "hold" oder "expire"
+        :param max_age: Höchstes Alter einer Phase in Sekunden bei der Policy "expire"
+        :param threshold: Aufeinanderfolgende Fehler, nach denen der Breaker öffnet
+        :param backoff: Anfängliche Sperrzeit in Sekunden
+        :param max_backoff: Größte Sperrzeit in Sekunden
+        """
+        if policy not in POLICIES:
+            raise ValueError(f"Unbekannte Staleness-Policy: {policy}")
+        self.neighbors = list(neighbors)
+        self.policy = policy
+        self.max_age = max_age
+        self.phases = {}  # Nachbar -> (Phase, Zeitpunkt des Empfangs)
+        self.breakers = {neighbor: CircuitBreaker(threshold, backoff, max_backoff) for neighbor in self.neighbors}
+
+    def should_query(self, neighbor, now=None):
+        """Gibt an, ob der Nachbar angefragt werden soll (False, solange sein Breaker offen ist)."""
+        return self.breakers[neighbor].allow(now)
+
+    def update(self, neighbor, phase, now=None):
+        """Speichert eine gültige Phase und schließt den Breaker des Nachbarn."""
+        self.phases[neighbor] = (phase, time.monotonic() if now is None else now)
+        self.breakers[neighbor].success()
+
+    def failed(self, neighbor, now=None):
+        """Meldet einen Fehler. Gibt True zurück, wenn der Breaker des Nachbarn dadurch öffnet."""
+        return self.breakers[neighbor].failure(now)
+
+    def backoff(self, neighbor):
+        """Aktuelle Sperrzeit des Nachbarn in Sekunden."""
+        return self.breakers[neighbor].backoff
+
+    def get(self, neighbor, default=None, now=None):
+        """Gibt die verwendbare Phase eines Nachbarn gemäß Policy zurück."""
+        entry = self.phases.get(neighbor)
+        if entry is None:
+            return default
+        if self.policy == "expire":
+            now = time.monotonic() if now is None else now
+            if now - entry[1] > self.max_age:
+                return default
+        return entry[0]
+
+    def values(self, now=None):
+        """Gibt die verwendbaren Phasen aller Nachbarn zurück."""
+        now = time.monotonic() if now is None else now
+        phases = (self.get(neighbor, now=now) for neighbor in self.neighbors)
+        return [phase for phase in phases if phase is not None]
+
+    def average(self, own_phase, now=None):
+        """Mittelwert der verwendbaren Nachbarphasen; ohne Nachbarn die eigene Phase (keine Kopplung)."""
+        phases = self.values(now)
+        return sum(phases) / len(phases) if phases else own_phase
+
+    def open_breakers(self):
+        """Anzahl der Nachbarn, die gerade gesperrt sind."""
+        return sum(breaker.open for breaker in self.breakers.values())
+
+
+def add_neighbor_cache_arguments(parser):
+    """Fügt die gemeinsamen Kommandozeilenargumente für Nachbar-Cache und Circuit Breaker hinzu."""
+    parser.add_argument("--staleness-policy", choices=POLICIES, default="expire",
+                        help="Umgang mit Nachbarn ohne aktuelle Antwort: letzte Phase behalten (hold) "
+                             "oder nach --max-staleness verwerfen (expire) (Standard: expire)")
+    parser.add_argument("--max-staleness", type=float, default=2.0,
+                        help="Höchstes Alter einer Nachbarphase in Sekunden bei expire (Standard: 2.0)")
+    parser.add_argument("--breaker-threshold", type=int, default=2,
+                        help="Aufeinanderfolgende Fehler, nach denen ein Nachbar gesperrt wird (Standard: 2)")
+    parser.add_argument("--breaker-backoff", type=float, default=0.5,
+                        help="Anfängliche Sperrzeit in Sekunden, verdoppelt sich bei weiteren Fehlern (Standard: 0.5)")
+    parser.add_argument("--breaker-max-backoff", type=float, default=8.0,
+                        help="Größte Sperrzeit in Sekunden (Standard: 8.0)")
+
+
+def cache_from_args(neighbors, args):
+    """Erstellt den Nachbar-Cache aus den Argumenten von add_neighbor_cache_arguments()."""
+    return NeighborCache(neighbors, policy=args.staleness_policy, max_age=args.max_staleness,
+                         threshold=args.breaker_threshold, backoff=args.breaker_backoff,
+                         max_backoff=args.breaker_max_backoff)
@@ -0,0 +1,93 @@
+import time
+from multiprocessing import shared_memory, resource_tracker
+
+import numpy as np
+
+# Teilt dieser Prozess den resource_tracker des Erzeugers (z. B. Kinder des Forkservers im Launcher)?
+SHARES_CREATOR_TRACKER = False
+
+
+def registry_name(n, m, port):
+    """Standardname des Registers für ein n x m-Gitter, dessen Glühwürmchen ab `port` lauschen."""
+    return f"fireflies_{n}x{m}_{port}"
+
+
+class PhaseRegistry:
+    """Phasenregister aller Glühwürmchen eines Rechners in einem Shared-Memory-Segment, indiziert über die ID.
+
+    Das Segment enthält zwei float64-Arrays der Länge n * m: die zuletzt geschriebene Phase und deren
+    Zeitpunkt auf der (rechnerweiten) monotonen Uhr. Zeitpunkt 0 bedeutet "noch nie geschrieben", ein
+    neu angelegtes Segment ist daher ohne Initialisierung gültig. Jedes Glühwürmchen schreibt nur seinen
+    eigenen Eintrag; Nachbarn auf demselben Rechner und der Observer lesen direkt, ohne RPC.
+
+    Wer das Register anlegt (Launcher bzw. Benchmark), gibt es mit unlink() wieder frei. Prozesse mit eigenem
+    resource_tracker, die sich nur anhängen, melden das Segment dort wieder ab: Python < 3.13 registriert auch
+    beim Anhängen und würde das Segment sonst beim Beenden des ersten Glühwürmchens für alle löschen. Prozesse,
+    die den Tracker des Erzeugers teilen (siehe share_creator_tracker()), dürfen das nicht: sie würden dessen
+    eigene Registrierung entfernen, und das Segment wäre bei einem Absturz des Erzeugers nicht mehr geschützt.
+    """
+
+    def __init__(self, name, size, create=False):
+        """
+        :param name: Name des Shared-Memory-Segments
+        :param size: Anzahl der Einträge (n * m)
+        :param create: Segment anlegen statt an ein bestehendes anhängen
+        """
+        self.name = name
+        self.size = size
+        self.shm = shared_memory.SharedMemory(name=name, create=create, size=2 * size * 8)
+        if not create and not SHARES_CREATOR_TRACKER:
+            resource_tracker.unregister(self.shm._name, "shared_memory")
+        values = np.ndarray((2, size), dtype=np.float64, buffer=self.shm.buf)
+        self.phases = values[0]
+        self.stamps = values[1]
+
+    def write(self, id, phase):
+        """Schreibt die Phase eines Glühwürmchens (ein einzelner Schreiber pro Eintrag, kein Lock nötig)."""
+        self.phases[id] = phase
+        self.stamps[id] = time.monotonic()
+
+    def read(self, id):
+        """Gibt (Phase, Zeitpunkt) eines Eintrags zurück; None, wenn das Glühwürmchen noch nie geschrieben hat."""
+        stamp = self.stamps[id]
+        if stamp == 0:
+            return None
+        return float(self.phases[id]), float(stamp)
+
+    def fill(self, neighbor_cache, neighbors):
+        """Überträgt die Phasen lokaler Nachbarn ({Schlüssel: ID}) samt Schreibzeitpunkt in einen NeighborCache.
+
+        Über den Zeitpunkt greift die Staleness-Policy auch für Nachbarn, die nicht mehr schreiben.
+        """
+        for key, id in neighbors.items():
+            entry = self.read(id)
+            if entry is not None:
+                neighbor_cache.update(key, entry[0], now=entry[1])
+
+    def snapshot(self, previous):
+        """Alle Phasen als Liste; Einträge ohne Schreibvorgang behalten ihren Wert aus `previous`."""
+        written = self.stamps > 0
+        return np.where(written, self.phases, previous).tolist()
+
+    def close(self):
+        """Löst die Abbildung des Segments (das Segment selbst bleibt bestehen)."""
+        self.phases = self.stamps = None
+        self.shm.close()
+
+    def unlink(self):
+        """Löst die Abbildung und gibt das Segment frei (nur durch den Prozess, der es angelegt hat)."""
+        self.close()
+        self.shm.unlink()
+
+
+def share_creator_tracker():
+    """Meldet, dass dieser Prozess den resource_tracker des Erzeugers des Registers teilt (vor dem Anhängen aufrufen)."""
+    global SHARES_CREATOR_TRACKER
+    SHARES_CREATOR_TRACKER = True
+
+
+def add_registry_arguments(parser):
+    """Fügt das gemeinsame Kommandozeilenargument für das Shared-Memory-Register hinzu."""
+    parser.add_argument("--shm-registry", type=str, default=None,
+                        help="Name des Shared-Memory-Phasenregisters dieses Rechners; Phasen der Glühwürmchen auf demselben "
+                             "Rechner werden direkt gelesen statt per RPC (Standard: aus, nur RPC)")
@@ -0,0 +1,188 @@
+import bz2
+import json
+import lzma
+import math
+import queue
+import struct
+import threading
+import time
+import zlib
+
+import numpy as np
+
+MAGIC = b"FFTRACE1"
+CHUNK_HEADER = struct.Struct("<II")  # Länge der komprimierten Nutzdaten, Anzahl Frames im Chunk
+CODECS = ("float32", "delta16")
+COMPRESSORS = {
+    "zlib": (lambda data: zlib.compress(data, 6), zlib.decompress),
+    "lzma": (lzma.compress, lzma.decompress),
+    "bz2": (bz2.compress, bz2.decompress),
+    "none": (bytes, bytes),
+}
+QUANT = 65536 / (2 * math.pi)  # Quantisierungsstufen pro Radiant für delta16
+
+
+def encode_frames(frames, codec):
+    """Kodiert die Frames eines Chunks (Array der Form (F, N)) als Bytes.
+
+    delta16: Phasen werden auf 16 Bit quantisiert; der erste Frame eines Chunks wird absolut,
+    alle weiteren als Differenz zum Vorgänger gespeichert (modulo 2^16). Dadurch ist jeder
+    Chunk für sich dekodierbar und die Differenzen komprimieren gut.
+    """
+    if codec == "float32":
+        return frames.astype(np.float32).tobytes()
+    quantized = (np.round(frames * QUANT).astype(np.int64) % 65536).astype(np.uint16)
+    deltas = quantized.copy()
+    deltas[1:] = quantized[1:] - quantized[:-1]  # Überlauf modulo 2^16 ist gewollt
+    return deltas.tobytes()
+
+
+def decode_frames(data, codec, count, size):
+    """Kehrt encode_frames() um und gibt ein Array der Form (count, size) mit Phasen in float64 zurück."""
+    if codec == "float32":
+        return np.frombuffer(data, dtype=np.float32).reshape(count, size).astype(np.float64)
+    deltas = np.frombuffer(data, dtype=np.uint16).reshape(count, size)
+    quantized = np.cumsum(deltas, axis=0, dtype=np.uint16)
+    return quantized.astype(np.float64) / QUANT
+
+
+class TraceWriter:
+    """Schreibt Phasen-Zeitreihen blockweise komprimiert in eine Append-only-Datei.
+
+    record() kopiert nur den aktuellen Zustand in eine Queue; Kodierung, Kompression und
+    Schreiben erledigt ein Hintergrund-Thread, damit die Simulationsschleife nicht ausgebremst wird.
+    """
+
+    def __init__(self, path, n, m, every=1, chunk_frames=64, codec="delta16", compressor="zlib", metadata=None):
+        """
+        :param path: Zieldatei
+        :param n: Anzahl der Zeilen im Gitter
+        :param m: Anzahl der Spalten im Gitter
+        :param every: Nur jeden k-ten Schritt aufzeichnen
+        :param chunk_frames: Anzahl Frames pro komprimiertem Chunk
+        :param codec: "float32" oder "delta16" (quantisierte Differenzen)
+        :param compressor: "zlib", "lzma", "bz2" oder "none"
+        :param metadata: Zusätzliche Angaben für den Dateikopf (z. B. K und OMEGA)
+        """
+        if codec not in CODECS:
+            raise ValueError(f"Unbekannter Codec: {codec}")
+        if compressor not in COMPRESSORS:
+            raise ValueError(f"Unbekannter Kompressor: {compressor}")
+        self.n = n
+        self.m = m
+        self.every = max(1, every)
+        self.chunk_frames = chunk_frames
+        self.codec = codec
+        self.compress = COMPRESSORS[compressor][0]
+        self.start_time = time.monotonic()
+        self.frames_written = 0
+
+        header = json.dumps({"n": n, "m": m, "every": self.every, "codec": codec, "compressor": compressor,
+                             "metadata": metadata or {}}).encode("utf-8")
+        self.file = open(path, "wb")
+        self.file.write(MAGIC + struct.pack("<I", len(header)) + header)
+
+        self.queue = queue.Queue()
+        self.thread = threading.Thread(target=self._write_loop, daemon=True)
+        self.thread.start()
+
+    def record(self, step, phases):
+        """Übernimmt den Zustand nach Schritt `step`, falls er aufgezeichnet werden soll."""
+        if step % self.every:
+            return
+        self.queue.put((step, time.monotonic() - self.start_time, np.array(phases, dtype=np.float64).ravel()))
+
+    def _write_loop(self):
+        """Sammelt Frames zu Chunks und schreibt sie komprimiert in die Datei."""
+        steps, times, frames = [], [], []
+        while True:
+            item = self.queue.get()
+            if item is not None:
+                steps.append(item[0])
+                times.append(item[1])
+                frames.append(item[2])
+            if frames and (item is None or len(frames) >= self.chunk_frames):
+                self._write_chunk(steps, times, frames)
+                steps, times, frames = [], [], []
+            if item is None:
+                break
+
+    def _write_chunk(self, steps, times, frames):
+        """Schreibt einen Chunk: Schrittnummern, Zeitstempel und kodierte Phasen, gemeinsam komprimiert."""
+        payload = (np.array(steps, dtype=np.int64).tobytes() + np.array(times, dtype=np.float64).tobytes()
+                   + encode_frames(np.stack(frames), self.codec))
+        compressed = self.compress(payload)
+        self.file.write(CHUNK_HEADER.pack(len(compressed), len(frames)) + compressed)
+        self.file.flush()
+        self.frames_written += len(frames)
+
+    def close(self):
+        """Schreibt die restlichen Frames und schließt die Datei."""
+        if self.file.closed:
+            return
+        self.queue.put(None)
+        self.thread.join()
+        self.file.close()
+
+
+class TraceReader:
+    """Liest eine mit TraceWriter geschriebene Datei Frame für Frame."""
+
+    def __init__(self, path):
+        self.path = path
+        with open(path, "rb") as f:
+            if f.read(len(MAGIC)) != MAGIC:
+                raise ValueError(f"{path} ist keine Trace-Datei")
+            (header_length,) = struct.unpack("<I", f.read(4))
+            header = json.loads(f.read(header_length))
+            self.data_offset = f.tell()
+        self.n = header["n"]
+        self.m = header["m"]
+        self.every = header["every"]
+        self.codec = header["codec"]
+        self.compressor = header["compressor"]
+        self.metadata = header["metadata"]
+        self.decompress = COMPRESSORS[self.compressor][1]
+
+    def chunks(self):
+        """Liefert (Schritte, Zeitstempel, Phasen[F, n * m]) für jeden Chunk der Datei."""
+        size = self.n * self.m
+        with open(self.path, "rb") as f:
+            f.seek(self.data_offset)
+            while True:
+                chunk_header = f.read(CHUNK_HEADER.size)
+                if len(chunk_header) < CHUNK_HEADER.size:
+                    break  # Dateiende (oder abgebrochener letzter Chunk)
+                length, count = CHUNK_HEADER.unpack(chunk_header)
+                compressed = f.read(length)
+                if len(compressed) < length:
+                    break
+                payload = self.decompress(compressed)
+                steps = np.frombuffer(payload, dtype=np.int64, count=count)
+                times = np.frombuffer(payload, dtype=np.float64, count=count, offset=8 * count)
+                frames = decode_frames(payload[16 * count:], self.codec, count, size)
+                yield steps, times, frames
+
+    def __iter__(self):
+        """Liefert (Schritt, Zeitstempel in s, Phasen als flaches Array) für jeden aufgezeichneten Frame."""
+        for steps, times, frames in self.chunks():
+            for step, timestamp, phases in zip(steps, times, frames):
+                yield int(step), float(timestamp), phases
+
+
+def add_trace_arguments(parser):
+    """Fügt die gemeinsamen Kommandozeilenargumente für die Aufzeichnung hinzu."""
+    parser.add_argument("--record", type=str, default=None, help="Phasenverlauf in diese Trace-Datei aufzeichnen")
+    parser.add_argument("--record-every", type=int, default=1, help="Nur jeden k-ten Schritt aufzeichnen (default: 1)")
+    parser.add_argument("--record-codec", choices=CODECS, default="delta16",
+                        help="float32 oder quantisierte 16-Bit-Differenzen (default: delta16)")
+    parser.add_argument("--record-compressor", choices=sorted(COMPRESSORS), default="zlib",
+                        help="Kompression pro Chunk (default: zlib)")
+
+
+def writer_from_args(n, m, args, metadata=None):
+    """Erstellt einen TraceWriter aus den Argumenten von add_trace_arguments() oder None, wenn nicht aufgezeichnet wird."""
+    if not args.record:
+        return None
+    return TraceWriter(args.record, n, m, every=args.record_every, codec=args.record_codec,
+                       compressor=args.record_compressor, metadata=metadata)
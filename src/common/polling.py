@@ -0,0 +1,62 @@
+MAX_POOL_SIZE = 64  # Obergrenze für parallele Abfragen eines Observers
+
+
+def pool_size(tasks, limit=MAX_POOL_SIZE):
+    """Wählt die Größe des Thread-Pools passend zur Anzahl der Abfragen pro Durchlauf."""
+    return max(1, min(tasks, limit))
+
+
+class AdaptivePollInterval:
+    """Passt das Abfrageintervall eines Observers an die gemessene Dauer der Durchläufe an.
+
+    Es ist immer nur ein Durchlauf unterwegs: Der Aufrufer wartet jeden Durchlauf vollständig ab und
+    meldet dessen Dauer über finish(). Dauert ein Durchlauf länger als das Intervall, wird das als
+    Überlauf gezählt (mit der Anzahl verpasster Takte) und das Intervall vergrößert, statt Arbeit
+    aufzustauen. Werden die Durchläufe wieder schneller, nähert es sich dem Basisintervall an.
+    """
+
+    def __init__(self, interval, max_interval=2.0, headroom=1.25, smoothing=0.2):
+        """
+        :param interval: Gewünschtes (minimales) Intervall in Sekunden
+        :param max_interval: Größtes Intervall in Sekunden
+        :param headroom: Faktor, um den das Intervall über der mittleren Durchlaufdauer liegen soll
+        :param smoothing: Gewicht eines neuen Messwerts im gleitenden Mittel der Durchlaufdauer
+        """
+        self.base_interval = interval
+        self.max_interval = max_interval
+        self.headroom = headroom
+        self.smoothing = smoothing
+        self.interval = interval
+        self.sweep_time = None  # Gleitendes Mittel der Durchlaufdauer
+        self.sweeps = 0
+        self.overruns = 0  # Durchläufe, die länger als das Intervall gedauert haben
+        self.skipped = 0  # Dadurch verpasste Takte
+
+    def finish(self, duration):
+        """Meldet die Dauer eines abgeschlossenen Durchlaufs und gibt die Wartezeit bis zum nächsten zurück."""
+        self.sweeps += 1
+        if duration > self.interval:
+            self.overruns += 1
+            self.skipped += int(duration // self.interval)
+        if self.sweep_time is None:
+            self.sweep_time = duration
+        else:
+            self.sweep_time += self.smoothing * (duration - self.sweep_time)
+        self.interval = min(self.max_interval, max(self.base_interval, self.sweep_time * self.headroom))
+        return max(0.0, self.interval - duration)
+
+    def stats(self):
+        """Gibt die Kennzahlen seit dem letzten Aufruf von reset() zurück."""
+        return {
+            "sweeps": self.sweeps,
+            "interval_ms": self.interval * 1000,
+            "sweep_ms": (self.sweep_time or 0.0) * 1000,
+            "overruns": self.overruns,
+            "skipped": self.skipped,
+        }
+
+    def reset(self):
+        """Setzt die Zähler zurück (das gelernte Intervall bleibt erhalten)."""
+        self.sweeps = 0
+        self.overruns = 0
+        self.skipped = 0
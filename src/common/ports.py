@@ -0,0 +1,30 @@
+import socket
+import time
+
+
+def port_open(host, port, timeout=0.2):
+    """Gibt an, ob auf dem Port eine Verbindung angenommen wird."""
+    try:
+        with socket.create_connection((host, port), timeout=timeout):
+            return True
+    except OSError:
+        return False
+
+
+def wait_for_ports(host, ports, timeout, alive=None):
+    """Wartet, bis alle Ports Verbindungen annehmen. Gibt True zurück, wenn das innerhalb von `timeout` gelingt.
+
+    :param alive: Optionale Funktion ohne Argumente; liefert sie False (z. B. weil ein Prozess abgestürzt ist),
+                  wird nicht weiter gewartet
+    """
+    pending = set(ports)
+    deadline = time.monotonic() + timeout
+    while pending and time.monotonic() < deadline:
+        for port in list(pending):
+            if port_open(host, port):
+                pending.discard(port)
+        if pending:
+            if alive is not None and not alive():
+                break
+            time.sleep(0.05)
+    return not pending
@@ -0,0 +1,16 @@
+import json
+import resource
+
+
+def process_usage():
+    """Gibt CPU-Zeit (User + System, in s) und maximale Speicherbelegung (RSS, in KiB) des eigenen Prozesses zurück."""
+    usage = resource.getrusage(resource.RUSAGE_SELF)
+    return {"cpu_s": usage.ru_utime + usage.ru_stime, "max_rss_kb": usage.ru_maxrss}
+
+
+def write_stats(path, **values):
+    """Schreibt Laufzeitstatistiken eines Prozesses zusammen mit dessen Ressourcenverbrauch als JSON-Datei."""
+    stats = dict(values)
+    stats.update(process_usage())
+    with open(path, "w") as f:
+        json.dump(stats, f)
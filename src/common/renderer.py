@@ -0,0 +1,56 @@
+import numpy as np
+
+MAX_CANVAS_SIZE = 800  # Maximale Kantenlänge des Fensters in Pixeln
+
+
+def cell_size_for(n, m, preferred=50):
+    """Wählt die Zellgröße so, dass das Gitter höchstens MAX_CANVAS_SIZE Pixel groß wird (mindestens 1 Pixel)."""
+    return max(1, min(preferred, MAX_CANVAS_SIZE // max(n, m)))
+
+
+def phases_to_gray(phases, sin_phase=None):
+    """Bildet Phasen in einem vektorisierten Schritt auf Graustufen ab: (sin(phase) + 1) * 127.5."""
+    if sin_phase is None:
+        sin_phase = np.sin(np.asarray(phases, dtype=np.float64))
+    return ((sin_phase + 1) * 127.5).astype(np.uint8)
+
+
+class PhaseRenderer:
+    """Zeichnet das gesamte Gitter als ein einziges Graustufenbild auf einen Tk-Canvas.
+
+    Statt ein Rechteck pro Zelle per itemconfig umzufärben, wird pro Frame ein PGM-Bild
+    erzeugt und in ein PhotoImage geladen. Unveränderte Frames werden übersprungen.
+    """
+
+    def __init__(self, canvas, n, m, cell_size):
+        """
+        :param canvas: Tk-Canvas, auf dem gezeichnet wird
+        :param n: Anzahl der Zeilen im Gitter
+        :param m: Anzahl der Spalten im Gitter
+        :param cell_size: Kantenlänge einer Zelle in Pixeln
+        """
+        import tkinter as tk
+
+        self.n = n
+        self.m = m
+        self.cell_size = cell_size
+        self.header = f"P5 {m * cell_size} {n * cell_size} 255\n".encode("ascii")
+        self.image = tk.PhotoImage(width=m * cell_size, height=n * cell_size)
+        canvas.create_image(0, 0, image=self.image, anchor="nw")
+        self.last_gray = None
+
+    def draw(self, phases, sin_phase=None):
+        """Zeichnet die Phasen (Länge n * m), falls sie sich seit dem letzten Aufruf geändert haben.
+
+        :param sin_phase: Optional bereits berechneter Sinus der Phasen (wird dann wiederverwendet)
+        :return: True, wenn neu gezeichnet wurde
+        """
+        gray = phases_to_gray(phases, sin_phase).reshape(self.n, self.m)
+        if self.last_gray is not None and np.array_equal(gray, self.last_gray):
+            return False
+        self.last_gray = gray
+
+        # Zellen auf Pixelgröße skalieren und als binäres PGM an Tk übergeben
+        pixels = np.repeat(np.repeat(gray, self.cell_size, axis=0), self.cell_size, axis=1)
+        self.image.configure(data=self.header + pixels.tobytes(), format="ppm")
+        return True
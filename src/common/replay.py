@@ -0,0 +1,87 @@
+import time
+import argparse
+
+from phase_trace import TraceReader
+from sync import SyncTracker
+
+
+def replay_headless(reader, sync_threshold, sync_window):
+    """Wertet eine Aufzeichnung ohne GUI so schnell wie möglich aus und gibt den Ordnungsparameter aus."""
+    tracker = SyncTracker(threshold=sync_threshold, window=sync_window)
+    frames = 0
+    start_time = time.perf_counter()
+    for step, timestamp, phases in reader:
+        tracker.update_phases(phases, step=step)
+        frames += 1
+        print(f"Schritt {step:>8}  t = {timestamp:9.3f} s  r = {tracker.order:.4f}")
+    elapsed = time.perf_counter() - start_time
+
+    print(f"{frames} Frames in {elapsed:.3f} s ausgewertet ({frames / elapsed if elapsed > 0 else 0:.0f} Frames/s)")
+    if tracker.synced:
+        print(f"Synchronisiert (r >= {sync_threshold}) ab Schritt {tracker.streak_start}, zuerst ab Schritt {tracker.sync_step}")
+    elif tracker.sync_step is not None:
+        print(f"Am Ende nicht mehr synchronisiert (r >= {sync_threshold}), zuerst ab Schritt {tracker.sync_step}")
+    else:
+        print(f"Nicht synchronisiert (r >= {sync_threshold})")
+
+
+def replay_gui(reader, speed):
+    """Spielt eine Aufzeichnung im Observer-Fenster ab.
+
+    :param speed: Faktor gegenüber der aufgezeichneten Zeit (0 = so schnell wie möglich)
+    """
+    import tkinter as tk
+    from renderer import PhaseRenderer, cell_size_for
+
+    root = tk.Tk()
+    root.title("Firefly Replay")
+    cell_size = cell_size_for(reader.n, reader.m)
+    canvas = tk.Canvas(root, width=reader.m * cell_size, height=reader.n * cell_size)
+    canvas.pack()
+    renderer = PhaseRenderer(canvas, reader.n, reader.m, cell_size)
+    tracker = SyncTracker()
+
+    frames = iter(reader)
+    start = {"wall": None, "trace": None}
+
+    def show_next():
+        try:
+            step, timestamp, phases = next(frames)
+        except StopIteration:
+            root.title("Firefly Replay - Ende")
+            return
+        tracker.update_phases(phases, step=step)
+        renderer.draw(phases)
+        root.title(f"Firefly Replay - Schritt {step}, r = {tracker.order:.3f}")
+
+        # Wartezeit bis zum nächsten Frame aus den aufgezeichneten Zeitstempeln ableiten
+        now = time.monotonic()
+        if start["wall"] is None:
+            start["wall"], start["trace"] = now, timestamp
+        delay = 1
+        if speed > 0:
+            due = start["wall"] + (timestamp - start["trace"]) / speed
+            delay = max(1, int((due - now) * 1000))
+        root.after(delay, show_next)
+
+    show_next()
+    root.mainloop()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Wiedergabe und Auswertung aufgezeichneter Phasenverläufe")
+    parser.add_argument("trace", type=str, help="Trace-Datei (aufgenommen mit --record)")
+    parser.add_argument("--speed", type=float, default=1.0,
+                        help="Wiedergabegeschwindigkeit relativ zur Aufnahme, 0 = so schnell wie möglich (Standard: 1.0)")
+    parser.add_argument("--no-gui", action="store_true", help="Ohne GUI auswerten und den Ordnungsparameter ausgeben")
+    parser.add_argument("--sync-threshold", type=float, default=0.99, help="Ordnungsparameter r, ab dem das Gitter als synchron gilt (Standard: 0.99)")
+    parser.add_argument("--sync-window", type=int, default=1, help="Anzahl aufeinanderfolgender Frames über dem Schwellwert (Standard: 1)")
+    args = parser.parse_args()
+
+    reader = TraceReader(args.trace)
+    print(f"Gitter {reader.n}x{reader.m}, Codec {reader.codec}/{reader.compressor}, jeder {reader.every}. Schritt, "
+          f"Metadaten: {reader.metadata}")
+    if args.no_gui:
+        replay_headless(reader, args.sync_threshold, args.sync_window)
+    else:
+        replay_gui(reader, args.speed)
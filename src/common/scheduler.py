@@ -0,0 +1,86 @@
+import math
+import time
+
+
+class StepScheduler:
+    """Taktgeber für Schritt-Loops auf der monotonen Uhr.
+
+    Statt nach der Arbeit eine feste Zeit zu schlafen, wartet wait() bis zum nächsten Fälligkeitszeitpunkt.
+    Unterschiedlich lange Arbeit (z. B. das Einsammeln der Nachbarphasen) wird so ausgeglichen und die
+    Schrittperiode bleibt konstant. Dauert ein Schritt länger als die Periode, wird das als Überlauf
+    gezählt und die verpassten Takte werden übersprungen, statt sie im Schnelldurchlauf nachzuholen.
+
+    Mit `aligned=True` liegen die Takte auf Vielfachen der Periode der (systemweiten) monotonen Uhr,
+    sodass alle Prozesse auf einem Rechner im selben Takt schalten. Periode 0 bedeutet: so schnell wie möglich.
+    """
+
+    def __init__(self, period, aligned=False, clock=time.monotonic, sleep=time.sleep):
+        """
+        :param period: Schrittperiode in Sekunden (0 = ohne Wartezeit)
+        :param aligned: Takte auf Vielfache der Periode ausrichten
+        """
+        self.period = period
+        self.clock = clock
+        self.sleep = sleep
+        now = clock()
+        self.started = now
+        if period > 0 and aligned:
+            self.deadline = math.ceil(now / period) * period
+        else:
+            self.deadline = now + period
+        self.step_start = now
+        self.steps = 0
+        self.overruns = 0  # Schritte, die ihren Fälligkeitszeitpunkt überschritten haben
+        self.missed = 0  # Dadurch übersprungene Takte
+        self.work_time = 0.0  # Summe der Arbeitszeit aller Schritte (ohne Warten)
+        self.max_lag = 0.0  # Größte Überschreitung in Sekunden
+
+    def next_delay(self):
+        """Schließt den laufenden Schritt ab und gibt die Wartezeit bis zum nächsten Takt zurück (ohne zu schlafen).
+
+        Für ereignisgesteuerte Loops, z. B. root.after() in Tk.
+        """
+        now = self.clock()
+        self.steps += 1
+        self.work_time += now - self.step_start
+        if self.period <= 0:
+            self.step_start = now
+            return 0.0
+
+        lag = now - self.deadline
+        if lag > 0:
+            # Überlauf: verpasste Takte überspringen, der Rhythmus bleibt erhalten
+            self.overruns += 1
+            self.max_lag = max(self.max_lag, lag)
+            skipped = int(lag // self.period)
+            self.missed += skipped
+            self.deadline += (skipped + 1) * self.period
+        delay = self.deadline - now
+        self.deadline += self.period
+        self.step_start = now + delay
+        return delay
+
+    def wait(self):
+        """Schließt den laufenden Schritt ab und schläft bis zum nächsten Takt."""
+        delay = self.next_delay()
+        if delay > 0:
+            self.sleep(delay)
+
+    def stats(self):
+        """Gibt die Kennzahlen des Taktgebers zurück."""
+        elapsed = self.clock() - self.started
+        return {
+            "period_s": self.period,
+            "steps": self.steps,
+            "steps_per_sec": self.steps / elapsed if elapsed > 0 else 0.0,
+            "overruns": self.overruns,
+            "missed_ticks": self.missed,
+            "max_lag_ms": self.max_lag * 1000,
+            "mean_work_ms": self.work_time / self.steps * 1000 if self.steps else 0.0,
+        }
+
+
+def add_scheduler_arguments(parser, default_period):
+    """Fügt das gemeinsame Kommandozeilenargument für die Schrittperiode hinzu."""
+    parser.add_argument("--step-period", type=float, default=default_period,
+                        help=f"Schrittperiode in Sekunden, 0 = so schnell wie möglich (Standard: {default_period})")
@@ -0,0 +1,79 @@
+import numpy as np
+
+
+def order_parameter(sin_phase, cos_phase):
+    """Berechnet den Kuramoto-Ordnungsparameter r = |mean(exp(i * phase))| aus Sinus und Kosinus der Phasen."""
+    return float(np.hypot(np.mean(cos_phase), np.mean(sin_phase)))
+
+
+def region_coherence(sin_phase, cos_phase, region_size):
+    """Berechnet den Ordnungsparameter je Kachel der Größe region_size x region_size.
+
+    Kacheln am Rand dürfen kleiner sein, wenn das Gitter nicht glatt teilbar ist.
+    """
+    row_edges = np.arange(0, sin_phase.shape[0], region_size)
+    col_edges = np.arange(0, sin_phase.shape[1], region_size)
+    sin_sum = np.add.reduceat(np.add.reduceat(sin_phase, row_edges, axis=0), col_edges, axis=1)
+    cos_sum = np.add.reduceat(np.add.reduceat(cos_phase, row_edges, axis=0), col_edges, axis=1)
+    rows = np.diff(np.append(row_edges, sin_phase.shape[0]))
+    cols = np.diff(np.append(col_edges, sin_phase.shape[1]))
+    return np.hypot(sin_sum, cos_sum) / np.outer(rows, cols)
+
+
+class SyncTracker:
+    """Verfolgt den Ordnungsparameter Schritt für Schritt und erkennt stabile Synchronisation."""
+
+    def __init__(self, threshold=0.99, window=1, region_size=None):
+        """
+        :param threshold: Ordnungsparameter r, ab dem das Gitter als synchron gilt
+        :param window: Anzahl aufeinanderfolgender Schritte, die r über dem Schwellwert liegen muss
+        :param region_size: Kantenlänge der Kacheln für die regionale Kohärenz (None = aus)
+        """
+        self.threshold = threshold
+        self.window = max(1, window)
+        self.region_size = region_size
+        self.order = None  # Aktueller Ordnungsparameter
+        self.regions = None  # Aktuelle Kohärenz je Kachel
+        self.step = 0  # Anzahl der ausgewerteten Schritte
+        self.streak = 0  # Aufeinanderfolgende Schritte über dem Schwellwert
+        self.streak_start = None  # Schritt, mit dem die aktuelle Folge über dem Schwellwert begann
+        self.sync_step = None  # Schritt, ab dem r zum ersten Mal stabil über dem Schwellwert lag (bleibt erhalten)
+
+    @property
+    def synced(self):
+        """True, solange r seit mindestens `window` Schritten über dem Schwellwert liegt (aktueller Zustand)."""
+        return self.streak >= self.window
+
+    def update(self, sin_phase, cos_phase, step=None):
+        """Wertet einen Schritt aus bereits berechnetem Sinus und Kosinus der Phasen aus und gibt r zurück."""
+        self.step = self.step + 1 if step is None else step
+        self.order = order_parameter(sin_phase, cos_phase)
+        if self.region_size:
+            self.regions = region_coherence(np.atleast_2d(sin_phase), np.atleast_2d(cos_phase), self.region_size)
+
+        if self.order >= self.threshold:
+            if not self.streak:
+                self.streak_start = self.step
+            self.streak += 1
+            if self.sync_step is None and self.streak >= self.window:
+                self.sync_step = self.streak_start
+        else:
+            self.streak = 0
+            self.streak_start = None
+        return self.order
+
+    def update_phases(self, phases, step=None):
+        """Wie update(), berechnet Sinus und Kosinus aber selbst aus den Phasen."""
+        phases = np.asarray(phases, dtype=np.float64)
+        return self.update(np.sin(phases), np.cos(phases), step)
+
+    def stats(self):
+        """Gibt den aktuellen Zustand als Dictionary zurück (z. B. für Ausgaben oder Abfragen)."""
+        return {
+            "order_parameter": self.order,
+            "synced": self.synced,
+            "sync_step": self.sync_step,
+            "synced_since": self.streak_start if self.synced else None,
+            "step": self.step,
+            "min_region_coherence": float(self.regions.min()) if self.regions is not None else None,
+        }
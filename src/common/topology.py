@@ -0,0 +1,119 @@
+import numpy as np
+
+KINDS = ("moore", "von_neumann")
+
+
+def neighbour_offsets(kind, radius):
+    """Gibt die relativen Nachbar-Offsets (dx, dy) einer Moore- bzw. Von-Neumann-Nachbarschaft zurück."""
+    offsets = []
+    for dx in range(-radius, radius + 1):
+        for dy in range(-radius, radius + 1):
+            if dx == 0 and dy == 0:
+                continue
+            if kind == "von_neumann" and abs(dx) + abs(dy) > radius:
+                continue
+            offsets.append((dx, dy))
+    return offsets
+
+
+class Topology:
+    """Vorberechneter Nachbarschaftsindex im CSR-Format.
+
+    Die Nachbarn von Zelle i stehen in indices[indptr[i]:indptr[i + 1]]. Der Kopplungsschritt
+    ist damit ein dünnbesetztes Matrix-Vektor-Produkt (Mittelwert über die Nachbarphasen).
+    """
+
+    def __init__(self, n, m, indptr, indices, stencil=False):
+        """
+        :param n: Anzahl der Zeilen im Gitter
+        :param m: Anzahl der Spalten im Gitter
+        :param indptr: Zeilenzeiger (Länge n * m + 1)
+        :param indices: Nachbar-IDs aller Zellen hintereinander
+        :param stencil: True, wenn der Index genau der 8er-Moore-Nachbarschaft auf dem Torus entspricht
+        """
+        self.n = n
+        self.m = m
+        self.indptr = indptr
+        self.indices = indices
+        self.stencil = stencil
+        self.counts = np.diff(indptr)
+        self.rows = np.repeat(np.arange(n * m), self.counts)  # Zeilen-ID jedes Eintrags
+
+    def neighbors(self, i):
+        """Gibt die Nachbar-IDs von Zelle i als Liste zurück."""
+        return self.indices[self.indptr[i]:self.indptr[i + 1]].tolist()
+
+    def mean(self, values, start=0, stop=None):
+        """Berechnet den Mittelwert der Nachbarwerte für die Zellen [start, stop).
+
+        Zellen ohne Nachbarn (z. B. bei offenem Rand) erhalten ihren eigenen Wert, koppeln also nicht.
+
+        :param values: Werte aller Zellen als flaches Array (Länge n * m)
+        """
+        stop = self.n * self.m if stop is None else stop
+        first, last = self.indptr[start], self.indptr[stop]
+        sums = np.bincount(self.rows[first:last] - start, weights=values[self.indices[first:last]],
+                           minlength=stop - start)
+        counts = self.counts[start:stop]
+        own = values[start:stop]
+        return np.divide(sums, counts, out=np.array(own, dtype=np.float64), where=counts > 0)
+
+
+def build_topology(n, m, kind="moore", radius=1, periodic=True, rewire=0.0, seed=0):
+    """Erstellt den Nachbarschaftsindex für ein n x m Gitter.
+
+    :param kind: "moore" (Quadrat) oder "von_neumann" (Raute)
+    :param radius: Radius der Nachbarschaft
+    :param periodic: True für Torus, False für offenen Rand
+    :param rewire: Wahrscheinlichkeit, mit der jede Kante auf ein zufälliges Ziel umgelenkt wird (Small-World)
+    :param seed: Seed für das Umverdrahten; alle Prozesse mit gleichem Seed erhalten denselben Index
+    """
+    if kind not in KINDS:
+        raise ValueError(f"Unbekannte Nachbarschaft: {kind}")
+
+    rows, cols = np.divmod(np.arange(n * m), m)
+    neighbour_ids = []
+    valid = []
+    for dx, dy in neighbour_offsets(kind, radius):
+        nx, ny = rows + dx, cols + dy
+        if periodic:
+            valid.append(np.ones(n * m, dtype=bool))
+        else:
+            valid.append((nx >= 0) & (nx < n) & (ny >= 0) & (ny < m))
+        neighbour_ids.append((nx % n) * m + ny % m)
+
+    # Spalten = Offsets, Zeilen = Zellen; ungültige Nachbarn (offener Rand) fallen heraus
+    neighbour_ids = np.stack(neighbour_ids, axis=1)
+    valid = np.stack(valid, axis=1)
+    indices = neighbour_ids[valid]
+    indptr = np.concatenate(([0], np.cumsum(valid.sum(axis=1))))
+
+    if rewire > 0 and n * m > 1:
+        rng = np.random.default_rng(seed)
+        owner = np.repeat(np.arange(n * m), np.diff(indptr))
+        rewired = rng.random(len(indices)) < rewire
+        targets = rng.integers(0, n * m - 1, rewired.sum())
+        # Ziele >= eigene ID um eins verschieben, damit keine Zelle mit sich selbst koppelt
+        targets += targets >= owner[rewired]
+        indices[rewired] = targets
+
+    stencil = kind == "moore" and radius == 1 and periodic and rewire == 0
+    return Topology(n, m, indptr, indices, stencil=stencil)
+
+
+def add_topology_arguments(parser):
+    """Fügt die gemeinsamen Kommandozeilenargumente für die Nachbarschaft hinzu."""
+    parser.add_argument("--topology", choices=KINDS, default="moore",
+                        help="Nachbarschaft: moore (Quadrat) oder von_neumann (Raute) (default: moore)")
+    parser.add_argument("--radius", type=int, default=1, help="Radius der Nachbarschaft (default: 1)")
+    parser.add_argument("--open", action="store_true", help="Offener Rand statt Torus")
+    parser.add_argument("--rewire", type=float, default=0.0,
+                        help="Wahrscheinlichkeit für das zufällige Umverdrahten einer Kante (default: 0)")
+    parser.add_argument("--topology-seed", type=int, default=0,
+                        help="Seed für das Umverdrahten, muss bei allen Prozessen gleich sein (default: 0)")
+
+
+def topology_from_args(n, m, args):
+    """Erstellt den Nachbarschaftsindex aus den Argumenten von add_topology_arguments()."""
+    return build_topology(n, m, kind=args.topology, radius=args.radius, periodic=not args.open,
+                          rewire=args.rewire, seed=args.topology_seed)
@@ -0,0 +1,155 @@
+import os
+import sys
+import json
+import shutil
+import argparse
+
+import numpy as np
+
+MAGIC = b"FFSTATE1"
+HEADER_SIZE = 4096  # Fester Kopfbereich, danach folgen die Phasen als float64 (n x m)
+
+
+def read_header(path):
+    """Liest den JSON-Kopf einer Zustandsdatei."""
+    with open(path, "rb") as f:
+        raw = f.read(HEADER_SIZE)
+    if raw[:len(MAGIC)] != MAGIC:
+        raise ValueError(f"{path} ist keine Zustandsdatei")
+    length = int.from_bytes(raw[len(MAGIC):len(MAGIC) + 4], "little")
+    return json.loads(raw[len(MAGIC) + 4:len(MAGIC) + 4 + length])
+
+
+def write_header(f, header):
+    """Schreibt den JSON-Kopf an den Anfang der geöffneten Zustandsdatei."""
+    data = json.dumps(header).encode("utf-8")
+    if len(MAGIC) + 4 + len(data) > HEADER_SIZE:
+        raise ValueError("Kopf der Zustandsdatei ist zu groß")
+    f.seek(0)
+    f.write(MAGIC + len(data).to_bytes(4, "little") + data.ljust(HEADER_SIZE - len(MAGIC) - 4, b" "))
+    f.flush()
+
+
+class StateFile:
+    """Simulationszustand in einer Memory-Mapped-Datei.
+
+    Der Kopf enthält n, m, K, OMEGA und den Schrittzähler, dahinter liegen die Phasen.
+    Die Simulation ist nach den Startphasen deterministisch, ein Zufallsgenerator muss nicht gesichert werden. Eine Engine kann direkt in `phases` rechnen; andere Prozesse
+    auf demselben Rechner können die Datei ohne Kopie und ohne RPC nur lesend einbinden.
+    """
+
+    def __init__(self, path, readonly=False):
+        """
+        :param path: Pfad der Zustandsdatei
+        :param readonly: Nur lesend einbinden (z. B. für einen Observer)
+        """
+        self.path = path
+        self.readonly = readonly
+        self.header = read_header(path)
+        self.n = self.header["n"]
+        self.m = self.header["m"]
+        self.phases = np.memmap(path, dtype=np.float64, mode="r" if readonly else "r+",
+                                offset=HEADER_SIZE, shape=(self.n, self.m))
+        self.file = None if readonly else open(path, "r+b")
+
+    @classmethod
+    def create(cls, path, n, m, K, OMEGA, phases):
+        """Legt eine neue Zustandsdatei mit den gegebenen Startphasen an."""
+        with open(path, "wb") as f:
+            write_header(f, {"n": n, "m": m, "K": K, "OMEGA": OMEGA, "step": 0})
+            f.truncate(HEADER_SIZE + n * m * np.dtype(np.float64).itemsize)
+        state = cls(path)
+        state.phases[:] = np.asarray(phases, dtype=np.float64).reshape(n, m)
+        state.phases.flush()
+        return state
+
+    @property
+    def step(self):
+        return self.header["step"]
+
+    @property
+    def K(self):
+        return self.header["K"]
+
+    @property
+    def OMEGA(self):
+        return self.header["OMEGA"]
+
+    def refresh(self):
+        """Liest den Kopf neu ein (für lesend eingebundene Beobachter)."""
+        self.header = read_header(self.path)
+        return self.header
+
+    def checkpoint(self, step, phases=None):
+        """Schreibt einen Checkpoint: Phasen auf die Platte bringen und Schrittzähler im Kopf aktualisieren.
+
+        :param phases: Nur nötig, wenn die Engine nicht direkt in `self.phases` rechnet
+        """
+        if phases is not None:
+            self.phases[:] = np.asarray(phases, dtype=np.float64).reshape(self.n, self.m)
+        self.phases.flush()
+        self.header["step"] = step
+        write_header(self.file, self.header)
+
+    def close(self):
+        """Gibt die Abbildung frei."""
+        if self.file is not None:
+            self.phases.flush()
+            self.file.close()
+            self.file = None
+        self.phases = None
+
+
+def fork_state(source, target):
+    """Kopiert einen Checkpoint, um von dort aus eine unabhängige Simulation fortzusetzen."""
+    shutil.copyfile(source, target)
+
+
+def view(path, interval):
+    """Zeigt eine laufende Simulation an, indem die Zustandsdatei nur lesend eingebunden wird."""
+    import tkinter as tk
+
+    sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "common"))
+    from renderer import PhaseRenderer, cell_size_for
+    from sync import SyncTracker
+
+    state = StateFile(path, readonly=True)
+    root = tk.Tk()
+    cell_size = cell_size_for(state.n, state.m)
+    canvas = tk.Canvas(root, width=state.m * cell_size, height=state.n * cell_size)
+    canvas.pack()
+    renderer = PhaseRenderer(canvas, state.n, state.m, cell_size)
+    tracker = SyncTracker()
+
+    def update_gui():
+        state.refresh()
+        tracker.update_phases(state.phases)
+        renderer.draw(state.phases)
+        root.title(f"Firefly State Viewer - Checkpoint {state.step}, r = {tracker.order:.3f}")
+        root.after(interval, update_gui)
+
+    update_gui()
+    root.mainloop()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Zustandsdateien der Glühwürmchen-Simulation")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    info_parser = subparsers.add_parser("info", help="Kopf einer Zustandsdatei ausgeben")
+    info_parser.add_argument("state", type=str)
+    view_parser = subparsers.add_parser("view", help="Laufende Simulation lesend anzeigen (ohne RPC)")
+    view_parser.add_argument("state", type=str)
+    view_parser.add_argument("--interval", type=int, default=100, help="Aktualisierungsintervall in ms (default: 100)")
+    fork_parser = subparsers.add_parser("fork", help="Checkpoint kopieren, um die Simulation abzuzweigen")
+    fork_parser.add_argument("source", type=str)
+    fork_parser.add_argument("target", type=str)
+    args = parser.parse_args()
+
+    if args.command == "info":
+        header = read_header(args.state)
+        print(f"Gitter: {header['n']}x{header['m']}, K: {header['K']}, OMEGA: {header['OMEGA']}, Schritt: {header['step']}")
+    elif args.command == "view":
+        view(args.state, args.interval)
+    else:
+        fork_state(args.source, args.target)
+        print(f"{args.source} nach {args.target} kopiert")
@@ -0,0 +1,233 @@
+import math
+import os
+from multiprocessing import Process, Barrier, Value
+from multiprocessing import shared_memory
+import numpy as np
+
+TWO_PI = 2 * math.pi
+
+
+def moore_mean(phases):
+    """Berechnet den Mittelwert der 8 Moore-Nachbarn jeder Zelle auf dem Torus.
+
+    Die letzten beiden Achsen von `phases` sind Zeilen und Spalten des Gitters.
+    """
+    # Vertikale 3er-Summe, anschließend horizontal aufsummieren
+    column_sum = phases + np.roll(phases, 1, axis=-2) + np.roll(phases, -1, axis=-2)
+    total = column_sum + np.roll(column_sum, 1, axis=-1) + np.roll(column_sum, -1, axis=-1)
+    return (total - phases) / 8
+
+
+def halo_moore_mean(block):
+    """Berechnet den Moore-Mittelwert der inneren Zeilen eines Blocks mit je einer Halo-Zeile oben und unten.
+
+    Die Spalten werden torusförmig behandelt, die Halo-Zeilen liefern die Nachbarn in Zeilenrichtung.
+    """
+    inner = block[1:-1]
+    column_sum = block[:-2] + inner + block[2:]
+    total = column_sum + np.roll(column_sum, 1, axis=-1) + np.roll(column_sum, -1, axis=-1)
+    return (total - inner) / 8
+
+
+def kuramoto_step(phases, average_phase, K, OMEGA):
+    """Berechnet die neuen Phasen nach der Update-Regel der Glühwürmchen."""
+    return (phases + OMEGA + K * np.sin(average_phase - phases)) % TWO_PI
+
+
+class VectorizedEngine:
+    """Simuliert das gesamte Gitter in einem NumPy-Array innerhalb eines Prozesses."""
+
+    def __init__(self, n, m, K, OMEGA, phases, topology=None, buffer=None):
+        """
+        :param n: Anzahl der Zeilen im Gitter
+        :param m: Anzahl der Spalten im Gitter
+        :param K: Kopplungsstärke
+        :param OMEGA: Natürliche Frequenz
+        :param phases: Startphasen (Länge n * m)
+        :param topology: Vorberechneter Nachbarschaftsindex (None = 8er-Moore-Nachbarschaft auf dem Torus)
+        :param buffer: Optionaler externer Puffer (n x m, float64), z. B. eine Memory-Mapped-Datei, in dem gerechnet wird
+        """
+        self.n = n
+        self.m = m
+        self.K = K
+        self.OMEGA = OMEGA
+        # Die Standard-Nachbarschaft wird direkt über verschobene Arrays berechnet
+        self.topology = None if topology is None or topology.stencil else topology
+        if buffer is None:
+            self.phases = np.array(phases, dtype=np.float64).reshape(n, m)
+        else:
+            self.phases = buffer
+            self.phases[:] = np.asarray(phases, dtype=np.float64).reshape(n, m)
+        self.step_count = 0
+        self._trig = None  # Zwischengespeicherter (Sinus, Kosinus) der aktuellen Phasen
+
+    def step(self, count=1):
+        """Führt `count` synchrone Simulationsschritte für alle Zellen aus."""
+        for _ in range(count):
+            if self.topology is None:
+                average_phase = moore_mean(self.phases)
+            else:
+                average_phase = self.topology.mean(self.phases.ravel()).reshape(self.n, self.m)
+            self.phases[:] = kuramoto_step(self.phases, average_phase, self.K, self.OMEGA)
+            self.step_count += 1
+        self._trig = None
+
+    def get_phases(self):
+        """Gibt die aktuellen Phasen als flaches Array zurück."""
+        return self.phases.ravel()
+
+    def trig(self):
+        """Gibt Sinus und Kosinus der aktuellen Phasen (n x m) zurück, einmal pro Schritt berechnet."""
+        if self._trig is None:
+            self._trig = (np.sin(self.phases), np.cos(self.phases))
+        return self._trig
+
+    def close(self):
+        """Gibt Ressourcen frei (für den Single-Prozess-Betrieb nichts zu tun)."""
+        pass
+
+
+def row_blocks(n, workers):
+    """Teilt die n Zeilen in `workers` möglichst gleich große zusammenhängende Blöcke auf."""
+    bounds = [round(i * n / workers) for i in range(workers + 1)]
+    return [(bounds[i], bounds[i + 1]) for i in range(workers)]
+
+
+def shard_worker(buffer_names, trig_names, n, m, K, OMEGA, topology, row_start, row_stop, steps, running,
+                 start_barrier, step_barrier, done_barrier):
+    """Berechnet die Zeilen [row_start, row_stop) des Gitters im Doppelpuffer.
+
+    Gelesen wird nur der eigene Block plus je eine Halo-Zeile der Nachbarblöcke aus dem
+    aktuellen Puffer, geschrieben wird ausschließlich der eigene Block im anderen Puffer.
+    Die Schritt-Barriere sorgt dafür, dass kein Worker den nächsten Schritt beginnt,
+    bevor alle den aktuellen abgeschlossen haben. Sind `trig_names` gesetzt, schreibt der
+    Worker zusätzlich Sinus und Kosinus der neuen Phasen seines Blocks in den Shared Memory.
+    Mit einem allgemeinen Nachbarschaftsindex (`topology`) liest der Worker die Nachbarn
+    seiner Zeilen direkt aus dem gesamten aktuellen Puffer.
+    """
+    segments = [shared_memory.SharedMemory(name=name) for name in buffer_names + trig_names]
+    buffers = [np.ndarray((n, m), dtype=np.float64, buffer=segment.buf) for segment in segments]
+    trig = buffers[2:]
+    halo_rows = np.arange(row_start - 1, row_stop + 1) % n
+    current = 0
+    try:
+        while True:
+            start_barrier.wait()
+            if not running.value:
+                break
+            for _ in range(steps.value):
+                if topology is None:
+                    block = buffers[current][halo_rows]
+                    new_phases = kuramoto_step(block[1:-1], halo_moore_mean(block), K, OMEGA)
+                else:
+                    source = buffers[current].ravel()
+                    average_phase = topology.mean(source, row_start * m, row_stop * m).reshape(-1, m)
+                    new_phases = kuramoto_step(buffers[current][row_start:row_stop], average_phase, K, OMEGA)
+                buffers[1 - current][row_start:row_stop] = new_phases
+                if trig:
+                    np.sin(new_phases, out=trig[0][row_start:row_stop])
+                    np.cos(new_phases, out=trig[1][row_start:row_stop])
+                current = 1 - current
+                step_barrier.wait()
+            done_barrier.wait()
+    finally:
+        del buffers, trig
+        for segment in segments:
+            segment.close()
+
+
+class ShardedEngine:
+    """Verteilt das Gitter zeilenblockweise auf mehrere Worker-Prozesse.
+
+    Die Phasen liegen in zwei Shared-Memory-Puffern (Doppelpuffer), zwischen den Schritten
+    synchronisieren sich die Worker über eine Barriere.
+    """
+
+    def __init__(self, n, m, K, OMEGA, phases, workers=None, trig=False, topology=None):
+        """
+        :param n: Anzahl der Zeilen im Gitter
+        :param m: Anzahl der Spalten im Gitter
+        :param K: Kopplungsstärke
+        :param OMEGA: Natürliche Frequenz
+        :param phases: Startphasen (Länge n * m)
+        :param workers: Anzahl der Worker-Prozesse (Standard: Anzahl der CPU-Kerne)
+        :param trig: Sinus und Kosinus der Phasen in jedem Schritt parallel in den Workern mitberechnen
+        :param topology: Vorberechneter Nachbarschaftsindex (None = 8er-Moore-Nachbarschaft auf dem Torus)
+        """
+        self.n = n
+        self.m = m
+        self.K = K
+        self.OMEGA = OMEGA
+        self.workers = max(1, min(workers or os.cpu_count() or 1, n))
+        self.topology = None if topology is None or topology.stencil else topology
+        self.step_count = 0
+
+        size = n * m * np.dtype(np.float64).itemsize
+        self.segments = [shared_memory.SharedMemory(create=True, size=size) for _ in range(4 if trig else 2)]
+        self.buffers = [np.ndarray((n, m), dtype=np.float64, buffer=segment.buf) for segment in self.segments]
+        self.buffers[0][:] = np.asarray(phases, dtype=np.float64).reshape(n, m)
+        self.current = 0
+        self._trig = None
+        if trig:
+            np.sin(self.buffers[0], out=self.buffers[2])
+            np.cos(self.buffers[0], out=self.buffers[3])
+
+        self.steps = Value('i', 0, lock=False)
+        self.running = Value('b', True, lock=False)
+        self.start_barrier = Barrier(self.workers + 1)
+        self.step_barrier = Barrier(self.workers)
+        self.done_barrier = Barrier(self.workers + 1)
+
+        names = [segment.name for segment in self.segments]
+        self.processes = []
+        for row_start, row_stop in row_blocks(n, self.workers):
+            p = Process(target=shard_worker,
+                        args=(names[:2], names[2:], n, m, K, OMEGA, self.topology, row_start, row_stop,
+                              self.steps, self.running,
+                              self.start_barrier, self.step_barrier, self.done_barrier),
+                        daemon=True)
+            self.processes.append(p)
+            p.start()
+
+    def step(self, count=1):
+        """Führt `count` Schritte auf allen Workern aus und wartet auf deren Abschluss."""
+        self.steps.value = count
+        self.start_barrier.wait()
+        self.done_barrier.wait()
+        self.current = (self.current + count) % 2
+        self.step_count += count
+        self._trig = None
+
+    def get_phases(self):
+        """Gibt die aktuellen Phasen als flaches Array (Sicht auf den Shared Memory) zurück."""
+        return self.buffers[self.current].ravel()
+
+    def trig(self):
+        """Gibt Sinus und Kosinus der aktuellen Phasen (n x m) zurück.
+
+        Mit trig=True haben die Worker sie bereits im Schritt berechnet, sonst geschieht es hier einmal pro Schritt.
+        """
+        if len(self.buffers) == 4:
+            return self.buffers[2], self.buffers[3]
+        if self._trig is None:
+            phases = self.buffers[self.current]
+            self._trig = (np.sin(phases), np.cos(phases))
+        return self._trig
+
+    def close(self):
+        """Beendet die Worker und gibt den Shared Memory frei."""
+        if not self.processes:
+            return
+        self.running.value = False
+        self.start_barrier.wait()
+        for p in self.processes:
+            p.join()
+        self.processes = []
+        del self.buffers
+        self._trig = None
+        for segment in self.segments:
+            segment.unlink()
+            try:
+                segment.close()
+            except BufferError:
+                pass  # Noch existierende Sichten (z. B. aus get_phases) halten den Puffer offen
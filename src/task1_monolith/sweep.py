@@ -0,0 +1,139 @@
+import os
+import csv
+import time
+import math
+import argparse
+import itertools
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy as np
+
+from engine import moore_mean, kuramoto_step
+
+FIELDS = ["n", "m", "K", "OMEGA", "seed", "steps", "synced", "sync_step", "sync_time_s",
+          "final_order", "steps_per_sec", "batch_size"]
+
+
+def parse_range(text, type=float):
+    """Liest Werte als Liste ("0.1,0.2,0.5") oder als Bereich "start:stop:anzahl" (Endpunkt inklusive) ein."""
+    if ':' in text:
+        start, stop, num = text.split(':')
+        values = np.linspace(type(start), type(stop), int(num))
+        return [type(v) for v in (np.round(values) if type is int else np.round(values, 12))]
+    return [type(v) for v in text.split(',')]
+
+
+def parse_sizes(text):
+    """Liest Gittergrößen der Form "10x10,50x80" ein."""
+    sizes = []
+    for size in text.split(','):
+        n, m = size.lower().split('x')
+        sizes.append((int(n), int(m)))
+    return sizes
+
+
+def run_batch(n, m, runs, steps, sync_threshold, sync_window):
+    """Simuliert mehrere unabhängige Gitter gleicher Größe gemeinsam in einem Array der Form (B, n, m).
+
+    :param runs: Liste von (K, OMEGA, seed), eine Zeile pro Gitter
+    :return: Liste von Ergebniszeilen (Dictionaries mit den Feldern aus FIELDS)
+    """
+    batch = len(runs)
+    K = np.array([run[0] for run in runs], dtype=np.float64).reshape(batch, 1, 1)
+    OMEGA = np.array([run[1] for run in runs], dtype=np.float64).reshape(batch, 1, 1)
+    phases = np.stack([np.random.default_rng(run[2]).uniform(0, 2 * math.pi, (n, m)) for run in runs])
+
+    streak = np.zeros(batch, dtype=np.int64)  # Aufeinanderfolgende Schritte über dem Schwellwert
+    sync_step = np.full(batch, -1, dtype=np.int64)
+    step_times = np.zeros(steps + 1)
+    order = np.zeros(batch)
+
+    start_time = time.perf_counter()
+    step = 0
+    while step < steps:
+        phases = kuramoto_step(phases, moore_mean(phases), K, OMEGA)
+        step += 1
+        order = np.hypot(np.cos(phases).mean(axis=(1, 2)), np.sin(phases).mean(axis=(1, 2)))
+        step_times[step] = time.perf_counter() - start_time
+
+        streak = np.where(order >= sync_threshold, streak + 1, 0)
+        newly_synced = (sync_step < 0) & (streak >= sync_window)
+        sync_step[newly_synced] = step - sync_window + 1
+        if (sync_step >= 0).all():
+            break  # Alle Gitter des Batches sind synchron
+    elapsed = time.perf_counter() - start_time
+
+    steps_per_sec = step / elapsed if elapsed > 0 else float('inf')
+    results = []
+    for b, (k, omega, seed) in enumerate(runs):
+        synced = bool(sync_step[b] >= 0)
+        results.append({
+            "n": n,
+            "m": m,
+            "K": k,
+            "OMEGA": omega,
+            "seed": seed,
+            "steps": step,
+            "synced": synced,
+            "sync_step": int(sync_step[b]) if synced else "",
+            "sync_time_s": f"{step_times[sync_step[b]]:.6f}" if synced else "",
+            "final_order": f"{order[b]:.6f}",
+            "steps_per_sec": f"{steps_per_sec:.1f}",
+            "batch_size": batch,
+        })
+    return results
+
+
+def build_batches(sizes, K_values, OMEGA_values, seeds, batch_size):
+    """Bildet aus allen Parameterkombinationen Batches mit jeweils gleicher Gittergröße."""
+    batches = []
+    for n, m in sizes:
+        runs = list(itertools.product(K_values, OMEGA_values, seeds))
+        for i in range(0, len(runs), batch_size):
+            batches.append((n, m, runs[i:i + batch_size]))
+    return batches
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Parameter-Sweep der Glühwürmchen-Simulation (headless, gebündelt)")
+    parser.add_argument('--K', type=str, default='0.1', help='Kopplungsstärken als Liste "a,b,c" oder Bereich "start:stop:anzahl" (default: 0.1)')
+    parser.add_argument('--OMEGA', type=str, default='0.75', help='Natürliche Frequenzen als Liste oder Bereich (default: 0.75)')
+    parser.add_argument('--sizes', type=str, default='10x10', help='Gittergrößen als Liste "n x m", z. B. "10x10,50x50" (default: 10x10)')
+    parser.add_argument('--seeds', type=str, default='0', help='Seeds der Startphasen als Liste oder Bereich (default: 0)')
+    parser.add_argument('--steps', type=int, default=1000, help='Maximale Anzahl der Schritte pro Lauf (default: 1000)')
+    parser.add_argument('--sync-threshold', type=float, default=0.99, help='Ordnungsparameter r, ab dem ein Gitter als synchron gilt (default: 0.99)')
+    parser.add_argument('--sync-window', type=int, default=1, help='Anzahl aufeinanderfolgender Schritte über dem Schwellwert (default: 1)')
+    parser.add_argument('--batch-size', type=int, default=64, help='Maximale Anzahl der Gitter pro Batch (default: 64)')
+    parser.add_argument('--processes', type=int, default=None, help='Anzahl der Worker-Prozesse (default: Anzahl der CPU-Kerne)')
+    parser.add_argument('--output', type=str, default='sweep.csv', help='Ausgabedatei für die Ergebnistabelle (default: sweep.csv)')
+    args = parser.parse_args()
+
+    K_values = parse_range(args.K)
+    OMEGA_values = parse_range(args.OMEGA)
+    seeds = parse_range(args.seeds, type=int)
+    sizes = parse_sizes(args.sizes)
+    batches = build_batches(sizes, K_values, OMEGA_values, seeds, args.batch_size)
+    total_runs = sum(len(runs) for _, _, runs in batches)
+    processes = args.processes or os.cpu_count() or 1
+
+    print(f"Läufe: {total_runs} in {len(batches)} Batches auf {processes} Prozessen")
+
+    start_time = time.perf_counter()
+    done = 0
+    with open(args.output, 'w', newline='') as f, ProcessPoolExecutor(max_workers=processes) as executor:
+        writer = csv.DictWriter(f, fieldnames=FIELDS)
+        writer.writeheader()
+        futures = [executor.submit(run_batch, n, m, runs, args.steps, args.sync_threshold, args.sync_window)
+                   for n, m, runs in batches]
+        for future in as_completed(futures):
+            rows = future.result()
+            writer.writerows(rows)
+            done += len(rows)
+            print(f"{done}/{total_runs} Läufe abgeschlossen")
+    elapsed = time.perf_counter() - start_time
+
+    print(f"Fertig: {total_runs} Läufe in {elapsed:.1f} s ({total_runs / elapsed * 3600:.0f} Läufe/h), Ergebnisse in {args.output}")
+
+
+if __name__ == '__main__':
+    main()
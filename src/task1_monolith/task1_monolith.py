@@ -1,54 +1,175 @@
+import os
 import sys
-import tkinter as tk
 from multiprocessing import Process, Value, Array, freeze_support
 import time
 import math
-import random
 import argparse
+import json
 
-# Torus-Helferfunktion für Nachbarschaftszugriff
-def torus_index(i, size):
-    """Berechnet den torusförmigen Index."""
-    return (i + size) % size
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "common"))
+
+from engine import VectorizedEngine, ShardedEngine
+from checkpoint import StateFile, fork_state
+from sync import SyncTracker
+from renderer import PhaseRenderer, cell_size_for
+from topology import add_topology_arguments, topology_from_args
+from phase_trace import add_trace_arguments, writer_from_args
+from scheduler import StepScheduler, add_scheduler_arguments
 
 # Funktion für den einzelnen Glühwürmchen-Prozess
-def firefly_process(x, y, phases, running, n, m, K, OMEGA):
-    """Simuliert ein Glühwürmchen im Torus."""
+def firefly_process(idx, neighbors, phases, running, K, OMEGA, step_period=0.08):
+    """Simuliert ein Glühwürmchen mit vorberechneter Nachbarliste.
+
+    Alle Prozesse schalten im selben Takt der monotonen Uhr (unabhängig von der Rechenzeit pro Schritt).
+    """
+    scheduler = StepScheduler(step_period, aligned=True)
     while running.value:
-        neighbors_phase = 0
-        neighbors_count = 0
-        for dx in [-1, 0, 1]:
-            for dy in [-1, 0, 1]:
-                if dx != 0 or dy != 0:
-                    nx = torus_index(x + dx, n)
-                    ny = torus_index(y + dy, m)
-                    neighbors_phase += phases[nx * m + ny]
-                    neighbors_count += 1
-        average_phase = neighbors_phase / neighbors_count
-        idx = x * m + y
+        if neighbors:
+            average_phase = sum(phases[neighbor] for neighbor in neighbors) / len(neighbors)
+        else:
+            average_phase = phases[idx]  # Keine Nachbarn (offener Rand): keine Kopplung
         phases[idx] = (phases[idx] + OMEGA + K * math.sin(average_phase - phases[idx])) % (2 * math.pi)
-        time.sleep(0.08)
+        scheduler.wait()
 
-def main():
-    # Parameter für die Simulation über Kommandozeilenargumente einlesen
-    parser = argparse.ArgumentParser(description="Synchronisation der Glühwürmchen Simulation")
-    parser.add_argument('n', type=int, help='Anzahl der Zeilen (Höhe des Gitters)')
-    parser.add_argument('m', type=int, help='Anzahl der Spalten (Breite des Gitters)')
-    parser.add_argument('--K', type=float, default=0.1, help='Kopplungsstärke (default: 0.1)')
-    parser.add_argument('--OMEGA', type=float, default=0.75, help='Natürliche Frequenz (default: 0.75)')
-    args = parser.parse_args()
+def load_initial_state(args):
+    """Bestimmt die Startphasen: aus einer Zustandsdatei (Fortsetzen bzw. Abzweigen) oder zufällig per Seed.
+
+    :return: (Zustandsdatei oder None, Startphasen, Startschritt)
+    """
+    if args.fork_from:
+        fork_state(args.fork_from, args.state)
+    if args.state and os.path.exists(args.state):
+        state = StateFile(args.state)
+        if (state.n, state.m) != (args.n, args.m):
+            sys.exit(f"{args.state} enthält ein {state.n}x{state.m}-Gitter, nicht {args.n}x{args.m}")
+        # Ohne explizite Angabe gelten die Parameter des Checkpoints
+        args.K = state.K if args.K is None else args.K
+        args.OMEGA = state.OMEGA if args.OMEGA is None else args.OMEGA
+        state.header["K"], state.header["OMEGA"] = args.K, args.OMEGA  # Checkpoints halten die aktuellen Parameter fest
+        print(f"Fortgesetzt aus {args.state} bei Schritt {state.step}")
+        return state, np.array(state.phases).ravel(), state.step
+
+    args.K = 0.1 if args.K is None else args.K
+    args.OMEGA = 0.75 if args.OMEGA is None else args.OMEGA
+    rng = np.random.default_rng(args.seed)
+    initial_phases = rng.uniform(0, 2 * math.pi, args.n * args.m)
+    state = StateFile.create(args.state, args.n, args.m, args.K, args.OMEGA, initial_phases) if args.state else None
+    return state, initial_phases, 0
+
+def create_engine(args, initial_phases, topology, state=None, start_step=0, trig=False):
+    """Erstellt die gewählte Simulations-Engine (nicht für den Prozess-Modus)."""
+    if args.engine == 'sharded':
+        # Zeilenblöcke im Shared Memory, ein Worker pro Kern
+        engine = ShardedEngine(args.n, args.m, args.K, args.OMEGA, initial_phases, workers=args.workers,
+                               trig=trig, topology=topology)
+        print(f"Worker-Prozesse: {engine.workers}")
+    else:
+        # Gesamtes Gitter als NumPy-Array in einem Prozess, mit Zustandsdatei direkt in deren Abbildung
+        engine = VectorizedEngine(args.n, args.m, args.K, args.OMEGA, initial_phases, topology=topology,
+                                  buffer=state.phases if state is not None else None)
+    engine.step_count = start_step
+    return engine
+
+def save_checkpoint(state, step, engine=None, phases=None):
+    """Schreibt einen Checkpoint; rechnet die Engine direkt in der Zustandsdatei, entfällt das Kopieren."""
+    if isinstance(engine, VectorizedEngine):
+        state.checkpoint(step)
+    else:
+        state.checkpoint(step, engine.get_phases() if engine is not None else phases)
+
+def create_recorder(args):
+    """Erstellt den optionalen Trace-Recorder mit den Simulationsparametern als Metadaten."""
+    return writer_from_args(args.n, args.m, args, metadata={"K": args.K, "OMEGA": args.OMEGA, "engine": args.engine})
+
+def create_tracker(args):
+    """Erstellt den Tracker für den Ordnungsparameter aus den Kommandozeilenargumenten."""
+    return SyncTracker(threshold=args.sync_threshold, window=args.sync_window, region_size=args.region_size)
+
+def run_headless(args, initial_phases, topology, state=None, start_step=0):
+    """Simuliert ohne GUI und ohne feste Wartezeit so schnell wie möglich und gibt eine Zusammenfassung aus."""
+    engine = create_engine(args, initial_phases, topology, state, start_step, trig=True)
+    tracker = create_tracker(args)
+    recorder = create_recorder(args)
+    step_times = {}  # Zeitpunkte der Schritte im aktuellen Synchronisationsfenster
+    sync_time = None
+    start_time = time.perf_counter()
+    try:
+        while engine.step_count - start_step < args.steps:
+            engine.step()
+            tracker.update(*engine.trig(), step=engine.step_count)
+            if recorder is not None:
+                recorder.record(engine.step_count, engine.get_phases())
+            if state is not None and args.checkpoint_every and engine.step_count % args.checkpoint_every == 0:
+                save_checkpoint(state, engine.step_count, engine)
+            if sync_time is None:
+                if tracker.streak:
+                    step_times[engine.step_count] = time.perf_counter() - start_time
+                else:
+                    step_times.clear()
+                if tracker.synced:
+                    sync_time = step_times[tracker.sync_step]
+                    if args.until_sync:
+                        break
+        elapsed = time.perf_counter() - start_time
+        if state is not None:
+            save_checkpoint(state, engine.step_count, engine)
+    finally:
+        engine.close()
+        if recorder is not None:
+            recorder.close()
+
+    final_order = tracker.order
+    sync_step = tracker.sync_step
+
+    steps_run = engine.step_count - start_step
+    steps_per_sec = steps_run / elapsed if elapsed > 0 else float('inf')
+    summary = {
+        "n": args.n,
+        "m": args.m,
+        "K": args.K,
+        "OMEGA": args.OMEGA,
+        "engine": args.engine,
+        "steps": steps_run,
+        "final_step": engine.step_count,
+        "elapsed_s": elapsed,
+        "steps_per_sec": steps_per_sec,
+        "cell_updates_per_sec": steps_per_sec * args.n * args.m,
+        "order_parameter": final_order,
+        "sync_threshold": args.sync_threshold,
+        "sync_window": args.sync_window,
+        "sync_step": sync_step,
+        "sync_time_s": sync_time,
+    }
+    if tracker.regions is not None:
+        summary["region_size"] = args.region_size
+        summary["min_region_coherence"] = float(tracker.regions.min())
+
+    # Ausgabe der Zusammenfassung
+    print(f"Schritte: {summary['steps']} in {elapsed:.3f} s "
+          f"({steps_per_sec:.1f} Schritte/s, {summary['cell_updates_per_sec']:.3g} Zellen-Updates/s)")
+    print(f"Ordnungsparameter r: {final_order:.4f}")
+    if tracker.regions is not None:
+        print(f"Minimale Kohärenz je {args.region_size}x{args.region_size}-Region: {summary['min_region_coherence']:.4f}")
+    if sync_step is not None:
+        print(f"Synchronisiert (r >= {args.sync_threshold}) nach {sync_step} Schritten ({sync_time:.3f} s)")
+    else:
+        print(f"Nicht synchronisiert (r >= {args.sync_threshold}) innerhalb von {summary['steps']} Schritten")
+    if args.summary:
+        with open(args.summary, 'w') as f:
+            json.dump(summary, f, indent=2)
+    return summary
+
+def run_gui(args, initial_phases, topology, state=None, start_step=0):
+    """Startet die Simulation mit Tk-Visualisierung."""
+    import tkinter as tk
 
     n = args.n
     m = args.m
     K = args.K
     OMEGA = args.OMEGA
-    STEP_INTERVAL = 0.08  # Zeitintervall für die Updates
-
-    # Ausgabe
-    print(f"Anzahl der Spalten (m): {m}")
-    print(f"Anzahl der Zeilen (n): {n}")
-    print(f"Kopplungsstärke (k): {K}")
-    print(f"Natürliche Frequenz (OMEGA): {OMEGA}")
+    scheduler = StepScheduler(args.step_period)  # Takt für die Updates der GUI
 
     # Kontrollvariable zum Stoppen der Prozesse
     running = Value('b', True)  # Shared Boolean für alle Prozesse
@@ -56,43 +177,70 @@ def main():
     # Erstelle GUI
     root = tk.Tk()
     root.title("Synchronisation der Glühwürmchen")
-    canvas = tk.Canvas(root, width=m * 50, height=n * 50)
+    cell_size = cell_size_for(n, m)
+    canvas = tk.Canvas(root, width=m * cell_size, height=n * cell_size)
     canvas.pack()
 
-    # Initialisiere Glühwürmchen-Gitter
-    rectangles = [[None for _ in range(m)] for _ in range(n)]
+    # Das gesamte Gitter wird als ein Bild gezeichnet
+    renderer = PhaseRenderer(canvas, n, m, cell_size)
 
-    # Gemeinsamer Speicher für Phasen der Glühwürmchen
-    phases = Array('d', [random.uniform(0, 2 * math.pi) for _ in range(n * m)])
+    # Ordnungsparameter wird in der Titelzeile angezeigt
+    tracker = create_tracker(args)
+    recorder = create_recorder(args)
 
-
-    # Prozesse für die Glühwürmchen erstellen
     processes = []
-    for i in range(n):
-        for j in range(m):
-            x0, y0 = (j * 50, i * 50)
-            x1, y1 = (x0 + 50, y0 + 50)
-            rectangles[i][j] = canvas.create_rectangle(x0, y0, x1, y1, fill='black')
-            p = Process(target=firefly_process, args=(i, j, phases, running, n, m, K, OMEGA))
+    engine = None
+    if args.engine == 'process':
+        # Gemeinsamer Speicher für Phasen der Glühwürmchen
+        phases = Array('d', initial_phases)
+
+        # Prozesse für die Glühwürmchen erstellen
+        for idx in range(n * m):
+            p = Process(target=firefly_process,
+                        args=(idx, topology.neighbors(idx), phases, running, K, OMEGA, args.step_period))
             processes.append(p)
             p.start()
+    else:
+        # Die Engine rechnet im GUI-Takt
+        engine = create_engine(args, initial_phases, topology, state, start_step)
+        phases = engine.get_phases()
 
     # Funktion zur Aktualisierung der GUI
     def update_gui():
+        nonlocal phases
         if running.value:
-            for i in range(n):
-                for j in range(m):
-                    idx = i * m + j
-                    phase = phases[idx]
-                    color = int((math.sin(phase) + 1) * 127.5)
-                    canvas.itemconfig(rectangles[i][j], fill=f'#{color:02x}{color:02x}{color:02x}')
-            root.after(int(STEP_INTERVAL * 1000), update_gui)
+            if engine is not None:
+                engine.step()
+                phases = engine.get_phases()
+                sin_phase, cos_phase = engine.trig()
+            else:
+                snapshot = np.frombuffer(phases.get_obj())
+                sin_phase, cos_phase = np.sin(snapshot), np.cos(snapshot)
+            tracker.update(sin_phase, cos_phase)
+            root.title(f"Synchronisation der Glühwürmchen - r = {tracker.order:.3f}"
+                       + (" (synchron)" if tracker.synced else ""))
+            renderer.draw(phases, sin_phase)
+            step = engine.step_count if engine is not None else start_step + tracker.step
+            if recorder is not None:
+                recorder.record(step, phases[:] if engine is None else phases)
+            if state is not None and args.checkpoint_every and step % args.checkpoint_every == 0:
+                save_checkpoint(state, step, engine, phases[:])
+            root.after(max(1, int(scheduler.next_delay() * 1000)), update_gui)
 
     # Funktion zum Beenden der Prozesse und Schließen des Programms
     def on_closing():
+        nonlocal phases
         running.value = False
         for p in processes:
             p.join()
+        if state is not None:
+            save_checkpoint(state, engine.step_count if engine is not None else start_step + tracker.step,
+                            engine, phases[:])
+        if engine is not None:
+            phases = None
+            engine.close()
+        if recorder is not None:
+            recorder.close()
         root.destroy()
         sys.exit()
 
@@ -105,6 +253,75 @@ def main():
     # Haupt-Loop für die GUI
     root.mainloop()
 
+def main():
+    # Parameter für die Simulation über Kommandozeilenargumente einlesen
+    parser = argparse.ArgumentParser(description="Synchronisation der Glühwürmchen Simulation")
+    parser.add_argument('n', type=int, help='Anzahl der Zeilen (Höhe des Gitters)')
+    parser.add_argument('m', type=int, help='Anzahl der Spalten (Breite des Gitters)')
+    parser.add_argument('--K', type=float, default=None, help='Kopplungsstärke (default: 0.1 bzw. Wert aus dem Checkpoint)')
+    parser.add_argument('--OMEGA', type=float, default=None, help='Natürliche Frequenz (default: 0.75 bzw. Wert aus dem Checkpoint)')
+    parser.add_argument('--engine', choices=['process', 'vectorized', 'sharded'], default=None,
+                        help='Simulationsmodus: ein Prozess pro Glühwürmchen, NumPy-Gitter in einem Prozess '
+                             'oder zeilenblockweise auf mehrere Kerne verteilt (default: process, headless: vectorized)')
+    parser.add_argument('--workers', type=int, default=None,
+                        help='Anzahl der Worker-Prozesse für --engine sharded (default: Anzahl der CPU-Kerne)')
+    add_topology_arguments(parser)
+    add_trace_arguments(parser)
+    add_scheduler_arguments(parser, 0.08)
+    parser.add_argument('--seed', type=int, default=None, help='Seed für die zufälligen Startphasen (default: zufällig)')
+    parser.add_argument('--state', type=str, default=None,
+                        help='Zustand in dieser Memory-Mapped-Datei halten; existiert sie, wird dort fortgesetzt')
+    parser.add_argument('--checkpoint-every', type=int, default=None,
+                        help='Alle N Schritte einen Checkpoint in die Zustandsdatei schreiben (default: nur am Ende)')
+    parser.add_argument('--fork-from', type=str, default=None,
+                        help='Checkpoint nach --state kopieren und von dort aus weiterrechnen')
+    parser.add_argument('--headless', action='store_true',
+                        help='Ohne GUI und ohne feste Wartezeit so schnell wie möglich rechnen')
+    parser.add_argument('--steps', type=int, default=1000,
+                        help='Maximale Anzahl der Schritte im Headless-Modus (default: 1000)')
+    parser.add_argument('--until-sync', action='store_true',
+                        help='Headless-Lauf beenden, sobald das Gitter synchronisiert ist')
+    parser.add_argument('--sync-threshold', type=float, default=0.99,
+                        help='Ordnungsparameter r, ab dem das Gitter als synchronisiert gilt (default: 0.99)')
+    parser.add_argument('--sync-window', type=int, default=1,
+                        help='Anzahl aufeinanderfolgender Schritte, die r über dem Schwellwert liegen muss (default: 1)')
+    parser.add_argument('--region-size', type=int, default=None,
+                        help='Kantenlänge der Regionen für die regionale Kohärenz (default: aus)')
+    parser.add_argument('--summary', type=str, default=None,
+                        help='Zusammenfassung des Headless-Laufs zusätzlich als JSON in diese Datei schreiben')
+    args = parser.parse_args()
+
+    if args.engine is None:
+        args.engine = 'vectorized' if args.headless else 'process'
+    if args.headless and args.engine == 'process':
+        parser.error("--headless benötigt --engine vectorized oder sharded")
+    if args.fork_from and not args.state:
+        parser.error("--fork-from benötigt --state")
+
+    state, initial_phases, start_step = load_initial_state(args)
+
+    # Ausgabe
+    print(f"Anzahl der Spalten (m): {args.m}")
+    print(f"Anzahl der Zeilen (n): {args.n}")
+    print(f"Kopplungsstärke (k): {args.K}")
+    print(f"Natürliche Frequenz (OMEGA): {args.OMEGA}")
+    print(f"Engine: {args.engine}")
+
+    # Nachbarschaftsindex einmalig vorberechnen
+    topology = topology_from_args(args.n, args.m, args)
+    if not topology.stencil:
+        print(f"Nachbarschaft: {args.topology}, Radius {args.radius}, {'offen' if args.open else 'Torus'}, "
+              f"Umverdrahtung {args.rewire}")
+
+    try:
+        if args.headless:
+            run_headless(args, initial_phases, topology, state, start_step)
+        else:
+            run_gui(args, initial_phases, topology, state, start_step)
+    finally:
+        if state is not None:
+            state.close()
+
 if __name__ == '__main__':
     freeze_support()  # Wichtig für Windows
     main()
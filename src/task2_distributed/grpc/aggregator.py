@@ -0,0 +1,149 @@
+import os
+import sys
+import time
+import signal
+import argparse
+from concurrent import futures
+
+import grpc
+import numpy as np
+import fireflys_pb2
+import fireflys_pb2_grpc
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "..", "common"))
+
+from layout import block_layout, add_layout_arguments, layout_from_args
+from channel_pool import ChannelPool, SERVER_OPTIONS
+from neighbor_cache import NeighborCache
+from async_gather import AsyncNeighborPoller
+from scheduler import StepScheduler
+
+AGGREGATOR_PORT = 5000  # Direkt unterhalb der Ports der Glühwürmchen
+
+RUNNING = True
+
+
+class GridAggregator:
+    """Sammelt die Phasen aller Glühwürmchen und hält einen Schnappschuss des gesamten Gitters bereit.
+
+    Einzelne Glühwürmchen werden pro Runde gleichzeitig über grpc.aio abgefragt (ein Event-Loop-Thread
+    statt eines Threads pro Glühwürmchen), Host-Prozesse mit je einem GetPhases-Aufruf. Der Schnappschuss
+    wird einmal pro Runde gepackt, sodass jede GetGrid-Anfrage nur noch eine fertige Nachricht zurückgibt.
+    Bis von jedem Glühwürmchen eine Phase vorliegt, ist er als unvollständig markiert (complete = False).
+    """
+
+    def __init__(self, n, m, firefly_host="localhost", hosts=0, layout=None, host_processes=False, deadline=1.0):
+        """
+        :param firefly_host: Rechner, auf dem die Glühwürmchen laufen (ohne Cluster-Layout)
+        :param hosts: Anzahl der Host-Prozesse (host.py); 0, wenn jedes Glühwürmchen ein eigener Prozess ist
+        :param layout: Cluster-Layout, das die IDs auf Rechner verteilt (ersetzt firefly_host und hosts)
+        :param host_processes: Die Blöcke des Layouts sind Host-Prozesse statt einzelner Glühwürmchen
+        :param deadline: Frist in Sekunden für die Abfragen einer Runde
+        """
+        self.n = n
+        self.m = m
+        self.pool = ChannelPool()
+        self.host_processes = host_processes or hosts > 0
+        self.layout = layout if layout is not None else block_layout(n, m, max(hosts, 1), host=firefly_host)
+        self.deadline = deadline
+        self.poller = None
+        if not self.host_processes:
+            self.addresses = [self.layout.firefly_address(i) for i in range(n * m)]
+            self.cache = NeighborCache(self.addresses, policy="hold")
+            self.poller = AsyncNeighborPoller(-1, self.addresses, self.cache)
+        self.phases = np.zeros(n * m, dtype=np.float32)
+        self.reported = np.zeros(n * m, dtype=bool)  # Glühwürmchen, von denen schon eine Phase vorliegt
+        self.snapshot = fireflys_pb2.GridSnapshot(n=n, m=m, version=0, timestamp=time.time(),
+                                                  phases=self.phases.tobytes(), complete=False)
+
+    def collect(self):
+        """Übernimmt die neuesten Phasen in das Gitter."""
+        if self.poller is not None:
+            self.poller.gather(self.deadline)
+            for i, address in enumerate(self.addresses):
+                phase = self.cache.get(address)
+                if phase is not None:
+                    self.phases[i] = phase
+                    self.reported[i] = True
+            return
+        calls = {block: self.pool.stub(block.address).GetPhases.future(
+                     fireflys_pb2.PhasesRequest(ids=list(block.ids)), timeout=self.deadline)
+                 for block in self.layout.blocks}
+        for block, call in calls.items():
+            try:
+                self.phases[block.start:block.stop] = call.result().phases
+                self.reported[block.start:block.stop] = True
+                self.pool.succeeded(block.address)
+            except grpc.RpcError:
+                self.pool.failed(block.address)  # Letzte bekannte Phasen des Hosts bleiben erhalten
+
+    def update(self):
+        """Sammelt eine Runde und veröffentlicht einen neuen Schnappschuss, falls sich etwas geändert hat."""
+        self.collect()
+        packed = self.phases.astype("<f4").tobytes()
+        complete = bool(self.reported.all())
+        if packed != self.snapshot.phases or complete != self.snapshot.complete:
+            # Nachricht komplett neu bauen und die Referenz austauschen, laufende Anfragen sehen den alten Stand
+            self.snapshot = fireflys_pb2.GridSnapshot(n=self.n, m=self.m, version=self.snapshot.version + 1,
+                                                      timestamp=time.time(), phases=packed, complete=complete)
+
+    def run(self, interval):
+        """Aktualisiert den Schnappschuss alle `interval` Sekunden, bis der Prozess beendet wird."""
+        scheduler = StepScheduler(interval)
+        while RUNNING:
+            self.update()
+            scheduler.wait()
+        if self.poller is not None:
+            self.poller.close()
+        self.pool.close()
+
+
+class AggregatorService(fireflys_pb2_grpc.FireflyServicer):
+    def __init__(self, aggregator):
+        self.aggregator = aggregator
+
+    def GetGrid(self, request, context):
+        """Gibt den aktuellen Schnappschuss des gesamten Gitters zurück (vor der ersten vollständigen Runde mit complete = False)."""
+        return self.aggregator.snapshot
+
+
+def serve(port, aggregator, max_workers=4):
+    """Startet den gRPC-Server des Aggregators."""
+    server = grpc.server(futures.ThreadPoolExecutor(max_workers=max_workers), options=SERVER_OPTIONS)
+    fireflys_pb2_grpc.add_FireflyServicer_to_server(AggregatorService(aggregator), server)
+    server.add_insecure_port(f"[::]:{port}")
+    server.start()
+    return server
+
+
+def unpack_phases(snapshot):
+    """Entpackt die Phasen eines GridSnapshot in ein float64-Array der Länge n * m."""
+    return np.frombuffer(snapshot.phases, dtype="<f4").astype(np.float64)
+
+
+def handle_signal(signal, frame):
+    """Signalhandler zum Beenden."""
+    global RUNNING
+    RUNNING = False
+
+
+if __name__ == "__main__":
+    signal.signal(signal.SIGTERM, handle_signal)
+    signal.signal(signal.SIGINT, handle_signal)
+
+    parser = argparse.ArgumentParser(description="Firefly Aggregator: stellt das gesamte Gitter mit einem Aufruf bereit")
+    parser.add_argument("--n", type=int, required=True, help="Anzahl der Zeilen")
+    parser.add_argument("--m", type=int, required=True, help="Anzahl der Spalten")
+    parser.add_argument("--firefly-host", type=str, default="localhost", help="Host-Adresse der Fireflies (Standard: localhost)")
+    parser.add_argument("--hosts", type=int, default=0, help="Anzahl der Host-Prozesse, falls die Glühwürmchen mit host.py gestartet wurden")
+    add_layout_arguments(parser, host_processes=True)
+    parser.add_argument("--port", type=int, default=AGGREGATOR_PORT, help=f"Port des Aggregators (Standard: {AGGREGATOR_PORT})")
+    parser.add_argument("--interval", type=float, default=0.08, help="Sammelintervall in Sekunden (Standard: 0.08)")
+    args = parser.parse_args()
+
+    layout = layout_from_args(args.n, args.m, args, host=args.firefly_host, hosts=max(args.hosts, 1))
+    aggregator = GridAggregator(args.n, args.m, layout=layout, host_processes=args.host_processes or args.hosts > 0)
+    server = serve(args.port, aggregator)
+    print(f"Aggregator für {args.n}x{args.m} auf Port {args.port}")
+    aggregator.run(args.interval)
+    server.stop(0)
@@ -0,0 +1,82 @@
+import asyncio
+import threading
+
+import grpc
+import fireflys_pb2
+import fireflys_pb2_grpc
+
+from channel_pool import CHANNEL_OPTIONS
+
+
+class AsyncNeighborPoller:
+    """Fragt alle Nachbarn gleichzeitig über grpc.aio ab, begrenzt durch eine Frist pro Schritt.
+
+    Die Event-Loop läuft in einem eigenen Thread, damit der Schritt-Loop synchron bleiben kann.
+    Antworten landen im NeighborCache; Nachbarn, die bis zur Frist nicht geantwortet haben, gelten
+    als Fehler für ihren Circuit Breaker und steuern gemäß Staleness-Policy ihre letzte Phase bei.
+    """
+
+    def __init__(self, id, neighbors, neighbor_cache):
+        """
+        :param id: ID des anfragenden Glühwürmchens
+        :param neighbors: Adressen der Nachbarn
+        :param neighbor_cache: NeighborCache, in dem die Antworten abgelegt werden
+        """
+        self.id = id
+        self.neighbors = list(neighbors)
+        self.neighbor_cache = neighbor_cache
+        self.late = 0  # Anzahl der Antworten, die die Frist verpasst haben
+        self.loop = asyncio.new_event_loop()
+        self.thread = threading.Thread(target=self.loop.run_forever, daemon=True)
+        self.thread.start()
+        self.channels = {}
+        self.stubs = asyncio.run_coroutine_threadsafe(self._connect(), self.loop).result()
+
+    async def _connect(self):
+        """Legt die aio-Kanäle an (muss innerhalb der Event-Loop geschehen)."""
+        stubs = {}
+        for neighbor in self.neighbors:
+            self.channels[neighbor] = grpc.aio.insecure_channel(neighbor, options=CHANNEL_OPTIONS)
+            stubs[neighbor] = fireflys_pb2_grpc.FireflyStub(self.channels[neighbor])
+        return stubs
+
+    async def _query(self, neighbor, deadline):
+        try:
+            response = await self.stubs[neighbor].GetPhase(fireflys_pb2.PhaseRequest(id=self.id), timeout=deadline)
+        except grpc.aio.AioRpcError:
+            self.neighbor_cache.failed(neighbor)  # Nicht erreichbar: letzte gültige Phase bleibt erhalten
+            return
+        self.neighbor_cache.update(neighbor, response.phase)
+
+    async def _gather(self, deadline):
+        # Gesperrte Nachbarn (offener Breaker) werden gar nicht erst angefragt
+        queried = {neighbor: asyncio.ensure_future(self._query(neighbor, deadline))
+                   for neighbor in self.neighbors if self.neighbor_cache.should_query(neighbor)}
+        if not queried:
+            return
+        _, pending = await asyncio.wait(queried.values(), timeout=deadline)
+        for neighbor, task in queried.items():
+            if task in pending:
+                task.cancel()
+                self.neighbor_cache.failed(neighbor)
+        self.late += len(pending)
+        if pending:
+            await asyncio.wait(pending)  # Abbruch der verspäteten Aufrufe abschließen
+
+    def gather(self, deadline):
+        """Fragt alle Nachbarn ab und legt die Antworten im Nachbar-Cache ab; blockiert höchstens `deadline` Sekunden.
+
+        :param deadline: Frist für alle Anfragen zusammen (Sekunden)
+        """
+        asyncio.run_coroutine_threadsafe(self._gather(deadline), self.loop).result()
+
+    async def _close(self):
+        for channel in self.channels.values():
+            await channel.close()
+
+    def close(self):
+        """Schließt alle Kanäle und beendet die Event-Loop."""
+        asyncio.run_coroutine_threadsafe(self._close(), self.loop).result()
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self.thread.join()
+        self.loop.close()
@@ -0,0 +1,75 @@
+import threading
+
+import grpc
+import fireflys_pb2_grpc
+
+# Keepalive: tote Verbindungen werden erkannt, ohne auf einen fehlschlagenden Aufruf zu warten
+CHANNEL_OPTIONS = [
+    ("grpc.keepalive_time_ms", 10000),
+    ("grpc.keepalive_timeout_ms", 5000),
+    ("grpc.keepalive_permit_without_calls", 1),
+    ("grpc.http2.max_pings_without_data", 0),
+    ("grpc.initial_reconnect_backoff_ms", 100),
+    ("grpc.min_reconnect_backoff_ms", 100),
+    ("grpc.max_reconnect_backoff_ms", 2000),
+]
+
+# Gegenstück für den Server, damit er die Keepalive-Pings der Clients nicht mit GOAWAY beantwortet
+SERVER_OPTIONS = [
+    ("grpc.keepalive_permit_without_calls", 1),
+    ("grpc.http2.min_ping_interval_without_data_ms", 5000),
+    ("grpc.http2.max_ping_strikes", 0),
+]
+
+
+class ChannelPool:
+    """Langlebige gRPC-Kanäle und Stubs, einmal pro Adresse angelegt.
+
+    Ein Kanal baut die Verbindung nach einem Abbruch selbstständig wieder auf (mit Backoff).
+    Schlagen Aufrufe an eine Adresse mehrfach hintereinander fehl, wird der Kanal trotzdem
+    verworfen und beim nächsten Zugriff neu angelegt (z. B. wenn der Prozess neu gestartet wurde).
+    """
+
+    def __init__(self, max_failures=3):
+        """
+        :param max_failures: Anzahl aufeinanderfolgender Fehler, nach denen ein Kanal neu angelegt wird
+        """
+        self.max_failures = max_failures
+        self.channels = {}
+        self.stubs = {}
+        self.failures = {}
+        self.lock = threading.Lock()
+
+    def stub(self, address):
+        """Gibt den Stub für die Adresse zurück und legt Kanal und Stub beim ersten Zugriff an."""
+        stub = self.stubs.get(address)
+        if stub is not None:
+            return stub
+        with self.lock:
+            if address not in self.stubs:
+                channel = grpc.insecure_channel(address, options=CHANNEL_OPTIONS)
+                self.channels[address] = channel
+                self.stubs[address] = fireflys_pb2_grpc.FireflyStub(channel)
+                self.failures[address] = 0
+            return self.stubs[address]
+
+    def succeeded(self, address):
+        """Meldet einen erfolgreichen Aufruf an die Adresse."""
+        self.failures[address] = 0
+
+    def failed(self, address):
+        """Meldet einen fehlgeschlagenen Aufruf; nach max_failures Fehlern wird der Kanal neu angelegt."""
+        with self.lock:
+            self.failures[address] = self.failures.get(address, 0) + 1
+            if self.failures[address] >= self.max_failures and address in self.channels:
+                self.channels.pop(address).close()
+                del self.stubs[address]
+                self.failures[address] = 0
+
+    def close(self):
+        """Schließt alle Kanäle."""
+        with self.lock:
+            for channel in self.channels.values():
+                channel.close()
+            self.channels.clear()
+            self.stubs.clear()
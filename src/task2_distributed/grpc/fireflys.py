@@ -4,68 +4,189 @@ import fireflys_pb2_grpc
 from concurrent import futures
 import time
 import math
-import random
 import signal
+import argparse
+import os
+import sys
 from multiprocessing import Value
 
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "..", "common"))
+
+from topology import add_topology_arguments, topology_from_args
+from layout import add_layout_arguments, layout_from_args
+from proc_stats import write_stats
+from channel_pool import ChannelPool, SERVER_OPTIONS
+from phase_subscription import PhasePublisher, PhaseCache
+from async_gather import AsyncNeighborPoller
+from neighbor_cache import add_neighbor_cache_arguments, cache_from_args
+from scheduler import StepScheduler, add_scheduler_arguments
+from lockstep import PhaseHistory, BarrierTimer, add_lockstep_arguments, initial_phase
+from phase_registry import PhaseRegistry, add_registry_arguments
+
 # Globales Flag zum Beenden
 RUNNING = Value('b', True)
 
 class FireflyService(fireflys_pb2_grpc.FireflyServicer):
-    def __init__(self, shared_phase, id):
+    def __init__(self, shared_phase, id, publisher, history=None):
         self.shared_phase = shared_phase  # Verwende die geteilte Phase
         self.id = id
+        self.publisher = publisher  # Verteilt neue Phasen an die Abonnenten
+        self.history = history  # Phasen mit Schrittnummer (nur im Lockstep-Modus)
 
     def GetPhase(self, request, context):
         """Gibt die aktuelle Phase des Glühwürmchens zurück."""
         # print(f"Firefly {self.id} returning phase {self.shared_phase.value}")
         return fireflys_pb2.PhaseResponse(phase=self.shared_phase.value)
 
-def serve(port, shared_phase, id):
-    """Startet den gRPC-Server."""
-    server = grpc.server(futures.ThreadPoolExecutor(max_workers=2))
-    fireflys_pb2_grpc.add_FireflyServicer_to_server(FireflyService(shared_phase, id), server)
+    def GetPhases(self, request, context):
+        """Batch-Variante von GetPhase; ein einzelnes Glühwürmchen kennt nur die eigene ID."""
+        if any(id != self.id for id in request.ids):
+            context.abort(grpc.StatusCode.INVALID_ARGUMENT, f"Glühwürmchen {self.id} kennt nur die eigene Phase")
+        return fireflys_pb2.PhasesResponse(phases=[self.shared_phase.value] * len(request.ids))
+
+    def SubscribePhase(self, request, context):
+        """Sendet die aktuelle Phase und danach jede Änderung, bis der Abonnent den Stream beendet."""
+        return self.publisher.stream(context)
+
+    def GetPhaseAtStep(self, request, context):
+        """Gibt die Phase zum angefragten Schritt zurück und wartet dafür höchstens bis zur Deadline des Aufrufs."""
+        if self.history is None:
+            context.abort(grpc.StatusCode.FAILED_PRECONDITION, f"Glühwürmchen {self.id} läuft nicht im Lockstep-Modus")
+        try:
+            phase = self.history.wait_for(request.step, context.time_remaining())
+        except KeyError:
+            context.abort(grpc.StatusCode.OUT_OF_RANGE, f"Schritt {request.step} liegt nicht mehr vor")
+        if phase is None:
+            context.abort(grpc.StatusCode.DEADLINE_EXCEEDED, f"Schritt {request.step} noch nicht erreicht")
+        return fireflys_pb2.StepPhaseResponse(phase=phase, step=request.step)
+
+def serve(port, shared_phase, id, publisher, max_workers=2, history=None):
+    """Startet den gRPC-Server.
+
+    :param max_workers: Jeder offene SubscribePhase-Stream und jeder an der Barriere wartende Nachbar belegt
+                        einen Thread des Servers
+    """
+    server = grpc.server(futures.ThreadPoolExecutor(max_workers=max_workers), options=SERVER_OPTIONS)
+    fireflys_pb2_grpc.add_FireflyServicer_to_server(FireflyService(shared_phase, id, publisher, history), server)
     server.add_insecure_port(f"[::]:{port}")
     server.start()
     return server
 
-def firefly_client(id, neighbors, shared_phase, omega, k):
-    """Die Logik des Glühwürmchens."""
-    retry_delay = 0.5  # Wartezeit (Sekunden) vor dem erneuten Versuch, wenn ein Nachbar nicht erreichbar ist
-    retry_attempts = 3  # Maximale Anzahl an Wiederholungsversuchen pro Nachbar
+def poll_neighbors(pool, id, neighbors, neighbor_cache, rpc_timeout):
+    """Fragt die Phasen aller Nachbarn nacheinander per GetPhase ab und legt sie im Nachbar-Cache ab.
 
-    while RUNNING.value:
-        # Initialisiere Phase-Berechnung
-        neighbors_phase = 0
-        neighbors_count = 0
-
-        # Sammle Phasen aller Nachbarn
-        for neighbor in neighbors:
-            for attempt in range(retry_attempts):
-                try:
-                    with grpc.insecure_channel(neighbor) as channel:
-                        stub = fireflys_pb2_grpc.FireflyStub(channel)
-                        response = stub.GetPhase(fireflys_pb2.PhaseRequest(id=id))
-                        neighbors_phase += response.phase
-                        neighbors_count += 1
-                        break  # Erfolgreich, keine weiteren Versuche nötig
-                except grpc.RpcError:
-                    if attempt < retry_attempts - 1:
-                        time.sleep(retry_delay)  # Warte und versuche erneut
-                    else:
-                        pass
-
-        # Berechne Durchschnittsphase der Nachbarn
-        if neighbors_count > 0:
-            average_phase = neighbors_phase / neighbors_count
-        else:
-            average_phase = 0  # Keine Nachbarn erreichbar
+    Nachbarn mit offenem Circuit Breaker werden übersprungen, es gibt keine Wiederholungen im Schritt.
+    """
+    for neighbor in neighbors:
+        if not neighbor_cache.should_query(neighbor):
+            continue
+        try:
+            response = pool.stub(neighbor).GetPhase(fireflys_pb2.PhaseRequest(id=id), timeout=rpc_timeout)
+            pool.succeeded(neighbor)
+            neighbor_cache.update(neighbor, response.phase)
+        except grpc.RpcError:
+            pool.failed(neighbor)
+            report_failure(neighbor_cache, neighbor)
+
+def report_failure(neighbor_cache, neighbor):
+    """Meldet einen Fehler an den Nachbar-Cache und gibt nur beim Sperren des Nachbarn eine Meldung aus."""
+    if neighbor_cache.failed(neighbor):
+        print(f"Nachbar {neighbor} nicht erreichbar, nächster Versuch in {neighbor_cache.backoff(neighbor):.1f} s")
+
+def gather_step(pool, id, neighbors, neighbor_cache, step, barrier_timeout):
+    """Barriere des Lockstep-Modus: holt die Phasen aller Nachbarn zu `step` gleichzeitig.
+
+    Jeder Aufruf wartet auf dem Server, bis der Nachbar den Schritt erreicht hat. Gibt die Anzahl der
+    verschiedenen Nachbarn zurück, die nicht innerhalb von `barrier_timeout` geantwortet haben; für sie gilt die
+    Staleness-Policy des Nachbar-Caches.
+    """
+    request = fireflys_pb2.StepPhaseRequest(id=id, step=step)
+    # wait_for_ready: auch ein noch startender Nachbar wird innerhalb der Frist abgewartet
+    calls = {neighbor: pool.stub(neighbor).GetPhaseAtStep.future(request, timeout=barrier_timeout, wait_for_ready=True)
+             for neighbor in neighbors if neighbor_cache.should_query(neighbor)}
+    late = len(set(neighbors)) - len(calls)  # Gesperrte Nachbarn; mehrfach genannte (kleine Gitter) zählen einmal
+    for neighbor, call in calls.items():
+        try:
+            neighbor_cache.update(neighbor, call.result().phase)
+            pool.succeeded(neighbor)
+        except grpc.RpcError as e:
+            late += 1
+            if e.code() == grpc.StatusCode.UNAVAILABLE:
+                pool.failed(neighbor)
+            report_failure(neighbor_cache, neighbor)
+    return late
+
+def firefly_client(id, neighbors, shared_phase, omega, k, neighbor_cache, scheduler, publisher=None,
+                   neighbor_mode="stream", step_deadline=0.05, history=None, barrier=None,
+                   barrier_timeout=5.0, max_steps=0, registry=None, local_neighbors=None):
+    """Die Logik des Glühwürmchens. Gibt die Anzahl der ausgeführten Schritte zurück.
+
+    :param neighbor_cache: NeighborCache mit den letzten gültigen Nachbarphasen, Staleness-Policy und Circuit Breakern
+    :param scheduler: StepScheduler, der die Schrittperiode unabhängig von der Dauer der Abfragen einhält
+    :param publisher: PhasePublisher, dem jede neue Phase gemeldet wird
+    :param neighbor_mode: "stream" liest die Nachbarphasen aus dem per SubscribePhase gefüllten Cache,
+                          "poll" fragt jeden Nachbarn in jedem Schritt per GetPhase ab,
+                          "async" fragt alle Nachbarn gleichzeitig per grpc.aio ab
+    :param step_deadline: Frist (Sekunden) für die gleichzeitige Abfrage im Modus "async"
+    :param history: PhaseHistory; wenn gesetzt, läuft das Glühwürmchen im Lockstep-Modus und neighbor_mode
+                    wird ignoriert
+    :param barrier: BarrierTimer für die Wartezeit an der Barriere (Lockstep-Modus)
+    :param barrier_timeout: Höchste Wartezeit (Sekunden) auf einen Nachbarn an der Barriere
+    :param max_steps: Anzahl der Schritte, nach denen angehalten wird (0 = unbegrenzt)
+    :param registry: PhaseRegistry dieses Rechners; die eigene Phase wird nach jedem Schritt hineingeschrieben
+    :param local_neighbors: Nachbarn auf demselben Rechner ({Adresse: ID}), die aus `registry` statt per RPC gelesen
+                            werden (nicht im Lockstep-Modus, dort fehlt im Register die Schrittnummer)
+    """
+    steps = 0
+    rpc_timeout = 0.2  # Maximale Dauer eines Aufrufs (Sekunden)
+    pool = ChannelPool()  # Ein langlebiger Kanal pro Nachbar statt eines neuen Kanals pro Schritt
+    lockstep = history is not None
+    local_neighbors = local_neighbors if registry is not None and not lockstep else {}
+    remote = [neighbor for neighbor in neighbors if neighbor not in local_neighbors]  # Nur diese per RPC
+    cache = PhaseCache(pool, remote, id, neighbor_cache) if neighbor_mode == "stream" and not lockstep else None
+    poller = AsyncNeighborPoller(id, remote, neighbor_cache) if neighbor_mode == "async" and not lockstep else None
+
+    while RUNNING.value and (max_steps <= 0 or steps < max_steps):
+        # Sammle Phasen aller Nachbarn (im Modus stream laufend im Hintergrund)
+        if lockstep:
+            # Barriere: die Phasen der Nachbarn aus demselben Schritt abwarten
+            started = time.monotonic()
+            late = gather_step(pool, id, neighbors, neighbor_cache, steps, barrier_timeout)
+            barrier.record(time.monotonic() - started, late)
+        elif poller is not None:
+            poller.gather(step_deadline)  # Verspätete Nachbarn blockieren den Schritt nicht
+        elif cache is None:
+            poll_neighbors(pool, id, remote, neighbor_cache, rpc_timeout)
+        if local_neighbors:
+            registry.fill(neighbor_cache, local_neighbors)  # Nachbarn auf diesem Rechner direkt aus dem Shared Memory
+
+        # Durchschnittsphase der verwendbaren Nachbarn; ohne Nachbarn keine Kopplung in diesem Schritt
+        average_phase = neighbor_cache.average(shared_phase.value)
 
         # Update eigene Phase
         with shared_phase.get_lock():  # Sicherstellen, dass nur ein Prozess die Phase aktualisiert
             shared_phase.value = (shared_phase.value + omega + k * math.sin(average_phase - shared_phase.value)) % (2 * math.pi)
+        steps += 1
+        if registry is not None:
+            registry.write(id, shared_phase.value)
+        if lockstep:
+            history.publish(steps, shared_phase.value)
+        if publisher is not None:
+            publisher.publish()
 
-        time.sleep(0.1)  # Simulationsschritt
+        scheduler.wait()  # Simulationsschritt: bis zum nächsten Takt warten
+
+    if cache is not None:
+        cache.close()
+    if poller is not None:
+        poller.close()
+    pool.close()
+    return steps
+
+def wait_for_shutdown():
+    """Wartet nach dem letzten Schritt auf das Beenden, damit langsamere Nachbarn die letzten Phasen noch abholen können."""
+    while RUNNING.value:
+        time.sleep(0.1)
 
 
 def handle_signal(signal, frame):
@@ -75,36 +196,78 @@ def handle_signal(signal, frame):
 signal.signal(signal.SIGTERM, handle_signal)
 signal.signal(signal.SIGINT, handle_signal)
 
-if __name__ == "__main__":
-    import argparse
-
+def main(argv=None):
+    """Startet ein Glühwürmchen mit den Kommandozeilenargumenten `argv` (Standard: sys.argv)."""
     parser = argparse.ArgumentParser(description="Firefly Process")
     parser.add_argument("--n", type=int, required=True, help="Anzahl der Zeilen (Höhe des Gitters)")
     parser.add_argument("--m", type=int, required=True, help="Anzahl der Spalten (Breite des Gitters)")
     parser.add_argument("--id", type=int, required=True, help="ID des Glühwürmchens")
     parser.add_argument("--k", type=float, default=0.1, help="Kopplungsstärke (Standard: 0.1)")
     parser.add_argument("--omega", type=float, default=0.75, help="Natürliche Frequenz (Standard: 0.75)")
-    args = parser.parse_args()
+    parser.add_argument("--neighbor-mode", choices=("stream", "poll", "async"), default="stream",
+                        help="Nachbarphasen per SubscribePhase-Stream empfangen, nacheinander (poll) "
+                             "oder gleichzeitig (async) in jedem Schritt abfragen (Standard: stream)")
+    parser.add_argument("--step-deadline", type=float, default=0.05,
+                        help="Frist in Sekunden für die Nachbarabfrage im Modus async (Standard: 0.05)")
+    add_topology_arguments(parser)
+    add_layout_arguments(parser)
+    add_neighbor_cache_arguments(parser)
+    add_scheduler_arguments(parser, 0.1)
+    add_lockstep_arguments(parser)
+    add_registry_arguments(parser)
+    parser.add_argument("--stats-file", type=str, default=None, help="Beim Beenden Schritte, CPU-Zeit und Speicher als JSON hierhin schreiben")
+    args = parser.parse_args(argv)
 
     # Initialisiere Phase
-    shared_phase = Value("d", random.uniform(0, 2 * math.pi))  # Geteilte Phase
-
-    # Port und Nachbarn berechnen
-    port = 5001 + args.id
-    neighbors = []
-    n, m = args.n, args.m
-    row, col = divmod(args.id, m)
-    for dx in [-1, 0, 1]:
-        for dy in [-1, 0, 1]:
-            if dx != 0 or dy != 0:
-                neighbor_row = (row + dx + n) % n
-                neighbor_col = (col + dy + m) % m
-                neighbor_id = neighbor_row * m + neighbor_col
-                neighbors.append(f"localhost:{5001 + neighbor_id}")
-
-    # Starte Server und Client
-    server = serve(port, shared_phase, args.id)
-    firefly_client(args.id, neighbors, shared_phase, args.omega, args.k)
-
-    # Beende den Server
+    shared_phase = Value("d", initial_phase(args.n, args.m, args.id, args.seed))  # Geteilte Phase
+
+    # Port und Nachbarn aus Cluster-Layout und gemeinsamem Nachbarschaftsindex bestimmen
+    layout = layout_from_args(args.n, args.m, args)
+    port = layout.owner(args.id).firefly_port + args.id
+    topology = topology_from_args(args.n, args.m, args)
+    neighbors = [layout.firefly_address(neighbor_id) for neighbor_id in topology.neighbors(args.id)]
+    subscribers = int((topology.indices == args.id).sum())  # Glühwürmchen, die diese Phase abonnieren
+
+    # Shared-Memory-Register (optional): Nachbarn auf demselben Knoten des Layouts werden direkt gelesen
+    registry, local_neighbors = None, {}
+    if args.shm_registry:
+        registry = PhaseRegistry(args.shm_registry, args.n * args.m)
+        registry.write(args.id, shared_phase.value)
+        node = layout.owner(args.id)
+        local_neighbors = {layout.firefly_address(neighbor_id): int(neighbor_id)
+                           for neighbor_id in topology.neighbors(args.id) if layout.owner(neighbor_id) is node}
+
+    # Starte Server und Client (zusätzliche Threads für Observer und einzelne GetPhase-Aufrufe)
+    start_time = time.time()
+    publisher = PhasePublisher(shared_phase)
+    history = PhaseHistory(shared_phase.value) if args.lockstep else None
+    barrier = BarrierTimer() if args.lockstep else None
+    server = serve(port, shared_phase, args.id, publisher, max_workers=subscribers + 4, history=history)
+    scheduler = StepScheduler(args.step_period, aligned=True)  # Alle Glühwürmchen eines Rechners im selben Takt
+    firefly_client(args.id, neighbors, shared_phase, args.omega, args.k, cache_from_args(neighbors, args),
+                   scheduler, publisher=publisher, neighbor_mode=args.neighbor_mode, step_deadline=args.step_deadline,
+                   history=history, barrier=barrier, barrier_timeout=args.barrier_timeout, max_steps=args.steps,
+                   registry=registry, local_neighbors=local_neighbors)
+    elapsed = time.time() - start_time
+    stats = scheduler.stats()
+    stats["local_neighbors"] = len(local_neighbors)
+    if barrier is not None:
+        stats.update(barrier.stats(elapsed))
+    if args.steps > 0:
+        print(f"Firefly {args.id}: {args.steps} Schritte abgeschlossen, Phase {shared_phase.value:.6f}")
+        wait_for_shutdown()
+
+    # Beende die Streams und den Server
+    publisher.close()
+    if history is not None:
+        history.close()
     server.stop(0)
+    if registry is not None:
+        registry.close()
+
+    if args.stats_file:
+        write_stats(args.stats_file, id=args.id, elapsed_s=elapsed, phase=shared_phase.value, **stats)
+
+
+if __name__ == "__main__":
+    main()
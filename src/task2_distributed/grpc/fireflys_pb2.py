@@ -24,7 +24,7 @@ _sym_db = _symbol_database.Default()
 
 
 
-DESCRIPTOR = _descriptor_pool.Default().AddSerializedFile(b'\n\x0e\x66ireflys.proto\"\x1a\n\x0cPhaseRequest\x12\n\n\x02id\x18\x01 \x01(\x05\"\x1e\n\rPhaseResponse\x12\r\n\x05phase\x18\x01 \x01(\x02\x32\x34\n\x07\x46irefly\x12)\n\x08GetPhase\x12\r.PhaseRequest\x1a\x0e.PhaseResponseb\x06proto3')
+DESCRIPTOR = _descriptor_pool.Default().AddSerializedFile(b'\n\x0e\x66ireflys.proto\"\x1a\n\x0cPhaseRequest\x12\n\n\x02id\x18\x01 \x01(\x05\"\x1e\n\rPhaseResponse\x12\r\n\x05phase\x18\x01 \x01(\x02\"\x1c\n\rPhasesRequest\x12\x0b\n\x03ids\x18\x01 \x03(\x05\" \n\x0ePhasesResponse\x12\x0e\n\x06phases\x18\x01 \x03(\x02\"\r\n\x0bGridRequest\"j\n\x0cGridSnapshot\x12\t\n\x01n\x18\x01 \x01(\x05\x12\t\n\x01m\x18\x02 \x01(\x05\x12\x0f\n\x07version\x18\x03 \x01(\x04\x12\x11\n\ttimestamp\x18\x04 \x01(\x01\x12\x0e\n\x06phases\x18\x05 \x01(\x0c\x12\x10\n\x08\x63omplete\x18\x06 \x01(\x08\",\n\x10StepPhaseRequest\x12\n\n\x02id\x18\x01 \x01(\x05\x12\x0c\n\x04step\x18\x02 \x01(\x03\"0\n\x11StepPhaseResponse\x12\r\n\x05phase\x18\x01 \x01(\x01\x12\x0c\n\x04step\x18\x02 \x01(\x03\x32\xf6\x01\n\x07\x46irefly\x12)\n\x08GetPhase\x12\r.PhaseRequest\x1a\x0e.PhaseResponse\x12\x31\n\x0eSubscribePhase\x12\r.PhaseRequest\x1a\x0e.PhaseResponse0\x01\x12,\n\tGetPhases\x12\x0e.PhasesRequest\x1a\x0f.PhasesResponse\x12&\n\x07GetGrid\x12\x0c.GridRequest\x1a\r.GridSnapshot\x12\x37\n\x0eGetPhaseAtStep\x12\x11.StepPhaseRequest\x1a\x12.StepPhaseResponseb\x06proto3')
 
 _globals = globals()
 _builder.BuildMessageAndEnumDescriptors(DESCRIPTOR, _globals)
@@ -35,6 +35,18 @@ if not _descriptor._USE_C_DESCRIPTORS:
   _globals['_PHASEREQUEST']._serialized_end=44
   _globals['_PHASERESPONSE']._serialized_start=46
   _globals['_PHASERESPONSE']._serialized_end=76
-  _globals['_FIREFLY']._serialized_start=78
-  _globals['_FIREFLY']._serialized_end=130
+  _globals['_PHASESREQUEST']._serialized_start=78
+  _globals['_PHASESREQUEST']._serialized_end=106
+  _globals['_PHASESRESPONSE']._serialized_start=108
+  _globals['_PHASESRESPONSE']._serialized_end=140
+  _globals['_GRIDREQUEST']._serialized_start=142
+  _globals['_GRIDREQUEST']._serialized_end=155
+  _globals['_GRIDSNAPSHOT']._serialized_start=157
+  _globals['_GRIDSNAPSHOT']._serialized_end=263
+  _globals['_STEPPHASEREQUEST']._serialized_start=265
+  _globals['_STEPPHASEREQUEST']._serialized_end=309
+  _globals['_STEPPHASERESPONSE']._serialized_start=311
+  _globals['_STEPPHASERESPONSE']._serialized_end=359
+  _globals['_FIREFLY']._serialized_start=362
+  _globals['_FIREFLY']._serialized_end=608
 # @@protoc_insertion_point(module_scope)
@@ -39,6 +39,26 @@ class FireflyStub(object):
                 request_serializer=fireflys__pb2.PhaseRequest.SerializeToString,
                 response_deserializer=fireflys__pb2.PhaseResponse.FromString,
                 _registered_method=True)
+        self.SubscribePhase = channel.unary_stream(
+                '/Firefly/SubscribePhase',
+                request_serializer=fireflys__pb2.PhaseRequest.SerializeToString,
+                response_deserializer=fireflys__pb2.PhaseResponse.FromString,
+                _registered_method=True)
+        self.GetPhases = channel.unary_unary(
+                '/Firefly/GetPhases',
+                request_serializer=fireflys__pb2.PhasesRequest.SerializeToString,
+                response_deserializer=fireflys__pb2.PhasesResponse.FromString,
+                _registered_method=True)
+        self.GetGrid = channel.unary_unary(
+                '/Firefly/GetGrid',
+                request_serializer=fireflys__pb2.GridRequest.SerializeToString,
+                response_deserializer=fireflys__pb2.GridSnapshot.FromString,
+                _registered_method=True)
+        self.GetPhaseAtStep = channel.unary_unary(
+                '/Firefly/GetPhaseAtStep',
+                request_serializer=fireflys__pb2.StepPhaseRequest.SerializeToString,
+                response_deserializer=fireflys__pb2.StepPhaseResponse.FromString,
+                _registered_method=True)
 
 
 class FireflyServicer(object):
@@ -50,6 +70,34 @@ class FireflyServicer(object):
         context.set_details('Method not implemented!')
         raise NotImplementedError('Method not implemented!')
 
+    def SubscribePhase(self, request, context):
+        """Liefert sofort die aktuelle Phase und danach jede neue Phase, sobald sie sich ändert
+        """
+        context.set_code(grpc.StatusCode.UNIMPLEMENTED)
+        context.set_details('Method not implemented!')
+        raise NotImplementedError('Method not implemented!')
+
+    def GetPhases(self, request, context):
+        """Liefert die Phasen mehrerer Glühwürmchen eines Host-Prozesses in einem Aufruf
+        """
+        context.set_code(grpc.StatusCode.UNIMPLEMENTED)
+        context.set_details('Method not implemented!')
+        raise NotImplementedError('Method not implemented!')
+
+    def GetGrid(self, request, context):
+        """Liefert das gesamte Gitter in einer Nachricht (nur vom Aggregator angeboten)
+        """
+        context.set_code(grpc.StatusCode.UNIMPLEMENTED)
+        context.set_details('Method not implemented!')
+        raise NotImplementedError('Method not implemented!')
+
+    def GetPhaseAtStep(self, request, context):
+        """Lockstep-Modus: wartet, bis die Phase zum angefragten Schritt vorliegt (Barriere zwischen Nachbarn)
+        """
+        context.set_code(grpc.StatusCode.UNIMPLEMENTED)
+        context.set_details('Method not implemented!')
+        raise NotImplementedError('Method not implemented!')
+
 
 def add_FireflyServicer_to_server(servicer, server):
     rpc_method_handlers = {
@@ -58,6 +106,26 @@ def add_FireflyServicer_to_server(servicer, server):
                     request_deserializer=fireflys__pb2.PhaseRequest.FromString,
                     response_serializer=fireflys__pb2.PhaseResponse.SerializeToString,
             ),
+            'SubscribePhase': grpc.unary_stream_rpc_method_handler(
+                    servicer.SubscribePhase,
+                    request_deserializer=fireflys__pb2.PhaseRequest.FromString,
+                    response_serializer=fireflys__pb2.PhaseResponse.SerializeToString,
+            ),
+            'GetPhases': grpc.unary_unary_rpc_method_handler(
+                    servicer.GetPhases,
+                    request_deserializer=fireflys__pb2.PhasesRequest.FromString,
+                    response_serializer=fireflys__pb2.PhasesResponse.SerializeToString,
+            ),
+            'GetGrid': grpc.unary_unary_rpc_method_handler(
+                    servicer.GetGrid,
+                    request_deserializer=fireflys__pb2.GridRequest.FromString,
+                    response_serializer=fireflys__pb2.GridSnapshot.SerializeToString,
+            ),
+            'GetPhaseAtStep': grpc.unary_unary_rpc_method_handler(
+                    servicer.GetPhaseAtStep,
+                    request_deserializer=fireflys__pb2.StepPhaseRequest.FromString,
+                    response_serializer=fireflys__pb2.StepPhaseResponse.SerializeToString,
+            ),
     }
     generic_handler = grpc.method_handlers_generic_handler(
             'Firefly', rpc_method_handlers)
@@ -95,3 +163,111 @@ class Firefly(object):
             timeout,
             metadata,
             _registered_method=True)
+
+    @staticmethod
+    def SubscribePhase(request,
+            target,
+            options=(),
+            channel_credentials=None,
+            call_credentials=None,
+            insecure=False,
+            compression=None,
+            wait_for_ready=None,
+            timeout=None,
+            metadata=None):
+        return grpc.experimental.unary_stream(
+            request,
+            target,
+            '/Firefly/SubscribePhase',
+            fireflys__pb2.PhaseRequest.SerializeToString,
+            fireflys__pb2.PhaseResponse.FromString,
+            options,
+            channel_credentials,
+            insecure,
+            call_credentials,
+            compression,
+            wait_for_ready,
+            timeout,
+            metadata,
+            _registered_method=True)
+
+    @staticmethod
+    def GetPhases(request,
+            target,
+            options=(),
+            channel_credentials=None,
+            call_credentials=None,
+            insecure=False,
+            compression=None,
+            wait_for_ready=None,
+            timeout=None,
+            metadata=None):
+        return grpc.experimental.unary_unary(
+            request,
+            target,
+            '/Firefly/GetPhases',
+            fireflys__pb2.PhasesRequest.SerializeToString,
+            fireflys__pb2.PhasesResponse.FromString,
+            options,
+            channel_credentials,
+            insecure,
+            call_credentials,
+            compression,
+            wait_for_ready,
+            timeout,
+            metadata,
+            _registered_method=True)
+
+    @staticmethod
+    def GetGrid(request,
+            target,
+            options=(),
+            channel_credentials=None,
+            call_credentials=None,
+            insecure=False,
+            compression=None,
+            wait_for_ready=None,
+            timeout=None,
+            metadata=None):
+        return grpc.experimental.unary_unary(
+            request,
+            target,
+            '/Firefly/GetGrid',
+            fireflys__pb2.GridRequest.SerializeToString,
+            fireflys__pb2.GridSnapshot.FromString,
+            options,
+            channel_credentials,
+            insecure,
+            call_credentials,
+            compression,
+            wait_for_ready,
+            timeout,
+            metadata,
+            _registered_method=True)
+
+    @staticmethod
+    def GetPhaseAtStep(request,
+            target,
+            options=(),
+            channel_credentials=None,
+            call_credentials=None,
+            insecure=False,
+            compression=None,
+            wait_for_ready=None,
+            timeout=None,
+            metadata=None):
+        return grpc.experimental.unary_unary(
+            request,
+            target,
+            '/Firefly/GetPhaseAtStep',
+            fireflys__pb2.StepPhaseRequest.SerializeToString,
+            fireflys__pb2.StepPhaseResponse.FromString,
+            options,
+            channel_credentials,
+            insecure,
+            call_credentials,
+            compression,
+            wait_for_ready,
+            timeout,
+            metadata,
+            _registered_method=True)
@@ -0,0 +1,169 @@
+import os
+import sys
+import math
+import time
+import signal
+import argparse
+from concurrent import futures
+
+import grpc
+import numpy as np
+import fireflys_pb2
+import fireflys_pb2_grpc
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "..", "common"))
+
+from topology import add_topology_arguments, topology_from_args
+from layout import add_layout_arguments, layout_from_args
+from proc_stats import write_stats
+from channel_pool import ChannelPool, SERVER_OPTIONS
+from scheduler import StepScheduler, add_scheduler_arguments
+
+RUNNING = True
+
+
+class HostService(fireflys_pb2_grpc.FireflyServicer):
+    """Stellt die Phasen aller Glühwürmchen eines Host-Prozesses über einen Server bereit."""
+
+    def __init__(self, host):
+        self.host = host
+
+    def GetPhases(self, request, context):
+        """Gibt die Phasen der angefragten IDs zurück (alle müssen zu diesem Host gehören)."""
+        ids = np.asarray(request.ids, dtype=np.int64)
+        block = self.host.block
+        if len(ids) and (ids.min() < block.start or ids.max() >= block.stop):
+            context.abort(grpc.StatusCode.INVALID_ARGUMENT, f"IDs außerhalb von {block.start}..{block.stop - 1}")
+        phases = self.host.phases  # Referenz einmal lesen, der Schritt tauscht das Array komplett aus
+        return fireflys_pb2.PhasesResponse(phases=phases[ids - block.start].tolist())
+
+
+class FireflyHost:
+    """Ein Prozess, der einen zusammenhängenden Block von Glühwürmchen gemeinsam simuliert.
+
+    Die eigenen Phasen werden vektorisiert in einem Schritt aktualisiert. Nur für Nachbarn
+    außerhalb des Blocks (Blockränder) wird pro Schritt und fremdem Host ein GetPhases-Aufruf gestellt.
+    """
+
+    def __init__(self, layout, index, topology, omega, k, rpc_timeout=0.05):
+        """
+        :param layout: Aufteilung des Gitters auf die Host-Prozesse
+        :param index: Nummer dieses Hosts im Layout
+        :param topology: Nachbarschaftsindex des gesamten Gitters
+        :param rpc_timeout: Frist (Sekunden) für die Abfrage der fremden Hosts
+        """
+        self.layout = layout
+        self.block = layout.blocks[index]
+        self.topology = topology
+        self.omega = omega
+        self.k = k
+        self.rpc_timeout = rpc_timeout
+        self.phases = np.random.uniform(0, 2 * math.pi, len(self.block.ids))
+        self.steps = 0
+
+        # Alle Phasen des Gitters; fremde Einträge enthalten den zuletzt empfangenen Wert
+        self.values = np.zeros(layout.n * layout.m)
+        first, last = topology.indptr[self.block.start], topology.indptr[self.block.stop]
+        neighbor_ids = np.unique(topology.indices[first:last])
+        remote_ids = neighbor_ids[(neighbor_ids < self.block.start) | (neighbor_ids >= self.block.stop)]
+        self.remote = {self.layout.blocks[h].address: np.asarray(ids)
+                       for h, ids in layout.group_by_owner(remote_ids).items()}
+        self.received = set()  # IDs, von denen bereits eine Phase vorliegt
+        self.pool = ChannelPool()
+
+    def fetch_boundary(self):
+        """Fragt die Randphasen bei allen fremden Hosts gleichzeitig ab (ein Aufruf pro Host)."""
+        calls = {}
+        for address, ids in self.remote.items():
+            calls[address] = self.pool.stub(address).GetPhases.future(
+                fireflys_pb2.PhasesRequest(ids=ids.tolist()), timeout=self.rpc_timeout)
+        for address, call in calls.items():
+            try:
+                self.values[self.remote[address]] = call.result().phases
+                self.received.update(self.remote[address].tolist())
+                self.pool.succeeded(address)
+            except grpc.RpcError:
+                self.pool.failed(address)  # Letzte bekannte Phasen bleiben erhalten
+
+    def step(self):
+        """Führt einen Simulationsschritt für alle eigenen Glühwürmchen aus."""
+        self.fetch_boundary()
+        self.values[self.block.start:self.block.stop] = self.phases
+        average_phase = self.topology.mean(self.values, self.block.start, self.block.stop)
+        self.phases = (self.phases + self.omega + self.k * np.sin(average_phase - self.phases)) % (2 * math.pi)
+        self.steps += 1
+
+    def wait_for_peers(self, timeout=10.0):
+        """Wartet, bis von allen fremden Randnachbarn eine Phase vorliegt (höchstens `timeout` Sekunden).
+
+        Ohne diese Wartezeit würden noch nicht gestartete Hosts in den ersten Schritten mit Phase 0 eingehen.
+        """
+        expected = sum(len(ids) for ids in self.remote.values())
+        deadline = time.time() + timeout
+        while RUNNING and len(self.received) < expected and time.time() < deadline:
+            self.fetch_boundary()
+            time.sleep(0.05)
+
+    def run(self, scheduler):
+        """Simuliert im Takt des StepSchedulers, bis der Prozess beendet wird. Gibt die Anzahl der Schritte zurück."""
+        self.wait_for_peers()
+        while RUNNING:
+            self.step()
+            scheduler.wait()
+        self.pool.close()
+        return self.steps
+
+
+def serve(port, host, max_workers=4):
+    """Startet den gRPC-Server des Host-Prozesses."""
+    server = grpc.server(futures.ThreadPoolExecutor(max_workers=max_workers), options=SERVER_OPTIONS)
+    fireflys_pb2_grpc.add_FireflyServicer_to_server(HostService(host), server)
+    server.add_insecure_port(f"[::]:{port}")
+    server.start()
+    return server
+
+
+def handle_signal(signal, frame):
+    """Signalhandler zum Beenden."""
+    global RUNNING
+    RUNNING = False
+
+
+signal.signal(signal.SIGTERM, handle_signal)
+signal.signal(signal.SIGINT, handle_signal)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Firefly Host: simuliert einen Block von Glühwürmchen in einem Prozess")
+    parser.add_argument("--n", type=int, required=True, help="Anzahl der Zeilen (Höhe des Gitters)")
+    parser.add_argument("--m", type=int, required=True, help="Anzahl der Spalten (Breite des Gitters)")
+    parser.add_argument("--hosts", type=int, default=None, help="Anzahl der Host-Prozesse (höchstens n), ohne --layout erforderlich")
+    parser.add_argument("--index", type=int, required=True, help="Nummer dieses Host-Prozesses bzw. Knotens im Layout (ab 0)")
+    parser.add_argument("--k", type=float, default=0.1, help="Kopplungsstärke (Standard: 0.1)")
+    parser.add_argument("--omega", type=float, default=0.75, help="Natürliche Frequenz (Standard: 0.75)")
+    parser.add_argument("--rpc-timeout", type=float, default=0.05,
+                        help="Frist in Sekunden für die Abfrage der Randphasen fremder Hosts (Standard: 0.05)")
+    add_topology_arguments(parser)
+    add_layout_arguments(parser)
+    add_scheduler_arguments(parser, 0.1)
+    parser.add_argument("--stats-file", type=str, default=None, help="Beim Beenden Schritte, CPU-Zeit und Speicher als JSON hierhin schreiben")
+    args = parser.parse_args()
+    if not args.layout and (args.hosts is None or not 1 <= args.hosts <= args.n):
+        parser.error("ohne --layout muss --hosts zwischen 1 und n liegen")
+
+    # Blöcke aus der Cluster-Datei oder gleich große Zeilenblöcke auf localhost
+    layout = layout_from_args(args.n, args.m, args, hosts=args.hosts)
+    if not 0 <= args.index < len(layout.blocks):
+        parser.error(f"--index muss zwischen 0 und {len(layout.blocks) - 1} liegen")
+    host = FireflyHost(layout, args.index, topology_from_args(args.n, args.m, args), args.omega, args.k,
+                       rpc_timeout=args.rpc_timeout)
+
+    start_time = time.time()
+    server = serve(host.block.port, host)
+    print(f"Host {args.index}: Glühwürmchen {host.block.start} bis {host.block.stop - 1} auf Port {host.block.port}")
+    scheduler = StepScheduler(args.step_period, aligned=True)
+    host.run(scheduler)
+    server.stop(0)
+
+    if args.stats_file:
+        write_stats(args.stats_file, id=args.index, fireflies=len(host.block.ids),
+                    elapsed_s=time.time() - start_time, **scheduler.stats())
@@ -1,54 +1,165 @@
+import os
+import sys
 import grpc
 import fireflys_pb2
-import fireflys_pb2_grpc
 import tkinter as tk
 import time
-import math
 from threading import Thread, Lock
 from concurrent.futures import ThreadPoolExecutor
 
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "..", "common"))
+
+from sync import SyncTracker
+from renderer import PhaseRenderer, cell_size_for
+from phase_trace import add_trace_arguments, writer_from_args
+from channel_pool import ChannelPool
+from phase_subscription import PhaseCache
+from layout import block_layout, add_layout_arguments, layout_from_args
+from aggregator import unpack_phases
+from polling import AdaptivePollInterval, pool_size
+from scheduler import StepScheduler
+from phase_registry import PhaseRegistry, add_registry_arguments
+
 class Observer:
-    def __init__(self, n, m, firefly_host="localhost"):
+    def __init__(self, n, m, firefly_host="localhost", sync_threshold=0.99, sync_window=1, recorder=None, subscribe=False, hosts=0, aggregator=None, poll_interval=0.08, layout=None, host_processes=False, registry=None):
         """
         Initialisiert den Observer.
         :param n: Anzahl der Zeilen im Gitter
         :param m: Anzahl der Spalten im Gitter
         :param firefly_host: Basisadresse der Fireflies (z. B. 'localhost' oder IP-Adresse)
+        :param sync_threshold: Ordnungsparameter r, ab dem das Gitter als synchron gilt
+        :param sync_window: Anzahl aufeinanderfolgender Abfragen, die r über dem Schwellwert liegen muss
+        :param recorder: Optionaler TraceWriter, der jede Abfrage aufzeichnet
+        :param subscribe: Phasen per SubscribePhase-Stream empfangen statt regelmäßig abzufragen
+        :param hosts: Anzahl der Host-Prozesse (host.py); 0, wenn jedes Glühwürmchen ein eigener Prozess ist
+        :param aggregator: Adresse eines Aggregators (host:port); dann genügt ein GetGrid-Aufruf pro Frame
+        :param poll_interval: Minimales Intervall zwischen zwei Abfragedurchläufen in Sekunden
+        :param layout: Cluster-Layout, das die IDs auf Rechner verteilt (ersetzt firefly_host und hosts)
+        :param host_processes: Die Blöcke des Layouts sind Host-Prozesse statt einzelner Glühwürmchen
+        :param registry: PhaseRegistry der Glühwürmchen auf diesem Rechner; dann werden die Phasen direkt gelesen
         """
         self.n = n
         self.m = m
         self.firefly_host = firefly_host  # Basisadresse der Fireflies
         self.phases = [0] * (n * m)  # Phasen aller Glühwürmchen
-        self.executor = ThreadPoolExecutor(max_workers=10)  # Thread-Pool für parallele Abfragen
+        self.reported = [False] * (n * m)  # Glühwürmchen, von denen schon eine Phase vorliegt
+        self.ready = False  # Erst wenn alle gemeldet haben, wird r ausgewertet (sonst zählen die Startwerte 0 mit)
+        self.pool = ChannelPool()  # Langlebige Kanäle zu allen Glühwürmchen
         self.latencies = []  # Liste zur Speicherung der Latenzen
         self.latency_lock = Lock()  # Lock für thread-sicheren Zugriff auf die Latenzliste
         self.running = True  # Kontroll-Flag für das Beenden der Threads
+        self.sync = SyncTracker(threshold=sync_threshold, window=sync_window)  # Ordnungsparameter der Abfragen
+        self.recorder = recorder  # Aufzeichnung der abgefragten Phasen (optional)
+        self.subscribe = subscribe
+        self.cache = None  # PhaseCache im Abonnement-Modus
+        self.host_processes = host_processes or hosts > 0
+        self.layout = layout if layout is not None else block_layout(n, m, max(hosts, 1), host=firefly_host)
+        self.aggregator = aggregator
+        self.registry = registry
+        self.grid_version = None  # Version des zuletzt übernommenen Schnappschusses
+        # Thread-Pool für parallele Abfragen, so groß wie die Anzahl der Aufrufe pro Durchlauf (begrenzt)
+        self.executor = ThreadPoolExecutor(max_workers=pool_size(len(self.layout.blocks) if self.host_processes else n * m))
+        self.poll = AdaptivePollInterval(poll_interval)  # Intervall passt sich an die Dauer der Durchläufe an
+        self.scheduler = StepScheduler(poll_interval)  # Takt der Abfragen auf der monotonen Uhr
 
     def fetch_phases(self):
         """Fragt regelmäßig die Phasen aller Glühwürmchen ab."""
         def query_firefly(i):
             """Hilfsfunktion, um die Phase eines einzelnen Glühwürmchens abzufragen."""
-            address = f"{self.firefly_host}:{5001 + i}"  # Dynamische Adresse basierend auf ID
+            address = self.layout.firefly_address(i)  # Adresse laut Cluster-Layout
+            stub = self.pool.stub(address)
+            try:
+                start_time = time.time()  # Startzeit der Anfrage (ohne Verbindungsaufbau)
+                response = stub.GetPhase(fireflys_pb2.PhaseRequest(id=i), timeout=1.0)
+                end_time = time.time()  # Endzeit der Antwort
+                latency = (end_time - start_time) * 1000  # Latenz in Millisekunden
+                self.pool.succeeded(address)
+
+                # Speichere die Latenz thread-sicher
+                with self.latency_lock:
+                    self.latencies.append(latency)
+
+                self.phases[i] = response.phase  # Phase speichern
+                self.reported[i] = True
+            except grpc.RpcError:
+                self.pool.failed(address)  # Verbindungsfehler ignorieren, Kanal ggf. neu anlegen
+
+        def query_host(block):
+            """Fragt alle Phasen eines Host-Prozesses mit einem GetPhases-Aufruf ab."""
+            stub = self.pool.stub(block.address)
             try:
-                start_time = time.time()  # Startzeit der Anfrage
-                with grpc.insecure_channel(address) as channel:
-                    stub = fireflys_pb2_grpc.FireflyStub(channel)
-                    response = stub.GetPhase(fireflys_pb2.PhaseRequest(id=i))
-                    end_time = time.time()  # Endzeit der Antwort
-                    latency = (end_time - start_time) * 1000  # Latenz in Millisekunden
-
-                    # Speichere die Latenz thread-sicher
-                    with self.latency_lock:
-                        self.latencies.append(latency)
-
-                    self.phases[i] = response.phase  # Phase speichern
+                start_time = time.time()
+                response = stub.GetPhases(fireflys_pb2.PhasesRequest(ids=list(block.ids)), timeout=1.0)
+                latency = (time.time() - start_time) * 1000
+                self.pool.succeeded(block.address)
+                with self.latency_lock:
+                    self.latencies.append(latency)
+                self.phases[block.start:block.stop] = response.phases
+                self.reported[block.start:block.stop] = [True] * len(block.ids)
             except grpc.RpcError:
-                pass  # Ignoriere Verbindungsfehler
+                self.pool.failed(block.address)
+
+        def query_aggregator():
+            """Holt das gesamte Gitter mit einem GetGrid-Aufruf. Gibt False zurück, wenn sich nichts geändert hat."""
+            stub = self.pool.stub(self.aggregator)
+            try:
+                start_time = time.time()
+                snapshot = stub.GetGrid(fireflys_pb2.GridRequest(), timeout=1.0)
+                latency = (time.time() - start_time) * 1000
+                self.pool.succeeded(self.aggregator)
+            except grpc.RpcError:
+                self.pool.failed(self.aggregator)
+                return False
+            with self.latency_lock:
+                self.latencies.append(latency)
+            if snapshot.version == self.grid_version or not snapshot.complete:
+                return False  # Unverändert bzw. noch nicht von allen Glühwürmchen gemeldet
+            self.grid_version = snapshot.version
+            self.phases = unpack_phases(snapshot)
+            self.reported = [True] * (self.n * self.m)
+            return True
+
+        if self.subscribe:
+            addresses = [self.layout.firefly_address(i) for i in range(self.n * self.m)]
+            self.cache = PhaseCache(self.pool, addresses, -1)
 
         while self.running:
-            # Parallele Abfragen aller Fireflies
-            self.executor.map(query_firefly, range(self.n * self.m))
-            time.sleep(0.08)  # Intervall zwischen Anfragen
+            sweep_start = time.monotonic()
+            changed = True
+            if self.aggregator is not None:
+                # Ein Aufruf pro Frame, unabhängig von der Gittergröße
+                changed = query_aggregator()
+            elif self.registry is not None:
+                # Phasen direkt aus dem Shared Memory, ohne einen einzigen Aufruf
+                self.phases = self.registry.snapshot(self.phases)
+                self.reported = (self.registry.stamps > 0).tolist()
+            elif self.cache is not None:
+                # Phasen aus den Streams übernehmen, keine Anfragen nötig
+                received = [self.cache.get(address) for address in addresses]
+                self.reported = [phase is not None for phase in received]
+                self.phases = [phase if new is None else new for phase, new in zip(self.phases, received)]
+            elif self.host_processes:
+                # Ein Aufruf pro Host-Prozess statt einer pro Glühwürmchen; Ergebnisse abwarten,
+                # damit nie mehr als ein Durchlauf unterwegs ist
+                list(self.executor.map(query_host, self.layout.blocks))
+            else:
+                # Parallele Abfragen aller Fireflies, ebenfalls vollständig abgewartet
+                list(self.executor.map(query_firefly, range(self.n * self.m)))
+
+            if not self.ready:
+                self.ready = all(self.reported)
+            if changed and self.ready:
+                self.sync.update_phases(self.phases, step=self.grid_version if self.aggregator is not None else None)
+                if self.recorder is not None:
+                    self.recorder.record(self.sync.step, self.phases)
+            # Intervall an die Dauer des Durchlaufs anpassen und bis zum nächsten Takt warten
+            self.poll.finish(time.monotonic() - sweep_start)
+            self.scheduler.period = self.poll.interval
+            self.scheduler.wait()
+
+    def order_parameter(self):
+        """Gibt den zuletzt berechneten Ordnungsparameter und den Synchronisationszustand zurück."""
+        return self.sync.stats()
 
     def calculate_and_print_latency_stats(self):
         """Berechnet und gibt die Latenzstatistiken aus."""
@@ -61,40 +172,49 @@ class Observer:
                     avg_latency = sum(self.latencies) / len(self.latencies)
                     print(f"Latency Stats: Max: {max_latency:.2f} ms, Min: {min_latency:.2f} ms, Avg: {avg_latency:.2f} ms")
                     self.latencies.clear()  # Zurücksetzen der Liste nach Ausgabe
+                elif self.cache is not None:
+                    print(f"Subscription Stats: {self.cache.updates} Phasen empfangen")
                 else:
                     print("Latency Stats: No data collected in the last interval.")
+            poll = self.poll.stats()
+            self.poll.reset()
+            print(f"Poll Stats: {poll['sweeps']} Durchläufe, Dauer {poll['sweep_ms']:.1f} ms, "
+                  f"Intervall {poll['interval_ms']:.0f} ms, Überläufe: {poll['overruns']} ({poll['skipped']} Takte verpasst)")
+            if self.sync.order is not None:
+                state = f"synchron seit Abfrage {self.sync.streak_start}" if self.sync.synced else "nicht synchron"
+                if self.sync.sync_step is not None:
+                    state += f", zuerst synchron ab Abfrage {self.sync.sync_step}"
+                print(f"Order Parameter: r = {self.sync.order:.4f} ({state})")
 
     def visualize(self):
         """Visualisiert die Zustände der Glühwürmchen."""
         root = tk.Tk()
         root.title("Firefly Observer")
 
-        canvas = tk.Canvas(root, width=self.m * 50, height=self.n * 50)
+        cell_size = cell_size_for(self.n, self.m)
+        canvas = tk.Canvas(root, width=self.m * cell_size, height=self.n * cell_size)
         canvas.pack()
 
-        # Rechtecke für die Visualisierung erstellen
-        rectangles = [[None for _ in range(self.m)] for _ in range(self.n)]
-        for i in range(self.n):
-            for j in range(self.m):
-                x0, y0 = (j * 50, i * 50)
-                x1, y1 = (x0 + 50, y0 + 50)
-                rectangles[i][j] = canvas.create_rectangle(x0, y0, x1, y1, fill='black')
+        # Das gesamte Gitter wird als ein Bild gezeichnet
+        renderer = PhaseRenderer(canvas, self.n, self.m, cell_size)
 
         def update_gui():
             """Aktualisiert die GUI basierend auf den Phasen."""
             if self.running:
-                for i in range(self.n):
-                    for j in range(self.m):
-                        idx = i * self.m + j
-                        phase = self.phases[idx]
-                        color = int((math.sin(phase) + 1) * 127.5)  # Phase -> Farbe
-                        canvas.itemconfig(rectangles[i][j], fill=f'#{color:02x}{color:02x}{color:02x}')
-                root.after(500, update_gui)  # Aktualisierungsintervall auf 500 ms gesetzt
+                if self.sync.order is not None:
+                    root.title(f"Firefly Observer - r = {self.sync.order:.3f}")
+                renderer.draw(self.phases)  # Zeichnet nur, wenn sich die Phasen geändert haben
+                root.after(100, update_gui)  # Unveränderte Frames kosten nichts, daher kurzes Intervall
 
         def on_close():
             """Handler zum Beenden des Programms."""
             self.running = False
             self.executor.shutdown(wait=False)  # Stoppe den Thread-Pool
+            if self.cache is not None:
+                self.cache.close()  # Streams abbrechen
+            self.pool.close()  # Kanäle schließen
+            if self.recorder is not None:
+                self.recorder.close()  # Restliche Frames schreiben
             root.destroy()
 
         root.protocol("WM_DELETE_WINDOW", on_close)  # Schließen-Handler hinzufügen
@@ -114,8 +234,25 @@ if __name__ == "__main__":
     parser.add_argument("--n", type=int, required=True, help="Anzahl der Zeilen")
     parser.add_argument("--m", type=int, required=True, help="Anzahl der Spalten")
     parser.add_argument("--firefly-host", type=str, default="localhost", help="Host-Adresse der Fireflies (Standard: localhost)")
+    parser.add_argument("--sync-threshold", type=float, default=0.99, help="Ordnungsparameter r, ab dem das Gitter als synchron gilt (Standard: 0.99)")
+    parser.add_argument("--sync-window", type=int, default=1, help="Anzahl aufeinanderfolgender Abfragen über dem Schwellwert (Standard: 1)")
+    parser.add_argument("--subscribe", action="store_true", help="Phasen per SubscribePhase-Stream empfangen statt abzufragen")
+    parser.add_argument("--hosts", type=int, default=0, help="Anzahl der Host-Prozesse, falls die Glühwürmchen mit host.py gestartet wurden")
+    add_layout_arguments(parser, host_processes=True)
+    add_registry_arguments(parser)
+    parser.add_argument("--aggregator", type=str, default=None,
+                        help="Adresse des Aggregators (z. B. localhost:5000); dann ein GetGrid-Aufruf pro Frame")
+    parser.add_argument("--poll-interval", type=float, default=0.08,
+                        help="Minimales Intervall zwischen zwei Abfragedurchläufen in Sekunden (Standard: 0.08)")
+    add_trace_arguments(parser)
     args = parser.parse_args()
 
     # Starte den Observer
-    observer = Observer(args.n, args.m, firefly_host=args.firefly_host)
+    observer = Observer(args.n, args.m, firefly_host=args.firefly_host,
+                        sync_threshold=args.sync_threshold, sync_window=args.sync_window,
+                        recorder=writer_from_args(args.n, args.m, args), subscribe=args.subscribe, hosts=args.hosts,
+                        aggregator=args.aggregator, poll_interval=args.poll_interval,
+                        layout=layout_from_args(args.n, args.m, args, host=args.firefly_host, hosts=max(args.hosts, 1)),
+                        host_processes=args.host_processes,
+                        registry=PhaseRegistry(args.shm_registry, args.n * args.m) if args.shm_registry else None)
     observer.start()
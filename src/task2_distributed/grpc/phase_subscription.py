@@ -0,0 +1,118 @@
+import time
+import threading
+
+import grpc
+import fireflys_pb2
+
+from neighbor_cache import NeighborCache
+
+
+class PhasePublisher:
+    """Verteilt neue Phasen eines Glühwürmchens an alle SubscribePhase-Streams.
+
+    Jeder Stream wartet auf einer gemeinsamen Condition, bis sich die Versionsnummer ändert,
+    und sendet dann die aktuelle Phase. Langsame Abonnenten überspringen Zwischenstände.
+    """
+
+    def __init__(self, shared_phase):
+        """
+        :param shared_phase: Geteilte Phase des Glühwürmchens (multiprocessing.Value)
+        """
+        self.shared_phase = shared_phase
+        self.version = 0
+        self.condition = threading.Condition()
+        self.closed = False
+
+    def publish(self):
+        """Meldet allen Abonnenten, dass sich die Phase geändert hat."""
+        with self.condition:
+            self.version += 1
+            self.condition.notify_all()
+
+    def close(self):
+        """Beendet alle offenen Streams."""
+        with self.condition:
+            self.closed = True
+            self.condition.notify_all()
+
+    def stream(self, context, poll_interval=1.0):
+        """Generator für SubscribePhase: sendet die aktuelle Phase und danach jede neue Phase."""
+        seen = -1
+        while not self.closed and context.is_active():
+            with self.condition:
+                if self.version == seen:
+                    self.condition.wait(poll_interval)  # Timeout, damit abgebrochene Streams bemerkt werden
+                if self.closed or self.version == seen:
+                    continue
+                seen = self.version
+            yield fireflys_pb2.PhaseResponse(phase=self.shared_phase.value)
+
+
+class PhaseCache:
+    """Lokaler Cache der letzten Phasen mehrerer Glühwürmchen, gefüllt über SubscribePhase-Streams.
+
+    Pro Adresse läuft ein Hintergrund-Thread, der den Stream liest. Die Phasen landen mit Zeitstempel
+    in einem NeighborCache; bricht ein Stream ab, wird erst nach der Sperrzeit des Circuit Breakers
+    neu abonniert. Der Simulationsschritt liest nur noch aus dem Speicher.
+    """
+
+    def __init__(self, pool, addresses, requester_id, neighbors=None):
+        """
+        :param pool: ChannelPool, aus dem die Stubs stammen
+        :param addresses: Adressen der abonnierten Glühwürmchen
+        :param requester_id: ID des Abonnenten (wird in PhaseRequest mitgeschickt)
+        :param neighbors: NeighborCache für Staleness-Policy und Breaker (Standard: letzte Phase behalten)
+        """
+        self.pool = pool
+        self.addresses = list(addresses)
+        self.requester_id = requester_id
+        self.neighbors = neighbors if neighbors is not None else NeighborCache(self.addresses, policy="hold")
+        self.updates = 0  # Anzahl empfangener Nachrichten
+        self.running = True
+        self.calls = {}
+        self.lock = threading.Lock()
+        self.threads = [threading.Thread(target=self._follow, args=(address,), daemon=True)
+                        for address in self.addresses]
+        for thread in self.threads:
+            thread.start()
+
+    def _follow(self, address):
+        """Liest den Stream einer Adresse, bis der Cache geschlossen wird."""
+        while self.running:
+            if not self.neighbors.should_query(address):
+                time.sleep(0.05)  # Breaker offen: erst nach der Sperrzeit neu abonnieren
+                continue
+            call = self.pool.stub(address).SubscribePhase(fireflys_pb2.PhaseRequest(id=self.requester_id))
+            with self.lock:
+                if not self.running:
+                    call.cancel()
+                    return
+                self.calls[address] = call
+            try:
+                for response in call:
+                    self.neighbors.update(address, response.phase)
+                    self.updates += 1
+                self.pool.succeeded(address)  # Stream regulär beendet (Server fährt herunter)
+            except grpc.RpcError:
+                self.pool.failed(address)
+            if self.running:
+                self.neighbors.failed(address)
+
+    def values(self):
+        """Gibt die gemäß Staleness-Policy verwendbaren Phasen aller Adressen zurück."""
+        return self.neighbors.values()
+
+    def average(self, own_phase):
+        """Mittelwert der verwendbaren Phasen; ohne verwendbare Phase die eigene Phase."""
+        return self.neighbors.average(own_phase)
+
+    def get(self, address, default=None):
+        """Gibt die letzte verwendbare Phase einer Adresse zurück."""
+        return self.neighbors.get(address, default)
+
+    def close(self):
+        """Bricht alle Streams ab."""
+        with self.lock:
+            self.running = False
+            for call in self.calls.values():
+                call.cancel()
@@ -11,10 +11,13 @@ while getopts "n:m:k:o:" opt; do
     m) m=$OPTARG ;;
     k) k=$OPTARG ;;
     o) omega=$OPTARG ;;
-    *) echo "Usage: $0 -n <rows> -m <cols> [-k <K>] [-o <OMEGA>]" >&2
+    *) echo "Usage: $0 -n <rows> -m <cols> [-k <K>] [-o <OMEGA>] [-- <weitere Firefly-Argumente>]" >&2
        exit 1 ;;
   esac
 done
+shift $((OPTIND - 1))
+# Alles nach "--" wird unverändert an fireflys.py weitergereicht (bzw. als Launcher-Option, z. B. --batch-size) (z. B. --topology von_neumann --radius 2)
+extra_args=("$@")
 
 # Überprüfen, ob die erforderlichen Argumente gesetzt sind
 if [ -z "$n" ] || [ -z "$m" ]; then
@@ -26,23 +29,7 @@ fi
 k=${k:-$DEFAULT_K}
 omega=${omega:-$DEFAULT_OMEGA}
 
-# Starte die Glühwürmchen
-total=$((n * m))
-pids=()
-for id in $(seq 0 $((total - 1))); do
-  # echo "Starting Firefly $id..."
-  python3 fireflys.py --n "$n" --m "$m" --id "$id" --k "$k" --omega "$omega" &
-  pids+=($!)
-done
-
-# Warten auf Benutzereingabe zum Beenden
-echo "Fireflies started. Press [Enter] to stop."
-read -r
-
-# Beende alle Prozesse
-echo "Stopping Fireflies..."
-for pid in "${pids[@]}"; do
-  kill "$pid"
-done
-
-echo "All Fireflies stopped."
+# Starte die Glühwürmchen über den Launcher: ein Forkserver lädt grpc nur einmal vor, gestartet wird
+# gruppenweise mit Prüfung der Ports; [Enter] oder Strg+C beendet alle Glühwürmchen sauber
+cd "$(dirname "$0")" || exit 1
+exec python3 ../launcher.py --variant grpc --n "$n" --m "$m" --k "$k" --omega "$omega" "${extra_args[@]}"
@@ -0,0 +1,218 @@
+import os
+import sys
+import time
+import signal
+import logging
+import argparse
+import threading
+import multiprocessing
+
+DISTRIBUTED_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(DISTRIBUTED_DIR, "..", "common"))
+
+from layout import block_layout, load_layout
+from ports import wait_for_ports
+import phase_registry
+from phase_registry import PhaseRegistry, registry_name
+
+# Module, die der Forkserver einmal vorab importiert; jedes Glühwürmchen erbt sie per fork() statt sie neu zu laden.
+# fireflys.py selbst wird nicht vorgeladen: es legt beim Import das Beenden-Flag (RUNNING) im Shared Memory an,
+# das sonst alle Glühwürmchen gemeinsam hätten.
+COMMON_PRELOAD = ["numpy", "topology", "neighbor_cache", "scheduler", "proc_stats", "layout", "phase_registry"]
+VARIANTS = {
+    "grpc": ["grpc", "grpc.aio", "fireflys_pb2", "fireflys_pb2_grpc", "channel_pool", "phase_subscription",
+             "async_gather", "lockstep"],
+    "thrift": ["thrift.transport.TSocket", "thrift.transport.TTransport", "thrift.protocol.TBinaryProtocol",
+               "thrift.server.TServer", "thrift.server.TNonblockingServer", "gen_py.fireflys.FireflyService",
+               "gen_py.fireflys.ttypes", "stack"],
+}
+
+
+def run_firefly(argv, quiet):
+    """Einstiegspunkt eines Glühwürmchen-Prozesses (läuft im Kindprozess des Forkservers)."""
+    if quiet:
+        devnull = os.open(os.devnull, os.O_WRONLY)
+        os.dup2(devnull, sys.stdout.fileno())
+        # Thrift meldet jeden fehlgeschlagenen Verbindungsaufbau zu einem Nachbarn über logging auf stderr;
+        # andere Fehler und Tracebacks bleiben sichtbar
+        logging.getLogger("thrift.transport.TSocket").setLevel(logging.CRITICAL + 1)
+    # Der Forkserver reicht den resource_tracker des Launchers weiter, der das Register angelegt hat
+    phase_registry.share_creator_tracker()
+    import fireflys
+    fireflys.main(argv)
+
+
+class Supervisor:
+    """Startet die Glühwürmchen einer Variante über einen Forkserver, prüft ihre Ports und beendet sie wieder.
+
+    Der Forkserver importiert grpc bzw. thrift, NumPy und die gemeinsamen Module nur einmal; jedes
+    Glühwürmchen entsteht per fork() aus diesem vorgewärmten Prozess. Gestartet wird in Gruppen von
+    `batch_size` Prozessen, die nächste Gruppe erst, wenn alle Ports der vorigen Verbindungen annehmen.
+    """
+
+    def __init__(self, variant, n, m, firefly_args, quiet=False, layout=None, ids=None):
+        """
+        :param variant: "grpc" oder "thrift"
+        :param firefly_args: Zusätzliche Argumente für jedes Glühwürmchen (ohne --n, --m und --id);
+                             "{id}" wird durch die ID des Glühwürmchens ersetzt
+        :param quiet: Ausgaben der Glühwürmchen und Thrift-Verbindungsfehler verwerfen
+        :param layout: Cluster-Layout, aus dem die Ports der Glühwürmchen stammen (Standard: alle auf localhost)
+        :param ids: IDs, die auf diesem Rechner gestartet werden (Standard: alle)
+        """
+        self.variant = variant
+        self.n = n
+        self.m = m
+        self.firefly_args = list(firefly_args)
+        self.quiet = quiet
+        self.layout = layout if layout is not None else block_layout(n, m, 1)
+        self.ids = list(ids) if ids is not None else list(range(n * m))
+        self.processes = {}  # ID -> multiprocessing.Process
+        self.reported = set()  # IDs, deren Ende bereits gemeldet wurde
+        self.stopping = threading.Event()  # Wird bei SIGTERM/SIGINT oder [Enter] gesetzt
+
+        # Der Forkserver übernimmt sys.path des Launchers, die Variante muss vor dem Start darin stehen
+        sys.path.insert(0, os.path.join(DISTRIBUTED_DIR, variant))
+        self.context = multiprocessing.get_context("forkserver")
+        self.context.set_forkserver_preload(["__main__"] + COMMON_PRELOAD + VARIANTS[variant])
+
+    def spawn(self, id):
+        """Startet das Glühwürmchen mit der angegebenen ID."""
+        argv = ["--n", str(self.n), "--m", str(self.m), "--id", str(id)]
+        argv += [arg.replace("{id}", str(id)) for arg in self.firefly_args]  # z. B. --stats-file stats/{id}.json
+        process = self.context.Process(target=run_firefly, args=(argv, self.quiet), name=f"firefly-{id}")
+        process.start()
+        self.processes[id] = process
+
+    def alive(self, ids=None):
+        """Gibt an, ob alle (bzw. die angegebenen) Glühwürmchen noch laufen."""
+        ids = self.processes if ids is None else ids
+        return all(self.processes[id].is_alive() for id in ids)
+
+    def start(self, batch_size, timeout):
+        """Startet alle Glühwürmchen gruppenweise. Gibt die Zeit bis zur Bereitschaft des Gitters zurück (None bei Fehler)."""
+        total = len(self.ids)
+        started = time.monotonic()
+        for first in range(0, total, batch_size):
+            ids = self.ids[first:first + batch_size]
+            for id in ids:
+                self.spawn(id)
+            remaining = timeout - (time.monotonic() - started)
+            # Die Glühwürmchen laufen auf diesem Rechner, geprüft wird daher immer über localhost
+            ports = [self.layout.owner(id).firefly_port + id for id in ids]
+            if not wait_for_ports("localhost", ports, max(0.0, remaining),
+                                  alive=lambda: self.alive(ids) and not self.stopping.is_set()):
+                dead = [id for id in ids if not self.processes[id].is_alive()]
+                if self.stopping.is_set():
+                    reason = "Abbruch durch Signal oder Eingabe"
+                elif dead:
+                    reason = f"Glühwürmchen {dead} beendet"
+                else:
+                    reason = f"Timeout nach {timeout} s"
+                print(f"Start abgebrochen: {reason}", file=sys.stderr)
+                return None
+            print(f"{first + len(ids)}/{total} Glühwürmchen bereit ({time.monotonic() - started:.2f} s)")
+        return time.monotonic() - started
+
+    def check(self):
+        """Meldet Glühwürmchen, die sich seit dem letzten Aufruf unerwartet beendet haben."""
+        for id, process in self.processes.items():
+            if id not in self.reported and not process.is_alive():
+                self.reported.add(id)
+                print(f"Glühwürmchen {id} beendet (Exit-Code {process.exitcode})", file=sys.stderr)
+
+    def stop(self, timeout=5.0):
+        """Beendet alle Glühwürmchen per SIGTERM; wer nach `timeout` Sekunden noch läuft, wird per SIGKILL beendet.
+
+        Gibt die Anzahl der hart beendeten Prozesse zurück.
+        """
+        for process in self.processes.values():
+            if process.is_alive():
+                os.kill(process.pid, signal.SIGTERM)
+        deadline = time.monotonic() + timeout
+        killed = 0
+        for process in self.processes.values():
+            process.join(max(0.0, deadline - time.monotonic()))
+            if process.is_alive():
+                process.kill()
+                process.join()
+                killed += 1
+        return killed
+
+
+def main():
+    parser = argparse.ArgumentParser(allow_abbrev=False,  # Abkürzungen könnten Argumente der Glühwürmchen verschlucken
+                                     description="Startet alle Glühwürmchen einer verteilten Variante und überwacht sie. "
+                                                 "Unbekannte Argumente werden an jedes Glühwürmchen weitergereicht.")
+    parser.add_argument("--variant", choices=sorted(VARIANTS), default="grpc", help="Verteilte Variante (Standard: grpc)")
+    parser.add_argument("--n", type=int, required=True, help="Anzahl der Zeilen (Höhe des Gitters)")
+    parser.add_argument("--m", type=int, required=True, help="Anzahl der Spalten (Breite des Gitters)")
+    parser.add_argument("--layout", type=str, default=None,
+                        help="Cluster-Datei (JSON); wird an die Glühwürmchen weitergereicht (Standard: alle auf localhost)")
+    parser.add_argument("--node", type=int, default=None,
+                        help="Nur die Glühwürmchen dieses Knotens aus --layout starten (Standard: alle)")
+    parser.add_argument("--batch-size", type=int, default=32,
+                        help="Glühwürmchen pro Startgruppe; die nächste Gruppe startet, wenn alle Ports bereit sind (Standard: 32)")
+    parser.add_argument("--startup-timeout", type=float, default=120.0,
+                        help="Höchste Zeit in Sekunden, bis alle Ports bereit sein müssen (Standard: 120)")
+    parser.add_argument("--stop-timeout", type=float, default=5.0,
+                        help="Wartezeit in Sekunden nach SIGTERM, danach SIGKILL (Standard: 5)")
+    parser.add_argument("--quiet", action="store_true", help="Ausgaben der Glühwürmchen und Thrift-Verbindungsfehler verwerfen")
+    parser.add_argument("--shm", action="store_true",
+                        help="Shared-Memory-Phasenregister anlegen: Glühwürmchen dieses Rechners lesen sich gegenseitig "
+                             "direkt, RPC nur noch zu anderen Knoten")
+    args, firefly_args = parser.parse_known_args()
+
+    layout = load_layout(args.layout, args.n, args.m) if args.layout else block_layout(args.n, args.m, 1)
+    node = layout.blocks[0]
+    ids = None
+    if args.layout:
+        firefly_args += ["--layout", os.path.abspath(args.layout)]
+    if args.node is not None:
+        if not args.layout or not 0 <= args.node < len(layout.blocks):
+            parser.error(f"--node erfordert --layout und muss zwischen 0 und {len(layout.blocks) - 1} liegen")
+        node = layout.blocks[args.node]
+        ids = node.ids
+    registry = None
+    if args.shm:
+        # Ein Register pro Knoten; angelegt und wieder freigegeben wird es vom Launcher
+        registry = PhaseRegistry(registry_name(args.n, args.m, node.firefly_port), args.n * args.m, create=True)
+        firefly_args += ["--shm-registry", registry.name]
+        print(f"Shared-Memory-Register: {registry.name} (Observer: --shm-registry {registry.name})")
+    supervisor = Supervisor(args.variant, args.n, args.m, firefly_args, quiet=args.quiet, layout=layout, ids=ids)
+
+    def handle_signal(signum, frame):
+        supervisor.stopping.set()
+
+    signal.signal(signal.SIGTERM, handle_signal)
+    signal.signal(signal.SIGINT, handle_signal)
+
+    ready = supervisor.start(args.batch_size, args.startup_timeout)
+    if ready is None:
+        supervisor.stop(args.stop_timeout)
+        if registry is not None:
+            registry.unlink()
+        sys.exit(1)
+    print(f"{len(supervisor.ids)} Glühwürmchen des {args.n}x{args.m}-Gitters ({args.variant}) bereit nach {ready:.2f} s. [Enter] oder Strg+C zum Beenden.")
+
+    def wait_for_enter():
+        try:
+            input()
+            supervisor.stopping.set()
+        except EOFError:
+            pass  # Keine Eingabe (z. B. im Hintergrund gestartet): nur per Signal beenden
+
+    threading.Thread(target=wait_for_enter, daemon=True).start()
+    while not supervisor.stopping.wait(1.0):
+        supervisor.check()
+
+    print("Beende Glühwürmchen...")
+    started = time.monotonic()
+    killed = supervisor.stop(args.stop_timeout)
+    print(f"Alle Glühwürmchen beendet nach {time.monotonic() - started:.2f} s"
+          + (f" ({killed} per SIGKILL)" if killed else ""))
+    if registry is not None:
+        registry.unlink()
+
+
+if __name__ == "__main__":
+    main()
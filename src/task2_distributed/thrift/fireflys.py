@@ -1,96 +1,173 @@
 from gen_py.fireflys import FireflyService
-from gen_py.fireflys.ttypes import PhaseResponse
-from thrift.transport import TSocket, TTransport
-from thrift.protocol import TBinaryProtocol
-from thrift.server import TServer
+from gen_py.fireflys.ttypes import PhaseResponse, GridResponse, InvalidIds
+from stack import ClientPool, make_server, add_stack_arguments
 from multiprocessing import Value
 import threading
 import time
 import math
 import random
 import argparse
+import signal
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "..", "common"))
+
+from topology import add_topology_arguments, topology_from_args
+from layout import add_layout_arguments, layout_from_args
+from proc_stats import write_stats
+from neighbor_cache import add_neighbor_cache_arguments, cache_from_args
+from scheduler import StepScheduler, add_scheduler_arguments
+from phase_registry import PhaseRegistry, add_registry_arguments
 
 # Globales Flag zum Beenden
 RUNNING = Value('b', True)
 
 class FireflyServiceHandler:
-    def __init__(self, shared_phase, id):
+    def __init__(self, shared_phase, id, n, m, shared_step):
         self.shared_phase = shared_phase
         self.id = id
+        self.n = n
+        self.m = m
+        self.shared_step = shared_step  # Anzahl der ausgeführten Schritte
 
     def getPhase(self, id):
         """Gibt die aktuelle Phase des Glühwürmchens zurück."""
-        print(f"Firefly {self.id} returning phase {self.shared_phase.value}")
         return PhaseResponse(phase=self.shared_phase.value)  # Korrektes Thrift-Objekt zurückgeben
 
+    def getPhases(self, ids):
+        """Gibt die Phasen der angefragten IDs zurück; ein einzelnes Glühwürmchen kennt nur seine eigene."""
+        if any(i != self.id for i in ids):
+            raise InvalidIds(f"Glühwürmchen {self.id} kennt nur die eigene Phase")
+        return [self.shared_phase.value] * len(ids)
+
+    def getGrid(self):
+        """Gibt den Ausschnitt dieses Glühwürmchens zurück (eine Zelle)."""
+        return GridResponse(n=self.n, m=self.m, start=self.id, step=self.shared_step.value, phases=[self.shared_phase.value])
 
-def start_server(port, shared_phase, id):
-    """Startet den Thrift-Server."""
-    handler = FireflyServiceHandler(shared_phase, id)
-    processor = FireflyService.Processor(handler)
-    transport = TSocket.TServerSocket(port=port)
-    tfactory = TTransport.TBufferedTransportFactory()
-    pfactory = TBinaryProtocol.TBinaryProtocolFactory()
 
-    server = TServer.TSimpleServer(processor, transport, tfactory, pfactory)
-    print(f"Firefly {id} Server running on port {port}...")
+def start_server(port, handler, server="threadpool", transport="buffered", threads=16, protocol="binary"):
+    """Startet den Thrift-Server (Thread-Pool oder nonblocking), der Nachbarn und Observer parallel bedient."""
+    processor = FireflyService.Processor(handler)
+    server = make_server(processor, port, server, transport, threads, protocol)
+    print(f"Firefly {handler.id} Server running on port {port}...")
     server.serve()
 
 
-def firefly_client(id, neighbors, shared_phase, omega, k):
-    """Die Logik des Glühwürmchens."""
+def firefly_client(id, neighbors, shared_phase, omega, k, neighbor_cache, scheduler, pool, registry=None, local_neighbors=None,
+                   shared_step=None):
+    """Die Logik des Glühwürmchens. Gibt die Anzahl der ausgeführten Schritte zurück.
+
+    :param neighbor_cache: NeighborCache (Schlüssel "host:port") mit den letzten gültigen Nachbarphasen,
+                           Staleness-Policy und Circuit Breakern
+    :param scheduler: StepScheduler, der die Schrittperiode unabhängig von der Dauer der Abfragen einhält
+    :param pool: ClientPool mit einer dauerhaft offenen Verbindung pro Nachbar
+    :param registry: PhaseRegistry dieses Rechners; die eigene Phase wird nach jedem Schritt hineingeschrieben
+    :param local_neighbors: Nachbarn auf demselben Rechner ({"host:port": ID}), die aus `registry` statt per RPC gelesen werden
+    :param shared_step: Value, in dem die Anzahl der Schritte für getGrid mitgezählt wird
+    """
+    steps = 0
+    local_neighbors = local_neighbors or {}
     while RUNNING.value:
-        neighbors_phase = 0
-        neighbors_count = 0
-
         for neighbor in neighbors:
+            key = f"{neighbor['host']}:{neighbor['port']}"
+            if key in local_neighbors:
+                continue  # Liegt im Shared Memory, siehe unten
+            if not neighbor_cache.should_query(key):
+                continue  # Nachbar ist gesperrt, kein Verbindungsversuch in diesem Schritt
             try:
-                transport = TSocket.TSocket(neighbor["host"], neighbor["port"])
-                transport = TTransport.TBufferedTransport(transport)
-                protocol = TBinaryProtocol.TBinaryProtocol(transport)
-                client = FireflyService.Client(protocol)
-
-                transport.open()
-                response = client.getPhase(id)
-                neighbors_phase += response.phase  # `response.phase` ist der Wert, nicht `response["phase"]`
-                neighbors_count += 1
-                transport.close()
+                with pool.client(neighbor["host"], neighbor["port"]) as client:
+                    response = client.getPhase(id)
+                neighbor_cache.update(key, response.phase)  # `response.phase` ist der Wert, nicht `response["phase"]`
             except Exception as e:
-                print(f"Error connecting to neighbor {neighbor}: {e}")
+                if neighbor_cache.failed(key):  # Nur beim Sperren melden, nicht in jedem Schritt
+                    print(f"Error connecting to neighbor {neighbor}: {e} (nächster Versuch in {neighbor_cache.backoff(key):.1f} s)")
 
-        if neighbors_count > 0:
-            average_phase = neighbors_phase / neighbors_count
-        else:
-            average_phase = 0
+        if local_neighbors:
+            registry.fill(neighbor_cache, local_neighbors)
+
+        # Ohne verwendbare Nachbarphase koppelt das Glühwürmchen in diesem Schritt nicht
+        average_phase = neighbor_cache.average(shared_phase.value)
 
         with shared_phase.get_lock():
             shared_phase.value = (shared_phase.value + omega + k * math.sin(average_phase - shared_phase.value)) % (2 * math.pi)
 
-        time.sleep(0.1)
+        steps += 1
+        if shared_step is not None:
+            shared_step.value = steps
+        if registry is not None:
+            registry.write(id, shared_phase.value)
 
+        scheduler.wait()
 
-if __name__ == "__main__":
+    return steps
+
+
+def handle_signal(signal, frame):
+    """Signalhandler zum Beenden."""
+    RUNNING.value = False
+
+signal.signal(signal.SIGTERM, handle_signal)
+signal.signal(signal.SIGINT, handle_signal)
+
+
+def main(argv=None):
+    """Startet ein Glühwürmchen mit den Kommandozeilenargumenten `argv` (Standard: sys.argv)."""
     parser = argparse.ArgumentParser(description="Firefly Process")
     parser.add_argument("--n", type=int, required=True, help="Anzahl der Zeilen (Höhe des Gitters)")
     parser.add_argument("--m", type=int, required=True, help="Anzahl der Spalten (Breite des Gitters)")
     parser.add_argument("--id", type=int, required=True, help="ID des Glühwürmchens")
     parser.add_argument("--k", type=float, default=0.1, help="Kopplungsstärke (Standard: 0.1)")
     parser.add_argument("--omega", type=float, default=0.75, help="Natürliche Frequenz (Standard: 0.75)")
-    args = parser.parse_args()
+    add_topology_arguments(parser)
+    add_layout_arguments(parser)
+    add_neighbor_cache_arguments(parser)
+    add_scheduler_arguments(parser, 0.1)
+    add_registry_arguments(parser)
+    add_stack_arguments(parser, server=True)
+    parser.add_argument("--stats-file", type=str, default=None, help="Beim Beenden Schritte, CPU-Zeit und Speicher als JSON hierhin schreiben")
+    args = parser.parse_args(argv)
+    if args.server == "nonblocking" and args.transport != "framed":
+        parser.error("--server nonblocking erfordert --transport framed")
 
     shared_phase = Value("d", random.uniform(0, 2 * math.pi))
 
-    port = 5001 + args.id
-    neighbors = []
-    n, m = args.n, args.m
-    row, col = divmod(args.id, m)
-    for dx in [-1, 0, 1]:
-        for dy in [-1, 0, 1]:
-            if dx != 0 or dy != 0:
-                neighbor_row = (row + dx + n) % n
-                neighbor_col = (col + dy + m) % m
-                neighbor_id = neighbor_row * m + neighbor_col
-                neighbors.append({"host": "localhost", "port": 5001 + neighbor_id})
-
-    threading.Thread(target=start_server, args=(port, shared_phase, args.id), daemon=True).start()
-    firefly_client(args.id, neighbors, shared_phase, args.omega, args.k)
+    # Port und Nachbarn aus Cluster-Layout und gemeinsamem Nachbarschaftsindex bestimmen
+    layout = layout_from_args(args.n, args.m, args)
+    port = layout.owner(args.id).firefly_port + args.id
+    topology = topology_from_args(args.n, args.m, args)
+    neighbors = [{"host": layout.owner(neighbor_id).host, "port": layout.owner(neighbor_id).firefly_port + neighbor_id}
+                 for neighbor_id in topology.neighbors(args.id)]
+
+    # Shared-Memory-Register (optional): Nachbarn auf demselben Knoten des Layouts werden direkt gelesen
+    registry, local_neighbors = None, {}
+    if args.shm_registry:
+        registry = PhaseRegistry(args.shm_registry, args.n * args.m)
+        registry.write(args.id, shared_phase.value)
+        node = layout.owner(args.id)
+        local_neighbors = {layout.firefly_address(neighbor_id): int(neighbor_id)
+                           for neighbor_id in topology.neighbors(args.id) if layout.owner(neighbor_id) is node}
+
+    start_time = time.time()
+    # Jeder Nachbar und der Observer halten eine Verbindung offen, beim Thread-Pool belegt jede einen Thread
+    threads = args.server_threads or len(neighbors) + 8
+    shared_step = Value("q", 0)
+    handler = FireflyServiceHandler(shared_phase, args.id, args.n, args.m, shared_step)
+    threading.Thread(target=start_server, args=(port, handler, args.server, args.transport, threads, args.protocol),
+                     daemon=True).start()
+    pool = ClientPool(args.transport, protocol=args.protocol)
+    neighbor_cache = cache_from_args([f"{neighbor['host']}:{neighbor['port']}" for neighbor in neighbors], args)
+    scheduler = StepScheduler(args.step_period, aligned=True)  # Alle Glühwürmchen eines Rechners im selben Takt
+    firefly_client(args.id, neighbors, shared_phase, args.omega, args.k, neighbor_cache, scheduler, pool,
+                   registry=registry, local_neighbors=local_neighbors, shared_step=shared_step)
+    pool.close()
+    if registry is not None:
+        registry.close()
+
+    if args.stats_file:
+        write_stats(args.stats_file, id=args.id, elapsed_s=time.time() - start_time, local_neighbors=len(local_neighbors),
+                    **scheduler.stats())
+
+
+if __name__ == "__main__":
+    main()
@@ -4,6 +4,24 @@ struct PhaseResponse {
   1: double phase
 }
 
+// Zusammenhängender Ausschnitt des Gitters (IDs start .. start + len(phases) - 1) mit dem Schrittzähler des Besitzers
+struct GridResponse {
+  1: i32 n
+  2: i32 m
+  3: i32 start
+  4: i64 step
+  5: list<double> phases
+}
+
+// Veränderlich, damit contextlib (ClientPool.client) beim Weiterreichen __traceback__ setzen kann
+exception InvalidIds {
+  1: string message
+} (python.immutable = "false")
+
 service FireflyService {
   PhaseResponse getPhase(1: i32 id)
+  // Phasen mehrerer IDs mit einem Aufruf (alle müssen dem angefragten Prozess gehören)
+  list<double> getPhases(1: list<i32> ids) throws (1: InvalidIds error)
+  // Alle Phasen des angefragten Prozesses; ein Host-Prozess für das ganze Gitter liefert es mit einem Aufruf
+  GridResponse getGrid()
 }
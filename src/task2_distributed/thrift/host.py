@@ -0,0 +1,182 @@
+import os
+import sys
+import math
+import time
+import signal
+import argparse
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+from gen_py.fireflys import FireflyService
+from gen_py.fireflys.ttypes import PhaseResponse, GridResponse, InvalidIds
+from stack import ClientPool, make_server, start_server_thread, add_stack_arguments
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "..", "common"))
+
+from topology import add_topology_arguments, topology_from_args
+from layout import add_layout_arguments, layout_from_args
+from proc_stats import write_stats
+from scheduler import StepScheduler, add_scheduler_arguments
+
+RUNNING = True
+
+
+class HostHandler:
+    """Stellt die Phasen aller Glühwürmchen eines Host-Prozesses über einen Thrift-Server bereit."""
+
+    def __init__(self, host):
+        self.host = host
+
+    def getPhase(self, id):
+        """Gibt die Phase eines einzelnen Glühwürmchens dieses Hosts zurück."""
+        return PhaseResponse(phase=self.getPhases([id])[0])
+
+    def getPhases(self, ids):
+        """Gibt die Phasen der angefragten IDs zurück (alle müssen zu diesem Host gehören)."""
+        ids = np.asarray(ids, dtype=np.int64)
+        block = self.host.block
+        if len(ids) and (ids.min() < block.start or ids.max() >= block.stop):
+            raise InvalidIds(f"IDs außerhalb von {block.start}..{block.stop - 1}")
+        _, phases = self.host.latest  # Referenz einmal lesen, der Schritt tauscht das Array komplett aus
+        return phases[ids - block.start].tolist()
+
+    def getGrid(self):
+        """Gibt alle Phasen dieses Hosts mit ihrem Schritt zurück; besitzt der Host das ganze Gitter, ist es vollständig."""
+        step, phases = self.host.latest
+        layout = self.host.layout
+        return GridResponse(n=layout.n, m=layout.m, start=self.host.block.start, step=step, phases=phases.tolist())
+
+
+class FireflyHost:
+    """Ein Prozess, der einen zusammenhängenden Block von Glühwürmchen gemeinsam simuliert (Thrift).
+
+    Die eigenen Phasen werden vektorisiert in einem Schritt aktualisiert. Nur für Nachbarn
+    außerhalb des Blocks (Blockränder) wird pro Schritt und fremdem Host ein getPhases-Aufruf gestellt.
+    """
+
+    def __init__(self, layout, index, topology, omega, k, pool):
+        """
+        :param layout: Aufteilung des Gitters auf die Host-Prozesse
+        :param index: Nummer dieses Hosts im Layout
+        :param topology: Nachbarschaftsindex des gesamten Gitters
+        :param pool: ClientPool für die Verbindungen zu den fremden Hosts (dessen Timeout ist die Frist pro Abfrage)
+        """
+        self.layout = layout
+        self.block = layout.blocks[index]
+        self.topology = topology
+        self.omega = omega
+        self.k = k
+        self.phases = np.random.uniform(0, 2 * math.pi, len(self.block.ids))
+        self.steps = 0
+        self.latest = (self.steps, self.phases)  # Schritt und Phasen als ein Paar, für getGrid immer zusammenpassend
+
+        # Alle Phasen des Gitters; fremde Einträge enthalten den zuletzt empfangenen Wert
+        self.values = np.zeros(layout.n * layout.m)
+        first, last = topology.indptr[self.block.start], topology.indptr[self.block.stop]
+        neighbor_ids = np.unique(topology.indices[first:last])
+        remote_ids = neighbor_ids[(neighbor_ids < self.block.start) | (neighbor_ids >= self.block.stop)]
+        self.remote = {self.layout.blocks[h]: np.asarray(ids) for h, ids in layout.group_by_owner(remote_ids).items()}
+        self.received = set()  # IDs, von denen bereits eine Phase vorliegt
+        self.pool = pool
+        self.executor = ThreadPoolExecutor(max_workers=max(1, len(self.remote)))  # Fremde Hosts gleichzeitig abfragen
+
+    def fetch_host(self, block):
+        """Fragt die Randphasen bei einem fremden Host mit einem getPhases-Aufruf ab."""
+        ids = self.remote[block]
+        try:
+            with self.pool.client(block.host, block.port) as client:
+                phases = client.getPhases(ids.tolist())
+        except Exception:
+            return  # Letzte bekannte Phasen bleiben erhalten, die Verbindung wird beim nächsten Mal neu aufgebaut
+        self.values[ids] = phases
+        self.received.update(ids.tolist())
+
+    def fetch_boundary(self):
+        """Fragt die Randphasen bei allen fremden Hosts gleichzeitig ab (ein Aufruf pro Host)."""
+        list(self.executor.map(self.fetch_host, self.remote))
+
+    def step(self):
+        """Führt einen Simulationsschritt für alle eigenen Glühwürmchen aus."""
+        self.fetch_boundary()
+        self.values[self.block.start:self.block.stop] = self.phases
+        average_phase = self.topology.mean(self.values, self.block.start, self.block.stop)
+        self.phases = (self.phases + self.omega + self.k * np.sin(average_phase - self.phases)) % (2 * math.pi)
+        self.steps += 1
+        self.latest = (self.steps, self.phases)
+
+    def wait_for_peers(self, timeout=10.0):
+        """Wartet, bis von allen fremden Randnachbarn eine Phase vorliegt (höchstens `timeout` Sekunden).
+
+        Ohne diese Wartezeit würden noch nicht gestartete Hosts in den ersten Schritten mit Phase 0 eingehen.
+        """
+        expected = sum(len(ids) for ids in self.remote.values())
+        deadline = time.time() + timeout
+        while RUNNING and len(self.received) < expected and time.time() < deadline:
+            self.fetch_boundary()
+            time.sleep(0.05)
+
+    def run(self, scheduler):
+        """Simuliert im Takt des StepSchedulers, bis der Prozess beendet wird. Gibt die Anzahl der Schritte zurück."""
+        self.wait_for_peers()
+        while RUNNING:
+            self.step()
+            scheduler.wait()
+        self.executor.shutdown()
+        self.pool.close()
+        return self.steps
+
+
+def handle_signal(signal, frame):
+    """Signalhandler zum Beenden."""
+    global RUNNING
+    RUNNING = False
+
+
+signal.signal(signal.SIGTERM, handle_signal)
+signal.signal(signal.SIGINT, handle_signal)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Firefly Host: simuliert einen Block von Glühwürmchen in einem Prozess (Thrift)")
+    parser.add_argument("--n", type=int, required=True, help="Anzahl der Zeilen (Höhe des Gitters)")
+    parser.add_argument("--m", type=int, required=True, help="Anzahl der Spalten (Breite des Gitters)")
+    parser.add_argument("--hosts", type=int, default=None, help="Anzahl der Host-Prozesse (höchstens n), ohne --layout erforderlich")
+    parser.add_argument("--index", type=int, required=True, help="Nummer dieses Host-Prozesses bzw. Knotens im Layout (ab 0)")
+    parser.add_argument("--k", type=float, default=0.1, help="Kopplungsstärke (Standard: 0.1)")
+    parser.add_argument("--omega", type=float, default=0.75, help="Natürliche Frequenz (Standard: 0.75)")
+    parser.add_argument("--rpc-timeout", type=float, default=0.1,
+                        help="Frist in Sekunden für die Abfrage der Randphasen fremder Hosts (Standard: 0.1)")
+    add_topology_arguments(parser)
+    add_layout_arguments(parser)
+    add_scheduler_arguments(parser, 0.1)
+    add_stack_arguments(parser, server=True)
+    parser.add_argument("--stats-file", type=str, default=None, help="Beim Beenden Schritte, CPU-Zeit und Speicher als JSON hierhin schreiben")
+    args = parser.parse_args()
+    if not args.layout and (args.hosts is None or not 1 <= args.hosts <= args.n):
+        parser.error("ohne --layout muss --hosts zwischen 1 und n liegen")
+    if args.server == "nonblocking" and args.transport != "framed":
+        parser.error("--server nonblocking erfordert --transport framed")
+
+    # Blöcke aus der Cluster-Datei oder gleich große Zeilenblöcke auf localhost
+    layout = layout_from_args(args.n, args.m, args, hosts=args.hosts)
+    if not 0 <= args.index < len(layout.blocks):
+        parser.error(f"--index muss zwischen 0 und {len(layout.blocks) - 1} liegen")
+    pool = ClientPool(args.transport, timeout=args.rpc_timeout, protocol=args.protocol)
+    host = FireflyHost(layout, args.index, topology_from_args(args.n, args.m, args), args.omega, args.k, pool)
+
+    start_time = time.time()
+    # Jeder fremde Host und der Observer halten eine Verbindung offen, beim Thread-Pool belegt jede einen Thread
+    threads = args.server_threads or len(layout.blocks) + 8
+    server = make_server(FireflyService.Processor(HostHandler(host)), host.block.port, args.server, args.transport,
+                         threads, args.protocol)
+    try:
+        start_server_thread(server)
+    except OSError as e:
+        pool.close()
+        sys.exit(f"Host {args.index}: Port {host.block.port} nicht verfügbar: {e}")
+    print(f"Host {args.index}: Glühwürmchen {host.block.start} bis {host.block.stop - 1} auf Port {host.block.port}")
+    scheduler = StepScheduler(args.step_period, aligned=True)
+    host.run(scheduler)
+
+    if args.stats_file:
+        write_stats(args.stats_file, id=args.index, fireflies=len(host.block.ids), remote_hosts=len(host.remote),
+                    elapsed_s=time.time() - start_time, **scheduler.stats())
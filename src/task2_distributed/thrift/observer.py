@@ -1,35 +1,54 @@
-from gen_py.fireflys import FireflyService
-from thrift.transport import TSocket, TTransport
-from thrift.protocol import TBinaryProtocol
+import os
+import sys
+from stack import ClientPool, add_stack_arguments
 import tkinter as tk
 import time
-import math
 from threading import Thread, Lock
 from concurrent.futures import ThreadPoolExecutor
 
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "..", "common"))
+
+from sync import SyncTracker
+from renderer import PhaseRenderer, cell_size_for
+from phase_trace import add_trace_arguments, writer_from_args
+from polling import AdaptivePollInterval, pool_size
+from scheduler import StepScheduler
+from layout import block_layout, add_layout_arguments, layout_from_args
+from phase_registry import PhaseRegistry, add_registry_arguments
+
 
 class Observer:
-    def __init__(self, n, m, firefly_host="localhost"):
+    def __init__(self, n, m, firefly_host="localhost", sync_threshold=0.99, sync_window=1, recorder=None, poll_interval=0.5,
+                 layout=None, registry=None, transport="buffered", protocol="binary", hosts=0, host_processes=False):
         self.n = n
         self.m = m
         self.firefly_host = firefly_host
+        # Mit Host-Prozessen (host.py) genügt ein getGrid-Aufruf pro Host und Frame
+        self.host_processes = host_processes or hosts > 0
+        self.layout = layout if layout is not None else block_layout(n, m, max(hosts, 1), host=firefly_host)  # ID -> Rechner und Port
+        self.host_steps = None  # Schrittzähler der Hosts aus dem letzten Frame
+        self.registry = registry  # Shared-Memory-Register der Glühwürmchen auf diesem Rechner (optional)
         self.phases = [0] * (n * m)
+        self.reported = [False] * (n * m)  # Glühwürmchen, von denen schon eine Phase vorliegt
+        self.ready = False  # Erst wenn alle gemeldet haben, wird r ausgewertet (sonst zählen die Startwerte 0 mit)
         self.running = True  # Kontroll-Flag für das Beenden
-        self.executor = ThreadPoolExecutor(max_workers=10)  # Thread-Pool für parallele Abfragen
+        # Thread-Pool passend zur Anzahl der Abfragen pro Durchlauf (begrenzt)
+        self.executor = ThreadPoolExecutor(max_workers=pool_size(len(self.layout.blocks) if self.host_processes else n * m))
+        self.pool = ClientPool(transport, protocol=protocol)  # Eine dauerhaft offene Verbindung pro Glühwürmchen bzw. Host
         self.latencies = []  # Liste zur Speicherung der Latenzen
         self.latency_lock = Lock()  # Lock für thread-sicheren Zugriff auf die Latenzliste
+        self.sync = SyncTracker(threshold=sync_threshold, window=sync_window)  # Ordnungsparameter der Abfragen
+        self.recorder = recorder  # Aufzeichnung der abgefragten Phasen (optional)
+        self.poll = AdaptivePollInterval(poll_interval)  # Intervall passt sich an die Dauer der Durchläufe an
+        self.scheduler = StepScheduler(poll_interval)  # Takt der Abfragen auf der monotonen Uhr
 
     def fetch_phases(self):
         def query_firefly(i):
             try:
                 start_time = time.time()  # Startzeit der Anfrage
-                transport = TSocket.TSocket(self.firefly_host, 5001 + i)
-                transport = TTransport.TBufferedTransport(transport)
-                protocol = TBinaryProtocol.TBinaryProtocol(transport)
-                client = FireflyService.Client(protocol)
-
-                transport.open()
-                response = client.getPhase(i)
+                block = self.layout.owner(i)
+                with self.pool.client(block.host, block.firefly_port + i) as client:
+                    response = client.getPhase(i)
                 end_time = time.time()  # Endzeit der Antwort
                 latency = (end_time - start_time) * 1000  # Latenz in Millisekunden
 
@@ -38,16 +57,57 @@ class Observer:
                     self.latencies.append(latency)
 
                 self.phases[i] = response.phase  # Korrigierter Zugriff
-                transport.close()
+                self.reported[i] = True
             except Exception as e:
                 print(f"Could not connect to Firefly {i}: {e}")
 
+        def query_host(block):
+            """Holt alle Phasen eines Host-Prozesses mit einem getGrid-Aufruf. Gibt dessen Schrittzähler zurück (None bei Fehler)."""
+            try:
+                start_time = time.time()
+                with self.pool.client(block.host, block.port) as client:
+                    grid = client.getGrid()
+                latency = (time.time() - start_time) * 1000
+            except Exception as e:
+                print(f"Could not connect to Host {block.index}: {e}")
+                return None
+            with self.latency_lock:
+                self.latencies.append(latency)
+            self.phases[grid.start:grid.start + len(grid.phases)] = grid.phases
+            self.reported[grid.start:grid.start + len(grid.phases)] = [True] * len(grid.phases)
+            return grid.step
+
         while self.running:
-            # Parallele Abfragen mit Thread-Pool
-            futures = [self.executor.submit(query_firefly, i) for i in range(self.n * self.m)]
-            for future in futures:
-                future.result()  # Warten, bis alle Abfragen abgeschlossen sind
-            time.sleep(0.5)
+            sweep_start = time.monotonic()
+            changed = True
+            if self.registry is not None:
+                self.phases = self.registry.snapshot(self.phases)  # Direkt aus dem Shared Memory, ohne RPC
+                self.reported = (self.registry.stamps > 0).tolist()
+            elif self.host_processes:
+                # Ein Aufruf pro Host und Frame (bei einem Host für das ganze Gitter genau einer);
+                # haben alle Hosts seit dem letzten Frame keinen Schritt gemacht, wird nichts neu berechnet
+                steps = list(self.executor.map(query_host, self.layout.blocks))
+                changed = steps != self.host_steps
+                self.host_steps = steps
+            else:
+                # Parallele Abfragen mit Thread-Pool
+                futures = [self.executor.submit(query_firefly, i) for i in range(self.n * self.m)]
+                for future in futures:
+                    future.result()  # Warten, bis alle Abfragen abgeschlossen sind (nie mehr als ein Durchlauf unterwegs)
+            if not self.ready:
+                self.ready = all(self.reported)
+            if changed and self.ready:
+                self.sync.update_phases(self.phases)
+                if self.recorder is not None:
+                    self.recorder.record(self.sync.step, self.phases)
+            # Intervall an die Dauer des Durchlaufs anpassen und bis zum nächsten Takt warten
+            self.poll.finish(time.monotonic() - sweep_start)
+            self.scheduler.period = self.poll.interval
+            self.scheduler.wait()
+
+    def order_parameter(self):
+        """Gibt den zuletzt berechneten Ordnungsparameter und den Synchronisationszustand zurück."""
+        return self.sync.stats()
 
     def calculate_and_print_latency_stats(self):
         """Berechnet und gibt die Latenzstatistiken aus."""
@@ -62,35 +122,41 @@ class Observer:
                     self.latencies.clear()  # Zurücksetzen der Liste nach Ausgabe
                 else:
                     print("Latency Stats: No data collected in the last interval.")
+            poll = self.poll.stats()
+            self.poll.reset()
+            print(f"Poll Stats: {poll['sweeps']} Durchläufe, Dauer {poll['sweep_ms']:.1f} ms, "
+                  f"Intervall {poll['interval_ms']:.0f} ms, Überläufe: {poll['overruns']} ({poll['skipped']} Takte verpasst)")
+            if self.sync.order is not None:
+                state = f"synchron seit Abfrage {self.sync.streak_start}" if self.sync.synced else "nicht synchron"
+                if self.sync.sync_step is not None:
+                    state += f", zuerst synchron ab Abfrage {self.sync.sync_step}"
+                print(f"Order Parameter: r = {self.sync.order:.4f} ({state})")
 
     def visualize(self):
         root = tk.Tk()
         root.title("Firefly Observer")
 
-        canvas = tk.Canvas(root, width=self.m * 50, height=self.n * 50)
+        cell_size = cell_size_for(self.n, self.m)
+        canvas = tk.Canvas(root, width=self.m * cell_size, height=self.n * cell_size)
         canvas.pack()
 
-        rectangles = [[None for _ in range(self.m)] for _ in range(self.n)]
-        for i in range(self.n):
-            for j in range(self.m):
-                x0, y0 = (j * 50, i * 50)
-                x1, y1 = (x0 + 50, y0 + 50)
-                rectangles[i][j] = canvas.create_rectangle(x0, y0, x1, y1, fill='black')
+        # Das gesamte Gitter wird als ein Bild gezeichnet
+        renderer = PhaseRenderer(canvas, self.n, self.m, cell_size)
 
         def update_gui():
             if self.running:
-                for i in range(self.n):
-                    for j in range(self.m):
-                        idx = i * self.m + j
-                        phase = self.phases[idx]
-                        color = int((math.sin(phase) + 1) * 127.5)
-                        canvas.itemconfig(rectangles[i][j], fill=f'#{color:02x}{color:02x}{color:02x}')
-                root.after(500, update_gui)
+                if self.sync.order is not None:
+                    root.title(f"Firefly Observer - r = {self.sync.order:.3f}")
+                renderer.draw(self.phases)  # Zeichnet nur, wenn sich die Phasen geändert haben
+                root.after(100, update_gui)
 
         def on_close():
             """Beenden des Observers."""
             self.running = False
             self.executor.shutdown(wait=False)  # Thread-Pool schließen
+            self.pool.close()
+            if self.recorder is not None:
+                self.recorder.close()  # Restliche Frames schreiben
             root.destroy()
 
         root.protocol("WM_DELETE_WINDOW", on_close)  # Schließen-Handler hinzufügen
@@ -110,7 +176,22 @@ if __name__ == "__main__":
     parser.add_argument("--n", type=int, required=True, help="Anzahl der Zeilen")
     parser.add_argument("--m", type=int, required=True, help="Anzahl der Spalten")
     parser.add_argument("--firefly-host", type=str, default="localhost", help="Host-Adresse der Fireflies")
+    parser.add_argument("--hosts", type=int, default=0, help="Anzahl der Host-Prozesse, falls die Glühwürmchen mit host.py gestartet wurden")
+    parser.add_argument("--sync-threshold", type=float, default=0.99, help="Ordnungsparameter r, ab dem das Gitter als synchron gilt (Standard: 0.99)")
+    parser.add_argument("--sync-window", type=int, default=1, help="Anzahl aufeinanderfolgender Abfragen über dem Schwellwert (Standard: 1)")
+    parser.add_argument("--poll-interval", type=float, default=0.5,
+                        help="Minimales Intervall zwischen zwei Abfragedurchläufen in Sekunden (Standard: 0.5)")
+    add_layout_arguments(parser, host_processes=True)
+    add_registry_arguments(parser)
+    add_stack_arguments(parser)
+    add_trace_arguments(parser)
     args = parser.parse_args()
 
-    observer = Observer(args.n, args.m, firefly_host=args.firefly_host)
+    observer = Observer(args.n, args.m, firefly_host=args.firefly_host,
+                        sync_threshold=args.sync_threshold, sync_window=args.sync_window,
+                        recorder=writer_from_args(args.n, args.m, args), poll_interval=args.poll_interval,
+                        layout=layout_from_args(args.n, args.m, args, host=args.firefly_host, hosts=max(args.hosts, 1)),
+                        registry=PhaseRegistry(args.shm_registry, args.n * args.m) if args.shm_registry else None,
+                        transport=args.transport, protocol=args.protocol,
+                        hosts=args.hosts, host_processes=args.host_processes)
     observer.start()
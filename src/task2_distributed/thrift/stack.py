@@ -0,0 +1,153 @@
+import threading
+from contextlib import contextmanager
+
+from gen_py.fireflys import FireflyService
+from thrift.Thrift import TException
+from thrift.transport import TSocket, TTransport
+from thrift.protocol import TBinaryProtocol, TCompactProtocol, TProtocol
+from thrift.server import TServer, TNonblockingServer
+
+# Protokolle; accelerated ist auf der Leitung identisch zu binary, kodiert aber über die C-Erweiterung fastbinary
+# (fehlt sie, fällt Thrift still auf die reine Python-Implementierung zurück)
+PROTOCOLS = {
+    "binary": TBinaryProtocol.TBinaryProtocolFactory,
+    "compact": TCompactProtocol.TCompactProtocolFactory,
+    "accelerated": TBinaryProtocol.TBinaryProtocolAcceleratedFactory,
+}
+# Transportschichten; Client und Server müssen dieselbe verwenden
+TRANSPORTS = {
+    "buffered": TTransport.TBufferedTransportFactory,
+    "framed": TTransport.TFramedTransportFactory,
+}
+# threadpool: feste Anzahl Threads, jede Verbindung belegt einen Thread, solange sie offen ist
+# nonblocking: ein Thread wartet per poll() auf alle Verbindungen, Worker bearbeiten die Anfragen (nur framed)
+SERVERS = ("threadpool", "nonblocking")
+
+
+def wrap_client(socket, transport="buffered", protocol="binary"):
+    """Baut Transport und Protokoll um einen (noch nicht geöffneten) TSocket. Gibt (Client, Transport) zurück."""
+    wrapped = TRANSPORTS[transport]().getTransport(socket)
+    return FireflyService.Client(PROTOCOLS[protocol]().getProtocol(wrapped)), wrapped
+
+
+def open_client(host, port, transport="buffered", timeout=None, protocol="binary"):
+    """Öffnet eine Verbindung zu einem Glühwürmchen. Gibt (Client, Transport) zurück.
+
+    :param timeout: Timeout für Verbindungsaufbau und Antwort in Sekunden (None: unbegrenzt)
+    """
+    socket = TSocket.TSocket(host, port)
+    if timeout:
+        socket.setTimeout(timeout * 1000)
+    client, wrapped = wrap_client(socket, transport, protocol)
+    wrapped.open()
+    return client, wrapped
+
+
+class ServerSocket(TSocket.TServerSocket):
+    """TServerSocket, der nur beim ersten listen() bindet; so kann der Port vor serve() belegt werden."""
+
+    def listen(self):
+        if self.handle is None:
+            super().listen()
+
+
+def make_server(processor, port, server="threadpool", transport="buffered", threads=16, protocol="binary"):
+    """Erzeugt den Thrift-Server eines Glühwürmchens (serve() blockiert, die Worker-Threads sind Daemons).
+
+    :param threads: Anzahl der Worker-Threads; beim threadpool-Server die Anzahl gleichzeitig offener Verbindungen
+    """
+    socket = ServerSocket(port=port)
+    pfactory = PROTOCOLS[protocol]()
+    if server == "nonblocking":
+        if transport != "framed":
+            raise ValueError("Der nonblocking-Server unterstützt nur den framed-Transport")
+        return TNonblockingServer.TNonblockingServer(processor, socket, pfactory, threads=threads)
+    tfactory = TRANSPORTS[transport]()
+    threadpool = TServer.TThreadPoolServer(processor, socket, tfactory, pfactory, daemon=True)
+    threadpool.setNumThreads(threads)
+    return threadpool
+
+
+def start_server_thread(server):
+    """Bindet den Port des Servers im aufrufenden Thread und bedient ihn danach in einem Daemon-Thread.
+
+    Fehler beim Binden (z. B. Port belegt) werden als OSError im Aufrufer ausgelöst statt im Thread zu verschwinden.
+    """
+    socket = server.socket if isinstance(server, TNonblockingServer.TNonblockingServer) else server.serverTransport
+    socket.listen()
+    threading.Thread(target=server.serve, daemon=True).start()
+
+
+class ClientPool:
+    """Langlebige Thrift-Verbindungen, pro Adresse wiederverwendet.
+
+    Ein Thrift-Client ist nicht threadsicher; client() leiht deshalb eine freie Verbindung zur Adresse
+    aus (oder öffnet eine neue) und gibt sie nach dem Aufruf zurück. Bricht die Verbindung ab (Transport-,
+    Protokoll- oder sonstiger Fehler), wird sie geschlossen und beim nächsten Zugriff neu aufgebaut (z. B. nach
+    einem Neustart des Nachbarn). Anwendungsfehler wie InvalidIds sind vollständige Antworten, die Verbindung
+    bleibt dann im Pool.
+    """
+
+    def __init__(self, transport="buffered", timeout=1.0, protocol="binary"):
+        """
+        :param transport: "buffered" oder "framed", passend zum Server
+        :param timeout: Timeout pro Aufruf in Sekunden
+        :param protocol: "binary", "compact" oder "accelerated", passend zum Server
+        """
+        self.transport = transport
+        self.protocol = protocol
+        self.timeout = timeout
+        self.idle = {}  # (host, port) -> Liste freier (Client, Transport)
+        self.lock = threading.Lock()
+        self.opened = 0  # Anzahl der insgesamt geöffneten Verbindungen
+
+    @contextmanager
+    def client(self, host, port):
+        """Leiht für die Dauer des with-Blocks einen verbundenen Client zur Adresse aus."""
+        address = (host, port)
+        with self.lock:
+            idle = self.idle.get(address)
+            connection = idle.pop() if idle else None
+        if connection is None:
+            connection = open_client(host, port, self.transport, self.timeout, self.protocol)
+            self.opened += 1
+        try:
+            yield connection[0]
+        except (TTransport.TTransportException, TProtocol.TProtocolException):
+            connection[1].close()  # Zustand der Verbindung unklar, nicht wiederverwenden
+            raise
+        except TException:
+            self._release(address, connection)  # Antwort vollständig gelesen, Verbindung weiter verwendbar
+            raise
+        except BaseException:
+            connection[1].close()
+            raise
+        self._release(address, connection)
+
+    def _release(self, address, connection):
+        """Gibt eine ausgeliehene Verbindung an den Pool zurück."""
+        with self.lock:
+            self.idle.setdefault(address, []).append(connection)
+
+    def close(self):
+        """Schließt alle freien Verbindungen."""
+        with self.lock:
+            for connections in self.idle.values():
+                for _, transport in connections:
+                    transport.close()
+            self.idle.clear()
+
+
+def add_stack_arguments(parser, server=False):
+    """Fügt die Kommandozeilenargumente für Thrift-Protokoll und -Transport (und optional den Server) hinzu."""
+    parser.add_argument("--protocol", choices=sorted(PROTOCOLS), default="binary",
+                        help="Thrift-Protokoll, bei allen Glühwürmchen und dem Observer gleich; accelerated ist binary "
+                             "mit C-Kodierung (Standard: binary)")
+    parser.add_argument("--transport", choices=sorted(TRANSPORTS), default="buffered",
+                        help="Thrift-Transport, bei allen Glühwürmchen und dem Observer gleich (Standard: buffered)")
+    if server:
+        parser.add_argument("--server", choices=SERVERS, default="threadpool",
+                            help="Thrift-Server: threadpool (ein Thread pro offener Verbindung) oder nonblocking "
+                                 "(poll(), erfordert --transport framed) (Standard: threadpool)")
+        parser.add_argument("--server-threads", type=int, default=0,
+                            help="Worker-Threads des Servers (Standard: 0 = Anzahl der Nachbarn + 8)")
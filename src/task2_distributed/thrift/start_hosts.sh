@@ -0,0 +1,62 @@
+#!/bin/bash
+
+# Standardwerte
+DEFAULT_K=0.1
+DEFAULT_OMEGA=0.75
+DEFAULT_HOSTS=1
+
+# Argumente parsen
+while getopts "n:m:k:o:H:L:" opt; do
+  case $opt in
+    n) n=$OPTARG ;;
+    m) m=$OPTARG ;;
+    k) k=$OPTARG ;;
+    o) omega=$OPTARG ;;
+    H) hosts=$OPTARG ;;
+    L) layout=$OPTARG ;;
+    *) echo "Usage: $0 -n <rows> -m <cols> [-H <hosts> | -L <cluster.json>] [-k <K>] [-o <OMEGA>] [-- <weitere Host-Argumente>]" >&2
+       exit 1 ;;
+  esac
+done
+shift $((OPTIND - 1))
+# Alles nach "--" wird unverändert an host.py weitergereicht (z. B. --topology von_neumann --radius 2)
+extra_args=("$@")
+
+# Überprüfen, ob die erforderlichen Argumente gesetzt sind
+if [ -z "$n" ] || [ -z "$m" ]; then
+  echo "Error: You must specify -n and -m." >&2
+  exit 1
+fi
+
+# Standardwerte setzen
+k=${k:-$DEFAULT_K}
+omega=${omega:-$DEFAULT_OMEGA}
+hosts=${hosts:-$DEFAULT_HOSTS}
+
+# Mit Cluster-Datei werden alle ihre Knoten lokal gestartet (zum Testen, jeder Knoten auf seinem Port);
+# auf echten Rechnern startet man stattdessen je Rechner: python3 host.py --layout <datei> --index <knoten> ...
+if [ -n "$layout" ]; then
+  hosts=$(python3 -c 'import json, sys; print(len(json.load(open(sys.argv[1]))["nodes"]))' "$layout") || exit 1
+  host_args=(--layout "$layout")
+else
+  host_args=(--hosts "$hosts")
+fi
+
+# Starte die Host-Prozesse, jeder simuliert einen Zeilenblock des Gitters
+pids=()
+for index in $(seq 0 $((hosts - 1))); do
+  python3 host.py --n "$n" --m "$m" "${host_args[@]}" --index "$index" --k "$k" --omega "$omega" "${extra_args[@]}" &
+  pids+=($!)
+done
+
+# Warten auf Benutzereingabe zum Beenden
+echo "Hosts started. Press [Enter] to stop."
+read -r
+
+# Beende alle Prozesse
+echo "Stopping Hosts..."
+for pid in "${pids[@]}"; do
+  kill "$pid"
+done
+
+echo "All Hosts stopped."